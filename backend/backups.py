@@ -0,0 +1,156 @@
+"""Online backups and restores through SQLite's backup API.
+
+A snapshot copies the database a few pages per step from a reader
+connection holding one read transaction, so the copy is consistent and, in
+WAL mode, writers carry on throughout. Snapshots are written to a
+``.partial`` file and renamed into place, so a backup directory only ever
+holds complete files. BackupScheduler takes one every ``interval_seconds``
+and keeps the newest ``keep``.
+
+A restore copies a checked database file over the live one with the backup
+API again, through the writer connection. SQLite applies it as one write
+transaction: readers see either the old database or the restored one.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Union
+
+import aiosqlite
+
+from db import ConnectionPool, ReadWritePool
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.db'
+TABLE_EXISTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+
+
+class InvalidBackup(ValueError):
+    pass
+
+
+def backup_name() -> str:
+    """File name for a snapshot taken now; names sort by time"""
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ') + SUFFIX
+
+
+async def snapshot(source: aiosqlite.Connection, dest: Path, pages_per_step: int = 256) -> Path:
+    """Copy the database behind ``source`` to the new file ``dest``.
+
+    ``source`` should be a reader: it is busy for the whole copy.
+    """
+    partial = dest.with_name(dest.name + '.partial')
+    target = sqlite3.connect(partial, check_same_thread=False)
+    try:
+        # The read transaction pins one snapshot across every step
+        await source.execute('BEGIN')
+        try:
+            async with source.execute('SELECT COUNT(*) FROM sqlite_master'):
+                pass
+            await source.backup(target, pages=pages_per_step)
+        finally:
+            await source.rollback()
+        # A single self-contained file, not one that expects a -wal beside it
+        target.execute('PRAGMA journal_mode = DELETE')
+    except BaseException:
+        target.close()
+        partial.unlink(missing_ok=True)
+        raise
+    target.close()
+    os.replace(partial, dest)
+    return dest
+
+
+async def check_backup(path: Path):
+    """Make sure ``path`` is an intact timesheet database"""
+    try:
+        async with aiosqlite.connect(path) as db:
+            async with db.execute('PRAGMA quick_check') as cursor:
+                problems = [row[0] for row in await cursor.fetchall()]
+            if problems != ['ok']:
+                raise InvalidBackup(f"database is damaged: {'; '.join(problems[:5])}")
+            async with db.execute(TABLE_EXISTS_SQL, ('time_entries',)) as cursor:
+                if await cursor.fetchone() is None:
+                    raise InvalidBackup("not a timesheet database: no time_entries table")
+    except sqlite3.DatabaseError as e:
+        raise InvalidBackup(f"not a SQLite database: {e}")
+
+
+async def restore(target: aiosqlite.Connection, source: aiosqlite.Connection):
+    """Replace the database behind the writer ``target`` with ``source``'s,
+    in one transaction"""
+    async with target.execute('PRAGMA page_size') as cursor:
+        page_size = (await cursor.fetchone())[0]
+    async with source.execute('PRAGMA page_size') as cursor:
+        source_page_size = (await cursor.fetchone())[0]
+    if source_page_size != page_size:
+        # A WAL database cannot take pages of another size
+        await source.execute(f'PRAGMA page_size = {int(page_size)}')
+        await source.execute('VACUUM')
+    await source.backup(target)
+
+
+def list_backups(directory: Path) -> List[dict]:
+    """Complete backups in ``directory``, newest first"""
+    if not directory.is_dir():
+        return []
+    backups = []
+    for path in sorted(directory.glob('*' + SUFFIX), reverse=True):
+        stat = path.stat()
+        backups.append({
+            'name': path.name,
+            'size_bytes': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(timespec='seconds'),
+        })
+    return backups
+
+
+def prune_backups(directory: Path, keep: int):
+    for backup in list_backups(directory)[keep:]:
+        (directory / backup['name']).unlink(missing_ok=True)
+
+
+class BackupScheduler:
+    """Snapshots one database into ``directory`` every ``interval_seconds``"""
+
+    def __init__(self, pool: Union[ConnectionPool, ReadWritePool], directory: Path, interval_seconds: float,
+                 keep: int = 7, pages_per_step: int = 256):
+        self._pool = pool
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def backup_now(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        async with self._pool.acquire_read() as db:
+            path = await snapshot(db, self.directory / backup_name(), self.pages_per_step)
+        prune_backups(self.directory, self.keep)
+        logger.info("Backed up %s to %s", self._pool.path, path)
+        return path
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.backup_now()
+            except Exception:
+                logger.exception("Scheduled backup of %s failed", self._pool.path)
@@ -0,0 +1,242 @@
+"""Latency and throughput of every /api route against a seeded database.
+
+Seeds a throwaway database with years of synthetic entries across
+hundreds of project lines (see datagen.py), then drives each route in
+process at every concurrency level and prints JSON: requests/sec and
+p50/p95/p99 per route and level. Pass --baseline with an earlier run's
+output to exit non-zero when a route's p95 or throughput regresses by more
+than --tolerance.
+
+    python benchmarks/bench_api.py --concurrency 1,8,32 --output api.json
+    python benchmarks/bench_api.py --baseline api.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from harness import percentiles, start_app, stop_app, timed
+
+import datagen
+
+
+class Route:
+    """One benchmarked route: ``factory(client, i)`` issues request ``i``.
+
+    ``weight`` scales the request count for routes that move a whole
+    dataset per call, so a run finishes in reasonable time.
+    """
+
+    def __init__(self, name, factory, weight=1.0):
+        self.name = name
+        self.factory = factory
+        self.weight = weight
+
+
+def routes(dataset, level, seed=0):
+    rng = random.Random(seed)
+    entries = dataset['entries']
+    weeks = sorted({entry['week_ending_date'] for entry in entries})
+    work_dates = sorted({entry['work_date'] for entry in entries})
+    projects = [line['line_code'] for line in dataset['line_codes']]
+    # Requests pick from fixed shuffles, so runs compare like with like
+    week_picks = rng.choices(weeks, k=1024)
+    date_picks = rng.choices(work_dates, k=1024)
+    entry_picks = rng.choices(entries, k=1024)
+    recent = weeks[-13:]
+
+    def week(i):
+        return week_picks[i % len(week_picks)]
+
+    def upsert(entry, i):
+        return {'work_date': entry['work_date'], 'line_code': entry['line_code'],
+                'st_hours': entry['st_hours'], 'ot_hours': i % 3}
+
+    def entry_batch(i):
+        week_ending = date.fromisoformat(week(i))
+        return [
+            {'work_date': (week_ending - timedelta(days=day)).isoformat(), 'line_code': line,
+             'st_hours': 8, 'ot_hours': i % 2}
+            for day in range(1, 6) for line in datagen.WORK_LINES
+        ]
+
+    def import_payload(i):
+        # One week of entries, re-imported as an upsert
+        week_ending = week(i)
+        return {'entries': [entry for entry in entries if entry['week_ending_date'] == week_ending]}
+
+    import_payloads = [import_payload(i) for i in range(16)]
+    # Created by POST /api/lines and removed again by DELETE /api/lines
+    bench_line = f'BENCH-{level}-{{}}'.format
+    # Backups stored by POST /api/backups, newest last, for the restore route
+    stored_backups = []
+
+    async def create_backup(client, i):
+        response = await client.post('/api/backups')
+        stored_backups.append(response.json()['name'])
+        return response
+
+    async def restore_backup(client, i):
+        if not stored_backups:
+            # --routes left out POST /api/backups
+            await create_backup(client, i)
+        return await client.post('/api/backups/restore', params={'name': stored_backups[-1]})
+
+    return [
+        Route('GET /api/', lambda c, i: c.get('/api/')),
+        Route('GET /api/week-info', lambda c, i: c.get('/api/week-info', params={
+            'work_date': date_picks[i % len(date_picks)]})),
+        Route('POST /api/week-info/batch', lambda c, i: c.post('/api/week-info/batch', json_body=date_picks[:365])),
+        Route('GET /api/entries?week_ending', lambda c, i: c.get('/api/entries', params={'week_ending': week(i)})),
+        Route('GET /api/entries?start_date', lambda c, i: c.get('/api/entries', params={
+            'start_date': recent[0], 'end_date': recent[-1]})),
+        Route('POST /api/entries', lambda c, i: c.post(
+            '/api/entries', json_body=upsert(entry_picks[i % len(entry_picks)], i))),
+        Route('POST /api/entries/batch', lambda c, i: c.post('/api/entries/batch', json_body=entry_batch(i))),
+        Route('GET /api/weekly-summary', lambda c, i: c.get('/api/weekly-summary', params={'week_ending': week(i)})),
+        Route('GET /api/summaries', lambda c, i: c.get('/api/summaries', params={
+            'start': weeks[-52], 'end': weeks[-1], 'limit': 52})),
+        Route('GET /api/pay-periods', lambda c, i: c.get('/api/pay-periods', params={
+            'start': weeks[-52], 'end': weeks[-1]})),
+        # Every year of the dataset, from the monthly and yearly rollups
+        Route('GET /api/reports/monthly', lambda c, i: c.get('/api/reports/monthly', params={
+            'start': weeks[0][:7], 'end': weeks[-1][:7]})),
+        Route('GET /api/reports/yearly', lambda c, i: c.get('/api/reports/yearly', params={
+            'start': weeks[0][:4], 'end': weeks[-1][:4], 'line_code': ['PTO', 'HOLIDAY']})),
+        Route('GET /api/pay-periods/{period_ending}', lambda c, i: c.get(f'/api/pay-periods/{recent[-1]}')),
+        Route('GET /api/lines', lambda c, i: c.get('/api/lines')),
+        Route('POST /api/lines', lambda c, i: c.post('/api/lines', json_body={
+            'line_code': bench_line(i), 'label': 'Bench line', 'is_project': True})),
+        Route('PUT /api/lines/{line_code}', lambda c, i: c.put(
+            f'/api/lines/{projects[i % len(projects)]}', json_body={'is_visible': i % 10 != 0})),
+        Route('DELETE /api/lines/{line_code}', lambda c, i: c.request('DELETE', f'/api/lines/{bench_line(i)}')),
+        Route('GET /api/settings', lambda c, i: c.get('/api/settings')),
+        # Rewrites the current value, so no pay week recompute is started
+        Route('PUT /api/settings/{key}', lambda c, i: c.put('/api/settings/pay_frequency_days', json_body={
+            'key': 'pay_frequency_days', 'value': '14'})),
+        # First page of a full sync
+        Route('GET /api/sync', lambda c, i: c.get('/api/sync', params={'limit': 1000})),
+        Route('GET /api/export?start_date', lambda c, i: c.get('/api/export', params={
+            'start_date': recent[0], 'end_date': recent[-1]})),
+        Route('GET /api/export', lambda c, i: c.get('/api/export'), weight=0.05),
+        Route('GET /api/export?format=ndjson', lambda c, i: c.get('/api/export', params={'format': 'ndjson'}),
+              weight=0.05),
+        Route('GET /api/export?format=columnar', lambda c, i: c.get('/api/export', params={'format': 'columnar'}),
+              weight=0.05),
+        Route('POST /api/import', lambda c, i: c.post(
+            '/api/import', json_body=import_payloads[i % len(import_payloads)])),
+        Route('POST /api/import/stream', lambda c, i: c.post(
+            '/api/import/stream', params={'format': 'json'},
+            body=json.dumps(import_payloads[i % len(import_payloads)]).encode())),
+        # Each copies the whole database
+        Route('GET /api/backups/snapshot', lambda c, i: c.get('/api/backups/snapshot'), weight=0.05),
+        Route('POST /api/backups', create_backup, weight=0.05),
+        Route('GET /api/backups', lambda c, i: c.get('/api/backups')),
+        # Puts back the newest backup, taken after every write above
+        Route('POST /api/backups/restore', restore_backup, weight=0.05),
+        # Each start restarts a full-table background job, so keep these last and few
+        Route('POST /api/jobs/pay-week-recompute', lambda c, i: c.post('/api/jobs/pay-week-recompute'),
+              weight=0.02),
+        Route('GET /api/jobs/pay-week-recompute', lambda c, i: c.get('/api/jobs/pay-week-recompute')),
+    ]
+
+
+async def run_level(client, dataset, level, requests, selected):
+    results = {}
+    for route in routes(dataset, level):
+        if selected and not any(part in route.name for part in selected):
+            continue
+        count = max(level, int(requests * route.weight))
+        latencies, wall = await timed(lambda i: route.factory(client, i), count, level)
+        results[route.name] = dict(percentiles(latencies), rps=round(count / wall, 1))
+    await client.app.state.tenants.default.pay_weeks.wait()
+    return results
+
+
+def compare(results, baseline, tolerance, min_ms=1.0):
+    """Regressions of p95 latency or throughput against a previous run.
+
+    Changes under ``min_ms`` (in p95, or in wall time per request for
+    throughput) are ignored: sub-millisecond routes jitter by more than any
+    sensible tolerance.
+    """
+    regressions = []
+    for level, level_results in results['levels'].items():
+        for name, current in level_results.items():
+            previous = baseline.get('levels', {}).get(level, {}).get(name)
+            if previous is None:
+                continue
+            slower = current['p95_ms'] - previous['p95_ms']
+            if slower > min_ms and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name} @ {level}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+            if (1000 / current['rps'] - 1000 / previous['rps'] > min_ms
+                    and current['rps'] < previous['rps'] / (1 + tolerance)):
+                regressions.append(f"{name} @ {level}: {previous['rps']} -> {current['rps']} req/s")
+    return regressions
+
+
+async def main(args):
+    levels = [int(level) for level in args.concurrency.split(',')]
+    selected = [part for part in (args.routes or '').split(',') if part]
+    dataset = datagen.synthetic_dataset(years=args.years, project_lines=args.project_lines, seed=args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        client = await start_app(Path(tmp) / 'bench.db')
+        try:
+            start = time.perf_counter()
+            seeded = await client.post('/api/import/stream', params={'format': 'ndjson'},
+                                       body=datagen.ndjson_body(dataset))
+            if seeded.status_code != 200:
+                raise SystemExit(f"seeding failed: {seeded.status_code} {seeded.body[:200]!r}")
+            seed_seconds = time.perf_counter() - start
+            results = {
+                'meta': {
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'years': args.years,
+                    'entries': len(dataset['entries']),
+                    'project_lines': args.project_lines,
+                    'requests': args.requests,
+                    'seed_seconds': round(seed_seconds, 3),
+                },
+                'levels': {},
+            }
+            for level in levels:
+                results['levels'][str(level)] = await run_level(client, dataset, level, args.requests, selected)
+        finally:
+            await stop_app()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()),
+                              args.tolerance, args.min_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--project-lines', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=200, help="requests per route per concurrency level")
+    parser.add_argument('--concurrency', default='1,8,32', help="comma-separated concurrency levels")
+    parser.add_argument('--routes', help="only routes whose name contains one of these comma-separated parts")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--baseline', help="earlier --output file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-ms', type=float, default=1.0, help="ignore p95 changes smaller than this")
+    asyncio.run(main(parser.parse_args()))
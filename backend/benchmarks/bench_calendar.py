@@ -0,0 +1,65 @@
+"""Scalar date helpers vs the vectorized week_calendar module.
+
+    python benchmarks/bench_calendar.py --dates 1000000
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta
+
+import harness  # noqa: F401  (puts backend/ on sys.path)
+
+import server
+import week_calendar
+
+BASE_PAY_WEEK_ENDING = date(2025, 11, 22)
+
+
+def scalar(work_dates):
+    """What the per-date code paths do: parse, week ending, week start, pay flag, format"""
+    results = []
+    for work_date in work_dates:
+        week_ending = server.get_week_ending(datetime.strptime(work_date, '%Y-%m-%d').date())
+        results.append((
+            week_ending.strftime('%Y-%m-%d'),
+            server.get_week_start(week_ending).strftime('%Y-%m-%d'),
+            server.is_pay_week(week_ending, BASE_PAY_WEEK_ENDING, 14),
+        ))
+    return results
+
+
+def vectorized(work_dates):
+    days, valid = week_calendar.parse_dates(work_dates)
+    saturdays = week_calendar.week_endings(days)
+    return list(zip(
+        week_calendar.iso_dates(saturdays),
+        week_calendar.iso_dates(week_calendar.week_starts(saturdays)),
+        week_calendar.pay_week_flags(saturdays, BASE_PAY_WEEK_ENDING, 14).tolist(),
+    ))
+
+
+def main(args):
+    start = date(2000, 1, 1)
+    work_dates = [(start + timedelta(days=i % 20000)).isoformat() for i in range(args.dates)]
+
+    timings = {}
+    results = {}
+    for name, fn in (('scalar', scalar), ('vectorized', vectorized)):
+        begin = time.perf_counter()
+        results[name] = fn(work_dates)
+        timings[name] = time.perf_counter() - begin
+    if results['scalar'] != results['vectorized']:
+        raise SystemExit("vectorized results differ from the scalar functions")
+
+    print(json.dumps({
+        'dates': args.dates,
+        'scalar_seconds': round(timings['scalar'], 3),
+        'vectorized_seconds': round(timings['vectorized'], 3),
+        'speedup': round(timings['scalar'] / timings['vectorized'], 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dates', type=int, default=1_000_000)
+    main(parser.parse_args())
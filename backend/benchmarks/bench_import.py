@@ -0,0 +1,69 @@
+"""Throughput of POST /api/import/stream for a large synthetic export.
+
+    python benchmarks/bench_import.py --entries 1000000 --format ndjson
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from harness import start_app, stop_app
+
+import server
+
+BODY_CHUNK_BYTES = 64 * 1024
+
+
+def synthetic_entries(count, lines=50):
+    start = date(2000, 1, 2)
+    for i in range(count):
+        work_date = start + timedelta(days=i // lines)
+        week_ending = server.get_week_ending(work_date)
+        yield {
+            'work_date': work_date.isoformat(),
+            'week_ending_date': week_ending.isoformat(),
+            'line_code': f'LINE-{i % lines}',
+            'st_hours': 8,
+            'ot_hours': i % 4,
+            'is_pay_week': server.is_pay_week(week_ending, date(2025, 11, 22)),
+        }
+
+
+def build_body(count, fmt):
+    if fmt == 'ndjson':
+        text = ''.join(json.dumps({'type': 'entry', **entry}) + '\n' for entry in synthetic_entries(count))
+    else:
+        text = json.dumps({'entries': list(synthetic_entries(count))})
+    data = text.encode()
+    return [data[i:i + BODY_CHUNK_BYTES] for i in range(0, len(data), BODY_CHUNK_BYTES)]
+
+
+async def main(args):
+    body = build_body(args.entries, args.format)
+    with tempfile.TemporaryDirectory() as tmp:
+        client = await start_app(Path(tmp) / 'bench.db')
+        try:
+            start = time.perf_counter()
+            response = await client.post('/api/import/stream', params={'format': args.format}, body=body)
+            elapsed = time.perf_counter() - start
+        finally:
+            await stop_app()
+    if response.status_code != 200:
+        raise SystemExit(f"import failed: {response.status_code} {response.body[:200]!r}")
+    print(json.dumps({
+        'format': args.format,
+        'entries': response.json()['entries'],
+        'body_mb': round(sum(map(len, body)) / 1e6, 1),
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(args.entries / elapsed),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=['ndjson', 'json'], default='ndjson')
+    asyncio.run(main(parser.parse_args()))
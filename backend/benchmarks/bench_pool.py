@@ -0,0 +1,75 @@
+"""Before/after latency of the API with and without the connection pool.
+
+"Before" runs with DB_POOL_SIZE=0, which opens a connection per request
+exactly like the handlers used to; "after" uses the pooled connections.
+
+    python benchmarks/bench_pool.py --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from harness import percentiles, start_app, stop_app, timed
+
+LINES = ['VTR', 'GMRC', 'CLP', 'WACR', 'NEGS']
+
+
+def endpoints(week_ending):
+    """(name, request factory) for each existing route exercised"""
+    monday = (date.fromisoformat(week_ending) - timedelta(days=5)).isoformat()
+    return [
+        ('GET /api/week-info', lambda c, i: c.get('/api/week-info', params={'work_date': monday})),
+        ('GET /api/entries', lambda c, i: c.get('/api/entries', params={'week_ending': week_ending})),
+        ('GET /api/weekly-summary', lambda c, i: c.get('/api/weekly-summary', params={'week_ending': week_ending})),
+        ('GET /api/lines', lambda c, i: c.get('/api/lines')),
+        ('GET /api/settings', lambda c, i: c.get('/api/settings')),
+        ('POST /api/entries', lambda c, i: c.post('/api/entries', json_body={
+            'work_date': monday, 'line_code': LINES[i % len(LINES)], 'st_hours': 8, 'ot_hours': i % 3,
+        })),
+    ]
+
+
+async def run_mode(db_path, pool_size, week_ending, requests, concurrency):
+    client = await start_app(db_path, DB_POOL_SIZE=pool_size)
+    try:
+        results = {}
+        for name, factory in endpoints(week_ending):
+            latencies, wall = await timed(lambda i: factory(client, i), requests, concurrency)
+            results[name] = dict(percentiles(latencies), rps=round(requests / wall, 1))
+        return results
+    finally:
+        await stop_app()
+
+
+async def main(args):
+    week_ending = '2025-11-22'
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'bench.db'
+        client = await start_app(db_path)
+        start = date.fromisoformat(week_ending) - timedelta(days=6)
+        for offset in range(7):
+            for line in LINES:
+                await client.post('/api/entries', json_body={
+                    'work_date': (start + timedelta(days=offset)).isoformat(),
+                    'line_code': line, 'st_hours': 8, 'ot_hours': 1,
+                })
+        await stop_app()
+
+        report = {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'before': await run_mode(db_path, 0, week_ending, args.requests, args.concurrency),
+            'after': await run_mode(db_path, args.pool_size, week_ending, args.requests, args.concurrency),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
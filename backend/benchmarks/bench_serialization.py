@@ -0,0 +1,85 @@
+"""Rows/sec of the old model-based list path vs the row-factory fast path.
+
+"Before" is what GET /api/entries used to do per request: fetch tuples,
+build a TimeEntry per row, then let FastAPI run jsonable_encoder and
+JSONResponse over the list. "After" fetches response-ready dicts through
+the row factory and renders them with FastJSONResponse.
+
+    python benchmarks/bench_serialization.py --rows 100000
+"""
+import argparse
+import json
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+import harness  # noqa: F401  (puts backend/ on sys.path)
+
+import server
+from fast_json import FastJSONResponse, orjson
+
+
+def build_table(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE time_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, work_date TEXT, week_ending_date TEXT, line_code TEXT,
+            st_hours INTEGER, ot_hours INTEGER, is_pay_week INTEGER, created_at TEXT, updated_at TEXT
+        )
+    ''')
+    start = date(2000, 1, 2)
+    conn.executemany(
+        'INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week, '
+        'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            ((start + timedelta(days=i // 20)).isoformat(),
+             server.get_week_ending(start + timedelta(days=i // 20)).isoformat(),
+             f'LINE-{i % 20}', 8, i % 4, i % 2, '2025-11-20 10:00:00', '2025-11-20 10:00:00')
+            for i in range(rows)
+        ))
+    return conn
+
+
+def before(conn):
+    rows = conn.execute('SELECT * FROM time_entries').fetchall()
+    entries = [server.entry_from_row(row) for row in rows]
+    return JSONResponse(jsonable_encoder(entries)).body
+
+
+def after(conn):
+    cursor = conn.execute('SELECT * FROM time_entries')
+    cursor.row_factory = server.dict_rows(server.entry_dict)
+    return FastJSONResponse(cursor.fetchall()).body
+
+
+def main(args):
+    conn = build_table(args.rows)
+    results = {}
+    bodies = {}
+    for name, fn in (('before', before), ('after', after)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            bodies[name] = fn(conn)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {'seconds': round(best, 3), 'rows_per_sec': round(args.rows / best)}
+    if bodies['before'] != bodies['after']:
+        raise SystemExit("fast path output differs from the model path")
+
+    print(json.dumps({
+        'rows': args.rows,
+        'encoder': 'orjson' if orjson is not None else 'json',
+        **results,
+        'speedup': round(results['before']['seconds'] / results['after']['seconds'], 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    main(parser.parse_args())
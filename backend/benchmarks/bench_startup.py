@@ -0,0 +1,132 @@
+"""Cold start: time from launching a worker process to its first answered request.
+
+Each run starts a new interpreter that imports the app, runs startup
+against a database and serves GET /api/lines, and reports how long each
+phase took. Databases are either fresh (every migration and the seed run)
+or already current, the usual case for an autoscaled worker. The
+"current, writer busy" case boots while another connection holds the write
+lock, as it would with workers already serving: startup that needs the
+lock waits for it.
+
+    python benchmarks/bench_startup.py --runs 20 --output startup.json
+"""
+import argparse
+import json
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCENARIOS = ('fresh', 'current', 'current, writer busy')
+
+
+def child(db_path):
+    """Run in the worker process: boot, serve one request, print timings"""
+    started = time.perf_counter()
+    import asyncio
+    from harness import start_app, stop_app
+
+    imported = time.perf_counter()
+
+    async def boot():
+        client = await start_app(db_path)
+        booted = time.perf_counter()
+        response = await client.get('/api/lines')
+        answered = time.time()
+        served = time.perf_counter()
+        await stop_app()
+        if response.status_code != 200:
+            raise SystemExit(f"first request failed: {response.status_code}")
+        return booted, served, answered
+
+    booted, served, answered = asyncio.run(boot())
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'startup_ms': (booted - imported) * 1000,
+        'first_request_ms': (served - booted) * 1000,
+        'answered_at': answered,
+    }))
+
+
+def run_worker(db_path):
+    launched = time.time()
+    result = subprocess.run([sys.executable, __file__, '--child', str(db_path)],
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['time_to_first_request_ms'] = (timings.pop('answered_at') - launched) * 1000
+    return timings
+
+
+def summarize(samples):
+    return {
+        key: {'p50_ms': round(statistics.median(s[key] for s in samples), 2),
+              'max_ms': round(max(s[key] for s in samples), 2)}
+        for key in samples[0]
+    }
+
+
+def run_scenario(scenario, tmp, runs, busy_seconds):
+    current = tmp / 'current.db'
+    if scenario != 'fresh' and not current.exists():
+        run_worker(current)
+    samples = []
+    for i in range(runs):
+        if scenario == 'fresh':
+            db_path = tmp / f'fresh-{i}.db'
+            samples.append(run_worker(db_path))
+            continue
+        if scenario == 'current':
+            samples.append(run_worker(current))
+            continue
+        # Hold the write lock from just before the worker starts until well past its imports
+        writer = sqlite3.connect(current, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        release = time.monotonic() + busy_seconds
+        worker = subprocess.Popen([sys.executable, __file__, '--child', str(current)],
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        launched = time.time()
+        time.sleep(max(0.0, release - time.monotonic()))
+        writer.rollback()
+        writer.close()
+        output, errors = worker.communicate()
+        if worker.returncode:
+            raise SystemExit(f"worker failed with {worker.returncode}: {errors[-500:]}")
+        timings = json.loads(output.strip().splitlines()[-1])
+        timings['time_to_first_request_ms'] = (timings.pop('answered_at') - launched) * 1000
+        samples.append(timings)
+    return summarize(samples)
+
+
+def main(args):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        results = {
+            'meta': {'runs': args.runs, 'busy_seconds': args.busy_seconds, 'sqlite': sqlite3.sqlite_version},
+            'scenarios': {scenario: run_scenario(scenario, tmp, args.runs, args.busy_seconds)
+                          for scenario in SCENARIOS},
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help="worker processes started per scenario")
+    parser.add_argument('--busy-seconds', type=float, default=1.5,
+                        help="how long another connection holds the write lock in the busy scenario")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        child(parsed.child)
+    else:
+        main(parsed)
@@ -0,0 +1,99 @@
+"""Synthetic timesheet data shaped like a real export.
+
+Weekdays carry a handful of entries spread over the standard lines and a
+rotating set of project lines, with occasional overtime and weekend work.
+A few fixed-date holidays a year and the odd day of PTO are booked as one
+full-day entry on their own line. Generation is seeded, so every run of a
+benchmark sees the same data.
+"""
+import json
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+import harness  # noqa: F401  (puts backend/ on sys.path)
+
+import server
+
+WORK_LINES = ['VTR', 'GMRC', 'CLP', 'WACR', 'NEGS']
+STANDARD_LINES = WORK_LINES + ['PTO', 'HOLIDAY']
+# (month, day) of the holidays booked when they fall on a weekday
+HOLIDAYS = [(1, 1), (5, 27), (7, 4), (9, 2), (11, 28), (12, 25)]
+# Chance that any other weekday is taken as PTO
+PTO_DAY_RATE = 0.04
+BASE_PAY_WEEK_ENDING = date(2025, 11, 22)
+BODY_CHUNK_BYTES = 64 * 1024
+
+
+def project_line_codes(count: int) -> List[dict]:
+    return [
+        {'line_code': f'P-{n:04d}', 'label': f'Project {n:04d}', 'is_project': True,
+         'is_visible': n % 10 != 0, 'sort_order': 100 + n}
+        for n in range(count)
+    ]
+
+
+def synthetic_entries(start: date, end: date, project_lines: int, lines_per_day: int,
+                      seed: int = 42) -> Iterator[dict]:
+    """Entries for every working day in start..end, in date order"""
+    rng = random.Random(seed)
+    projects = [line['line_code'] for line in project_line_codes(project_lines)]
+    day = start
+    while day <= end:
+        weekend = day.weekday() >= 5
+        week_ending = server.get_week_ending(day)
+        is_pay = server.is_pay_week(week_ending, BASE_PAY_WEEK_ENDING)
+        day_off = None
+        if not weekend:
+            if (day.month, day.day) in HOLIDAYS:
+                day_off = 'HOLIDAY'
+            elif rng.random() < PTO_DAY_RATE:
+                day_off = 'PTO'
+        if day_off:
+            yield {
+                'work_date': day.isoformat(),
+                'week_ending_date': week_ending.isoformat(),
+                'line_code': day_off,
+                'st_hours': 8,
+                'ot_hours': 0,
+                'is_pay_week': is_pay,
+            }
+        elif not weekend or rng.random() < 0.1:
+            count = rng.randint(1, 2) if weekend else rng.randint(max(1, lines_per_day - 2), lines_per_day + 2)
+            # Mostly standard lines, plus a dozen projects drawn afresh each day
+            pool = WORK_LINES + rng.sample(projects, min(len(projects), 12))
+            for line_code in rng.sample(pool, min(count, len(pool))):
+                yield {
+                    'work_date': day.isoformat(),
+                    'week_ending_date': week_ending.isoformat(),
+                    'line_code': line_code,
+                    'st_hours': rng.choice([1, 2, 4, 4, 6, 8, 8, 8]),
+                    'ot_hours': rng.choice([0, 0, 0, 0, 1, 2]),
+                    'is_pay_week': is_pay,
+                }
+        day += timedelta(days=1)
+
+
+def synthetic_dataset(years: int = 5, project_lines: int = 300, lines_per_day: int = 8,
+                      end: date = BASE_PAY_WEEK_ENDING, seed: int = 42) -> Dict[str, list]:
+    """An export-shaped dict: line_codes, settings and entries"""
+    start = end - timedelta(days=365 * years)
+    return {
+        'line_codes': project_line_codes(project_lines),
+        'settings': [
+            {'key': 'base_pay_week_ending', 'value': BASE_PAY_WEEK_ENDING.isoformat()},
+            {'key': 'pay_frequency_days', 'value': '14'},
+        ],
+        'entries': list(synthetic_entries(start, end, project_lines, lines_per_day, seed)),
+    }
+
+
+def ndjson_body(dataset: Dict[str, list]) -> List[bytes]:
+    """The dataset as an NDJSON import body, split into request chunks"""
+    sections = [('line_code', 'line_codes'), ('setting', 'settings'), ('entry', 'entries')]
+    text = ''.join(
+        json.dumps({'type': record_type, **record}) + '\n'
+        for record_type, key in sections for record in dataset[key]
+    )
+    data = text.encode()
+    return [data[i:i + BODY_CHUNK_BYTES] for i in range(0, len(data), BODY_CHUNK_BYTES)]
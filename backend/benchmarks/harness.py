@@ -0,0 +1,148 @@
+"""In-process helpers for driving the API without a live server.
+
+Benchmarks import the FastAPI app directly, point it at a throwaway
+database and call it through a minimal ASGI client, so numbers measure
+the app and SQLite rather than the network.
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import server  # noqa: E402
+
+
+class Response:
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    """Just enough of an HTTP client to call an ASGI app in-process"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, params=None, json_body=None, headers=None, body=None):
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+        # body may be bytes or a list of byte chunks sent as separate messages
+        body_chunks = list(body) if isinstance(body, list) else [body or b'']
+        raw_headers = [(b'host', b'testserver'), (b'content-length', str(sum(map(len, body_chunks))).encode())]
+        if json_body is not None:
+            raw_headers.append((b'content-type', b'application/json'))
+        for key, value in (headers or {}).items():
+            raw_headers.append((key.lower().encode(), value.encode()))
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': urlencode(params or {}, doseq=True).encode(),
+            'headers': raw_headers,
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        response_done = asyncio.Event()
+        status = None
+        response_headers = {}
+        chunks = []
+
+        async def receive():
+            if body_chunks:
+                chunk = body_chunks.pop(0)
+                return {'type': 'http.request', 'body': chunk, 'more_body': bool(body_chunks)}
+            await response_done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                for key, value in message.get('headers', []):
+                    response_headers[key.decode().lower()] = value.decode()
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        return Response(status, response_headers, b''.join(chunks))
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+
+async def start_app(db_path, **config):
+    """Point the app at ``db_path``, apply module-level config and run startup"""
+    server.DB_PATH = Path(db_path)
+    for key, value in config.items():
+        setattr(server, key, value)
+    await server.app.router.startup()
+    return ASGIClient(server.app)
+
+
+async def stop_app():
+    await server.app.router.shutdown()
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99 and mean of a list of latencies in milliseconds"""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {'count': 0}
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(pick(50), 3),
+        'p95_ms': round(pick(95), 3),
+        'p99_ms': round(pick(99), 3),
+    }
+
+
+async def timed(coro_factory, requests, concurrency):
+    """Run ``requests`` calls of ``coro_factory(i)`` with bounded concurrency.
+
+    Returns (latencies in ms, wall clock seconds).
+    """
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await coro_factory(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(f"request {i} failed: {response.status_code} {response.body[:200]!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, time.perf_counter() - start
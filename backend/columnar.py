@@ -0,0 +1,145 @@
+"""Columnar binary export of time entries, as a NumPy .npz archive.
+
+Reporting jobs want arrays of hours by date and line, not millions of JSON
+objects. ``format=columnar`` exports entries as one typed array per column
+in an uncompressed .npz (a zip of .npy files), which ``numpy.load`` maps
+straight to arrays with no text parsing:
+
+    work_day     int32   days since 1970-01-01 (datetime64[D] as integers)
+    line         int16   index into line_codes (int32 past 32767 codes)
+    line_codes   <U      the distinct line codes, sorted
+    st_hours     int16   (int32 or int64 if any value needs it)
+    ot_hours     int16   (likewise)
+    is_pay_week  bool
+    version      int32   0-d, FORMAT_VERSION
+
+Rows are in (work_date, line_code) order. load_columnar() is the reader.
+All of the data is read and checked before the first byte is written, so
+rows that cannot be exported fail the request instead of truncating it.
+"""
+import io
+import zipfile
+from datetime import date, datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import aiosqlite
+import numpy as np
+
+FORMAT_VERSION = 1
+MEDIA_TYPE = 'application/x-npz'
+
+# julianday() of 1970-01-01, day 0 of datetime64[D]
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+LINE_DICTIONARY_SQL = 'SELECT DISTINCT line_code FROM time_entries {where} ORDER BY line_code'
+# julianday() is NULL for dates not in canonical YYYY-MM-DD form; those
+# rows carry the raw work_date for parsing in Python
+COLUMNS_SQL = f'''
+    SELECT CAST(julianday(work_date) - {_UNIX_EPOCH_JULIAN_DAY} AS INTEGER), line_code,
+           IFNULL(st_hours, 0), IFNULL(ot_hours, 0), is_pay_week, work_date
+    FROM time_entries {{where}} ORDER BY work_date, line_code
+'''
+RANGE_WHERE = 'WHERE work_date >= ? AND work_date <= ?'
+_EPOCH = date(1970, 1, 1)
+HOURS_DTYPES = (np.int16, np.int32, np.int64)
+
+
+def _day_number(work_date: str) -> int:
+    try:
+        return (datetime.strptime(work_date, '%Y-%m-%d').date() - _EPOCH).days
+    except (TypeError, ValueError):
+        raise ValueError(f"entry has an unexportable work_date {work_date!r}")
+
+
+def _narrowest(values: np.ndarray) -> np.ndarray:
+    """``values`` in the first of HOURS_DTYPES that holds all of them"""
+    for dtype in HOURS_DTYPES:
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer the zip is written through, so the
+    archive goes out a member at a time rather than as one buffered body"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def read_columns(db: aiosqlite.Connection, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None, chunk_rows: int = 10000) -> Dict[str, np.ndarray]:
+    """Entries (all, or a work_date range) as the export's column arrays.
+    Raises ValueError for an entry whose work_date cannot be read as a date"""
+    where, params = (RANGE_WHERE, (start_date, end_date)) if start_date and end_date else ('', ())
+    async with db.execute(LINE_DICTIONARY_SQL.format(where=where), params) as cursor:
+        line_codes = [row[0] for row in await cursor.fetchall()]
+    codes = {line_code: index for index, line_code in enumerate(line_codes)}
+    line_dtype = np.int16 if len(line_codes) <= np.iinfo(np.int16).max else np.int32
+
+    chunks = []
+    async with db.execute(COLUMNS_SQL.format(where=where), params) as cursor:
+        while True:
+            rows = await cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            days, lines, st_hours, ot_hours, pay, work_dates = zip(*rows)
+            if None in days:
+                days = [_day_number(work_date) if day is None else day for day, work_date in zip(days, work_dates)]
+            chunks.append((
+                np.array(days, dtype=np.int32),
+                np.fromiter(map(codes.__getitem__, lines), dtype=line_dtype, count=len(lines)),
+                # SQLite integers are 64-bit; narrowed once every chunk is in
+                np.array(st_hours, dtype=np.int64),
+                np.array(ot_hours, dtype=np.int64),
+                np.array(pay, dtype=bool),
+            ))
+    names = ('work_day', 'line', 'st_hours', 'ot_hours', 'is_pay_week')
+    dtypes = (np.int32, line_dtype, np.int64, np.int64, bool)
+    columns = {
+        name: np.concatenate([chunk[i] for chunk in chunks]) if chunks else np.empty(0, dtype=dtype)
+        for i, (name, dtype) in enumerate(zip(names, dtypes))
+    }
+    columns['st_hours'] = _narrowest(columns['st_hours'])
+    columns['ot_hours'] = _narrowest(columns['ot_hours'])
+    columns['line_codes'] = np.array(line_codes, dtype=str) if line_codes else np.empty(0, dtype='<U1')
+    columns['version'] = np.array(FORMAT_VERSION, dtype=np.int32)
+    return columns
+
+
+def iter_npz(columns: Dict[str, np.ndarray]) -> Iterator[bytes]:
+    """Yield an uncompressed .npz of ``columns``, one member at a time"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, array in columns.items():
+            with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                np.lib.format.write_array(member, array, allow_pickle=False)
+            yield sink.take()
+    yield sink.take()
+
+
+def load_columnar(source: Union[str, BinaryIO, bytes]) -> Dict[str, np.ndarray]:
+    """Read a columnar export into its arrays, plus ``work_date`` as
+    datetime64[D] and ``line_code`` with the dictionary applied"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with np.load(source, allow_pickle=False) as archive:
+        columns = {name: archive[name] for name in archive.files}
+    version = int(columns.get('version', -1))
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported columnar export version {version}")
+    columns['work_date'] = columns['work_day'].astype('datetime64[D]')
+    columns['line_code'] = columns['line_codes'][columns['line']]
+    return columns
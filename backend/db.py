@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional, Union
+
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+from metrics import (DB_CONNECTIONS_IN_USE, DB_CONNECTIONS_OPEN, DB_QUERY_DURATION, DB_TRANSACTIONS,
+                     statement_label)
+from slow_queries import SlowQueryLog
+
+logger = logging.getLogger(__name__)
+
+
+class TimedCursor(aiosqlite.Cursor):
+    """Cursor that adds up the time SQLite spends on its statement, from
+    execute through every fetch, and records it once the rows run out or
+    the cursor is closed.
+
+    Only time inside execute and fetch calls counts, not the caller's time
+    between fetches (a streaming export waiting on its client, say). Most
+    of a big read happens in the fetches: execute only steps to the first row.
+    """
+
+    def __init__(self, conn: 'InstrumentedConnection', cursor: sqlite3.Cursor, sql: str, parameters,
+                 elapsed: float):
+        super().__init__(conn, cursor)
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = elapsed
+        self._recorded = False
+
+    async def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return await fetch(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    async def fetchone(self):
+        row = await self._timed(super().fetchone)
+        if row is None:
+            await self._record()
+        return row
+
+    async def fetchmany(self, size: Optional[int] = None):
+        rows = await self._timed(super().fetchmany, *(() if size is None else (size,)))
+        # sqlite3 returns a short batch only once the rows have run out
+        if len(rows) < (self.arraysize if size is None else size):
+            await self._record()
+        return rows
+
+    async def fetchall(self):
+        rows = await self._timed(super().fetchall)
+        await self._record()
+        return rows
+
+    async def close(self):
+        await self._record()
+        await super().close()
+
+    async def _record(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        await self._conn._record_statement(self._sql, self._parameters, self._elapsed)
+
+
+class InstrumentedConnection(aiosqlite.Connection):
+    """aiosqlite connection that times statements and counts transactions"""
+
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    @contextmanager
+    async def execute(self, sql, parameters=None):
+        start = time.perf_counter()
+        try:
+            cursor = await super().execute(sql, parameters)
+        except BaseException:
+            DB_QUERY_DURATION.observe(time.perf_counter() - start, statement_label(sql))
+            raise
+        timed = TimedCursor(self, cursor._cursor, sql, parameters, time.perf_counter() - start)
+        if cursor.description is None:
+            # No rows to fetch: the statement has finished
+            await timed._record()
+        return timed
+
+    async def _record_statement(self, sql, parameters, elapsed: float):
+        DB_QUERY_DURATION.observe(elapsed, statement_label(sql))
+        if self.slow_query_log is not None and elapsed >= self.slow_query_log.threshold:
+            await self.slow_query_log.record(self, sql, parameters, elapsed)
+
+    @contextmanager
+    async def executemany(self, sql, parameters):
+        start = time.perf_counter()
+        try:
+            cursor = await super().executemany(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERY_DURATION.observe(elapsed, statement_label(sql))
+        if self.slow_query_log is not None and elapsed >= self.slow_query_log.threshold:
+            # Only a list can be looked at again once executemany has consumed it
+            rows = parameters if isinstance(parameters, list) else []
+            await self.slow_query_log.record(self, sql, rows[0] if rows else None, elapsed, many=len(rows))
+        return cursor
+
+    async def commit(self):
+        in_transaction = self.in_transaction
+        await super().commit()
+        if in_transaction:
+            DB_TRANSACTIONS.inc('commit')
+
+    async def rollback(self):
+        in_transaction = self.in_transaction
+        await super().rollback()
+        if in_transaction:
+            DB_TRANSACTIONS.inc('rollback')
+
+
+class ConnectionPool:
+    """Fixed-size pool of aiosqlite connections to one database file.
+
+    Connections are opened once in the app startup hook and handed out to
+    request handlers through ``acquire()``. A ``size`` of 0 disables pooling
+    and opens a fresh connection per acquire (the old per-request behaviour).
+    ``query_only`` connections refuse to write.
+    """
+
+    def __init__(self, path: Union[str, Path], size: int = 4, busy_timeout_ms: int = 5000,
+                 slow_query_log: Optional[SlowQueryLog] = None, query_only: bool = False):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.slow_query_log = slow_query_log
+        self.query_only = query_only
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _connect(self) -> aiosqlite.Connection:
+        path, timeout = str(self.path), self.busy_timeout_ms / 1000
+        db = await InstrumentedConnection(lambda: sqlite3.connect(path, timeout=timeout), iter_chunk_size=64)
+        DB_CONNECTIONS_OPEN.inc()
+        db.slow_query_log = self.slow_query_log
+        await db.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        # WAL lets readers run alongside the writer; NORMAL sync is safe in WAL mode
+        await db.execute('PRAGMA journal_mode = WAL')
+        await db.execute('PRAGMA synchronous = NORMAL')
+        if self.query_only:
+            await db.execute('PRAGMA query_only = ON')
+        return db
+
+    async def open(self):
+        """Open all pooled connections"""
+        for _ in range(self.size):
+            db = await self._connect()
+            self._connections.append(db)
+            self._idle.put_nowait(db)
+        logger.info("Opened %d database connections (busy timeout %dms)", self.size, self.busy_timeout_ms)
+
+    async def close(self):
+        """Close all pooled connections"""
+        for db in self._connections:
+            await self._close(db)
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+
+    async def _close(self, db: aiosqlite.Connection):
+        try:
+            await db.close()
+        finally:
+            DB_CONNECTIONS_OPEN.dec()
+
+    async def _release(self, db: aiosqlite.Connection, failed: bool = False):
+        try:
+            # Never hand a half-finished transaction to the next request. After
+            # an error or cancellation a statement such as BEGIN may still be
+            # queued on the connection's thread, so in_transaction cannot be
+            # trusted yet; the rollback is queued behind it and sees the result.
+            if failed or db.in_transaction:
+                await db.rollback()
+        except Exception:
+            logger.exception("Discarding broken database connection")
+            self._connections.remove(db)
+            await self._close(db)
+            db = await self._connect()
+            self._connections.append(db)
+        self._idle.put_nowait(db)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection for the duration of the block"""
+        if self.size == 0:
+            db = await self._connect()
+            DB_CONNECTIONS_IN_USE.inc()
+            try:
+                yield db
+            finally:
+                DB_CONNECTIONS_IN_USE.dec()
+                await self._close(db)
+            return
+
+        db = await self._idle.get()
+        DB_CONNECTIONS_IN_USE.inc()
+        failed = True
+        try:
+            yield db
+            failed = False
+        finally:
+            DB_CONNECTIONS_IN_USE.dec()
+            await self._release(db, failed)
+
+    def acquire_read(self):
+        """Borrow a connection for reading; a plain pool serves both alike"""
+        return self.acquire()
+
+
+class ReadWritePool:
+    """One writer connection plus a pool of query-only readers.
+
+    In WAL mode each reader sees the snapshot committed when its read began
+    and never waits for the writer, so long reads such as exports run
+    alongside a steady stream of writes. Writes queue for the single writer
+    connection here instead of contending for SQLite's write lock (and its
+    busy timeout) across connections. ``acquire()`` borrows the writer, so
+    code written against ConnectionPool keeps writing through it;
+    ``acquire_read()`` borrows a reader.
+    """
+
+    def __init__(self, path: Union[str, Path], readers: int = 4, busy_timeout_ms: int = 5000,
+                 slow_query_log: Optional[SlowQueryLog] = None):
+        self.path = path
+        self.writer = ConnectionPool(path, size=1, busy_timeout_ms=busy_timeout_ms, slow_query_log=slow_query_log)
+        self.readers = ConnectionPool(path, size=readers, busy_timeout_ms=busy_timeout_ms,
+                                      slow_query_log=slow_query_log, query_only=True)
+
+    @property
+    def size(self) -> int:
+        """Reader connections, not counting the writer"""
+        return self.readers.size
+
+    async def open(self):
+        # The writer first: it switches the file to WAL before any reader opens
+        await self.writer.open()
+        await self.readers.open()
+
+    async def close(self):
+        await self.readers.close()
+        await self.writer.close()
+
+    def acquire(self):
+        """Borrow the writer connection for the duration of the block"""
+        return self.writer.acquire()
+
+    def acquire_read(self):
+        """Borrow a query-only connection for the duration of the block"""
+        return self.readers.acquire()
@@ -0,0 +1,30 @@
+"""JSON encoding for list endpoints that skip Pydantic.
+
+Routes on the fast path build plain dicts straight from SQLite rows (see
+the row factories in server.py) and return them in a FastJSONResponse,
+so FastAPI neither validates response models nor walks the result with
+jsonable_encoder. The bytes are the same as JSONResponse would produce.
+orjson is used when installed; otherwise the stdlib encoder with
+JSONResponse's own settings.
+"""
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON for plain dicts, lists, strings, numbers, bools and None"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,376 @@
+import asyncio
+import json
+import logging
+from datetime import date, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+import week_calendar
+from revisions import bump_revisions, log_changes, next_revision, resume_revision_triggers, suspend_revision_triggers
+from rollups import rebuild_rollups_range, resume_rollup_triggers, suspend_rollup_triggers
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written per executemany call
+IMPORT_CHUNK_ROWS = 5000
+
+# A single JSON value larger than this is treated as malformed input
+MAX_PENDING_CHARS = 1 << 20
+
+ENTRY_IMPORT_SQL = '''
+    INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(work_date, line_code) DO UPDATE SET
+        st_hours = excluded.st_hours,
+        ot_hours = excluded.ot_hours,
+        week_ending_date = excluded.week_ending_date,
+        is_pay_week = excluded.is_pay_week,
+        updated_at = CURRENT_TIMESTAMP
+'''
+LINE_CODE_IMPORT_SQL = '''
+    INSERT OR REPLACE INTO line_codes (line_code, label, is_project, is_visible, sort_order)
+    VALUES (?, ?, ?, ?, ?)
+'''
+SETTING_IMPORT_SQL = 'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)'
+
+# Record type -> key holding its list in the JSON export document
+EXPORT_SECTIONS = {'line_codes': 'line_code', 'settings': 'setting', 'entries': 'entry'}
+RECORD_TABLES = {'line_code': 'line_codes', 'setting': 'settings', 'entry': 'time_entries'}
+
+Record = Tuple[str, dict]
+
+
+class ImportValidationError(ValueError):
+    """A record in the import could not be parsed or validated"""
+
+    def __init__(self, record_number: int, message: str):
+        super().__init__(f"record {record_number}: {message}")
+        self.record_number = record_number
+
+
+# Incremental parsers: both take decoded text chunks and yield, per chunk,
+# the list of (type, record) pairs it completed
+
+async def iter_ndjson_records(chunks: AsyncIterator[str]) -> AsyncIterator[List[Record]]:
+    """Records from an NDJSON export (one object with a 'type' per line)"""
+    pending = ''
+    line_number = 0
+    async for chunk in chunks:
+        pending += chunk
+        lines = pending.split('\n')
+        pending = lines.pop()
+        if len(pending) > MAX_PENDING_CHARS:
+            raise ImportValidationError(line_number + len(lines) + 1, "line too long")
+        records = []
+        for line in lines:
+            line_number += 1
+            record = _parse_ndjson_line(line, line_number)
+            if record is not None:
+                records.append(record)
+        yield records
+    if pending.strip():
+        record = _parse_ndjson_line(pending, line_number + 1)
+        if record is not None:
+            yield [record]
+
+
+def _parse_ndjson_line(line: str, line_number: int) -> Optional[Record]:
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise ImportValidationError(line_number, f"invalid JSON ({e})")
+    if not isinstance(record, dict):
+        raise ImportValidationError(line_number, "expected a JSON object")
+    record_type = record.pop('type', None)
+    if record_type == 'export':
+        return None
+    return record_type, record
+
+
+class JSONExportParser:
+    """Incremental parser for the ``{"line_codes": [...], "entries": [...]}`` export.
+
+    ``feed()`` accepts arbitrary slices of the document and returns the
+    list elements completed so far, so only one element is ever buffered
+    rather than the whole document. Top-level keys other than the export
+    sections are skipped, as ``POST /import`` skips them.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._state = 'start'
+        self._section: Optional[str] = None
+
+    def feed(self, text: str, final: bool = False) -> List[Record]:
+        self._buffer += text
+        records = []
+        pos = self._step(records, final)
+        self._buffer = self._buffer[pos:]
+        if len(self._buffer) > MAX_PENDING_CHARS:
+            raise ImportValidationError(0, "JSON value too large")
+        if final and (self._state != 'done' or self._buffer.strip()):
+            raise ImportValidationError(0, "truncated or malformed JSON document")
+        return records
+
+    def _skip_ws(self, pos: int) -> int:
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        return pos
+
+    def _decode(self, pos: int, final: bool):
+        """Decode one value at pos; None if it may continue in the next chunk"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except ValueError:
+            if final:
+                raise ImportValidationError(0, "malformed JSON document")
+            return None
+        # A number at the very end of the buffer may still have digits to come
+        if end == len(self._buffer) and not final:
+            return None
+        return value, end
+
+    def _step(self, records: List[Record], final: bool) -> int:
+        pos = 0
+        buffer = self._buffer
+        while True:
+            pos = self._skip_ws(pos)
+            if pos >= len(buffer):
+                return pos
+            char = buffer[pos]
+            if self._state == 'start':
+                if char != '{':
+                    raise ImportValidationError(0, "expected a JSON object")
+                self._state = 'key'
+                pos += 1
+            elif self._state == 'key':
+                if char == '}':
+                    self._state = 'done'
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    return pos
+                key, pos = decoded
+                self._section = EXPORT_SECTIONS.get(key)
+                self._state = 'colon'
+            elif self._state == 'colon':
+                if char != ':':
+                    raise ImportValidationError(0, "expected ':'")
+                self._state = 'value'
+                pos += 1
+            elif self._state == 'value':
+                if char == '[':
+                    self._state = 'array'
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    return pos
+                pos = decoded[1]
+                self._state = 'after_value'
+            elif self._state == 'array':
+                if char == ']':
+                    self._state = 'after_value'
+                    pos += 1
+                    continue
+                if char == ',':
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    return pos
+                value, pos = decoded
+                if self._section is not None:
+                    records.append((self._section, value))
+            elif self._state == 'after_value':
+                if char == ',':
+                    self._state = 'key'
+                elif char == '}':
+                    self._state = 'done'
+                else:
+                    raise ImportValidationError(0, "expected ',' or '}'")
+                pos += 1
+            else:
+                raise ImportValidationError(0, "unexpected data after JSON document")
+
+
+async def iter_json_export_records(chunks: AsyncIterator[str]) -> AsyncIterator[List[Record]]:
+    parser = JSONExportParser()
+    async for chunk in chunks:
+        yield parser.feed(chunk)
+    yield parser.feed('', final=True)
+
+
+async def iter_export_dict_records(data: dict) -> AsyncIterator[List[Record]]:
+    """Records from an already-parsed export document"""
+    for section, record_type in EXPORT_SECTIONS.items():
+        yield [(record_type, record) for record in data.get(section) or []]
+
+
+# Validation: each returns the parameter tuple for its import statement
+
+def _entry_params(record: dict) -> tuple:
+    # Dates are checked a chunk at a time by _check_entry_dates()
+    work_date = record['work_date']
+    week_ending = record['week_ending_date']
+    # The columns are nullable; null hours import as 0, as the rollups count them
+    st_hours = record.get('st_hours')
+    ot_hours = record.get('ot_hours')
+    st_hours = 0 if st_hours is None else st_hours
+    ot_hours = 0 if ot_hours is None else ot_hours
+    if type(st_hours) is not int or type(ot_hours) is not int:
+        raise ValueError("hours must be integers")
+    return (work_date, week_ending, str(record['line_code']), st_hours, ot_hours,
+            int(bool(record.get('is_pay_week', False))))
+
+
+def _line_code_params(record: dict) -> tuple:
+    line_code = str(record['line_code'])
+    return (line_code, str(record.get('label') or line_code), int(bool(record.get('is_project', False))),
+            int(bool(record.get('is_visible', True))), int(record.get('sort_order', 0)))
+
+
+def _setting_params(record: dict) -> tuple:
+    return str(record['key']), str(record['value'])
+
+
+def _check_entry_dates(rows: List[tuple], record_numbers: List[int]):
+    """Validate the dates of a chunk of entry rows in one vectorized pass.
+
+    Both dates must be YYYY-MM-DD and week_ending_date must be the Saturday
+    ending work_date's week, as the rest of the app assumes.
+    """
+    work_days, work_valid = week_calendar.parse_dates([row[0] for row in rows])
+    week_days, week_valid = week_calendar.parse_dates([row[1] for row in rows])
+    ok = work_valid & week_valid
+    ok[ok] = week_calendar.week_endings(work_days[ok]) == week_days[ok]
+    if not ok.all():
+        index = int(ok.argmin())
+        if work_valid[index] and week_valid[index]:
+            detail = f"week_ending_date {rows[index][1]} does not end the week of {rows[index][0]}"
+        else:
+            detail = "dates must be YYYY-MM-DD"
+        raise ImportValidationError(record_numbers[index], f"invalid entry: {detail}")
+
+
+RECORD_TYPES: Dict[str, Tuple[Callable[[dict], tuple], str]] = {
+    'line_code': (_line_code_params, LINE_CODE_IMPORT_SQL),
+    'setting': (_setting_params, SETTING_IMPORT_SQL),
+    'entry': (_entry_params, ENTRY_IMPORT_SQL),
+}
+# Each record type's change log key (see revisions.log_changes), from its parameter tuple
+RECORD_KEYS: Dict[str, Callable[[tuple], object]] = {
+    'line_code': lambda params: params[0],
+    'setting': lambda params: params[0],
+    'entry': lambda params: (params[0], params[2]),
+}
+
+
+async def import_records(db: aiosqlite.Connection, batches: AsyncIterator[List[Record]],
+                         chunk_rows: int = IMPORT_CHUNK_ROWS,
+                         progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """Validate and write records in bounded chunks inside one transaction.
+
+    ``batches`` yields lists of (type, record) pairs, as produced by the
+    iter_* parsers above. Each full chunk is handed to SQLite while the
+    next one is parsed, with at most one write in flight. Rollup and
+    revision triggers are dropped meanwhile (the transaction holds the
+    write lock, so no other writer misses them): each chunk logs its own
+    keys in change_log, and the touched weeks are rebuilt and their
+    revisions bumped once at the end.
+    Everything is rolled back if any record is invalid or a write fails.
+    Returns the number of rows imported per record type plus ``chunks``.
+    """
+    counts = {record_type: 0 for record_type in RECORD_TYPES}
+    counts['chunks'] = 0
+    buffers: Dict[str, list] = {record_type: [] for record_type in RECORD_TYPES}
+    in_flight = None
+    # Record numbers of the buffered entries, for date errors found at flush time
+    entry_record_numbers: List[int] = []
+    # Earliest and latest dates seen in imported entries, to bound the rollup rebuild
+    entry_dates: List[str] = []
+    # The revision every written key is logged at, taken before the first write
+    rev = None
+
+    async def write(record_type: str, rows: List[tuple]):
+        await db.executemany(RECORD_TYPES[record_type][1], rows)
+        key = RECORD_KEYS[record_type]
+        await log_changes(db, record_type, [key(row) for row in rows], rev)
+
+    async def wait_for_write():
+        nonlocal in_flight
+        if in_flight is not None:
+            task, record_type, rows = in_flight
+            in_flight = None
+            await task
+            counts[record_type] += rows
+            counts['chunks'] += 1
+            if progress is not None:
+                progress(counts)
+
+    async def flush(record_type: str):
+        nonlocal in_flight, rev
+        rows = buffers[record_type]
+        if rows:
+            buffers[record_type] = []
+            if record_type == 'entry':
+                _check_entry_dates(rows, entry_record_numbers)
+                entry_record_numbers.clear()
+                entry_dates.extend((min(min(row[0], row[1]) for row in rows),
+                                    max(max(row[0], row[1]) for row in rows)))
+            await wait_for_write()
+            if rev is None:
+                rev = await next_revision(db)
+            task = asyncio.ensure_future(write(record_type, rows))
+            in_flight = (task, record_type, len(rows))
+
+    await db.execute('BEGIN IMMEDIATE')
+    try:
+        rollup_triggers = await suspend_rollup_triggers(db)
+        revision_triggers = await suspend_revision_triggers(db)
+        record_number = 0
+        async for batch in batches:
+            for record_type, record in batch:
+                record_number += 1
+                if record_type not in RECORD_TYPES:
+                    raise ImportValidationError(record_number, f"unknown record type {record_type!r}")
+                if not isinstance(record, dict):
+                    raise ImportValidationError(record_number, "expected a JSON object")
+                try:
+                    params = RECORD_TYPES[record_type][0](record)
+                except (KeyError, TypeError, ValueError) as e:
+                    detail = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+                    raise ImportValidationError(record_number, f"invalid {record_type}: {detail}")
+                buffer = buffers[record_type]
+                buffer.append(params)
+                if record_type == 'entry':
+                    entry_record_numbers.append(record_number)
+                if len(buffer) >= chunk_rows:
+                    await flush(record_type)
+        for record_type in RECORD_TYPES:
+            await flush(record_type)
+        await wait_for_write()
+        await resume_rollup_triggers(db, rollup_triggers)
+        await resume_revision_triggers(db, revision_triggers)
+        tables = [table for record_type, table in RECORD_TABLES.items() if counts[record_type]]
+        if entry_dates:
+            # An updated entry may have moved out of a week ending up to 6 days later
+            weeks = (min(entry_dates), (date.fromisoformat(max(entry_dates)) + timedelta(days=6)).isoformat())
+            await rebuild_rollups_range(db, *weeks)
+            await bump_revisions(db, *tables, weeks=weeks, rev=rev)
+        elif tables:
+            await bump_revisions(db, *tables, rev=rev)
+        await db.commit()
+    except BaseException:
+        if in_flight is not None:
+            # Let the queued write finish before rolling it back
+            await asyncio.gather(in_flight[0], return_exceptions=True)
+        await db.rollback()
+        raise
+    return counts
@@ -0,0 +1,215 @@
+"""Prometheus metrics in the text exposition format, without the client library.
+
+Counters, gauges and histograms keep their samples in plain dicts keyed by
+the tuple of label values. Everything runs on the event loop thread, so
+updating a metric is a dict lookup and an add, with no locking. GET
+/metrics renders REGISTRY.
+"""
+import hashlib
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Set, Tuple
+
+# Seconds; spans a sub-millisecond indexed lookup to a multi-second export
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List['_Metric'] = []
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0
+        registry.metrics.append(self)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+        self._values.clear()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = [*map(_format_value, self.buckets), '+Inf']
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket'
+                             f'{_label_text(self.labelnames + ("le",), labels + (bound,))} {cumulative}')
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    'timewizard_http_request_duration_seconds', 'HTTP request latency, including streamed bodies',
+    ('method', 'route', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = Gauge('timewizard_http_requests_in_flight', 'HTTP requests being handled')
+DB_QUERY_DURATION = Histogram(
+    'timewizard_db_query_duration_seconds', 'SQLite statement time, from execute through the last row fetched',
+    ('statement',))
+DB_SLOW_QUERIES = Counter(
+    'timewizard_db_slow_queries_total', 'SQLite statements over the slow query threshold', ('statement',))
+DB_CONNECTIONS_OPEN = Gauge('timewizard_db_connections_open', 'Open SQLite connections')
+DB_CONNECTIONS_IN_USE = Gauge('timewizard_db_connections_in_use', 'SQLite connections borrowed from the pool')
+DB_TRANSACTIONS = Counter('timewizard_db_transactions_total', 'Finished SQLite transactions', ('outcome',))
+TENANTS_OPEN = Gauge('timewizard_tenants_open', 'Tenant databases currently open')
+EXPORT_ROWS = Counter('timewizard_export_rows_total', 'Rows written by /api/export', ('format', 'type'))
+IMPORT_ROWS = Counter('timewizard_import_rows_total', 'Rows written by /api/import', ('type',))
+
+# Distinct statement labels; anything past this is counted as "other" so a
+# dynamically built query cannot grow the series without bound
+MAX_STATEMENT_LABELS = 500
+# Longer labels keep their start plus a hash of the whole statement
+MAX_STATEMENT_LABEL_LENGTH = 200
+# SQL string -> label, for at most this many strings
+MAX_CACHED_STATEMENTS = 2000
+_statement_labels: Dict[str, str] = {}
+_distinct_labels: Set[str] = set()
+
+# Runs of identical "(?, ?), (?, ?)" row groups after VALUES, and "IN (?, ?, ?)"
+# lists, which would otherwise make one label per batch or list size
+_VALUES_GROUPS_RE = re.compile(r'(\bVALUES (\([^()]*\)))(?:, \2)+', re.IGNORECASE)
+_IN_LIST_RE = re.compile(r'\bIN \(\?(?:, \?)+\)', re.IGNORECASE)
+
+
+def normalize_statement(sql: str) -> str:
+    """The statement with whitespace collapsed, repeated VALUES groups cut to
+    one, IN lists to "(?, ...)", and its length capped"""
+    text = ' '.join(sql.split())
+    text = _VALUES_GROUPS_RE.sub(r'\1', text)
+    text = _IN_LIST_RE.sub('IN (?, ...)', text)
+    if len(text) > MAX_STATEMENT_LABEL_LENGTH:
+        digest = hashlib.sha1(text.encode()).hexdigest()[:8]
+        text = f'{text[:MAX_STATEMENT_LABEL_LENGTH - 14]} ... #{digest}'
+    return text
+
+
+def statement_label(sql: str) -> str:
+    """normalize_statement(sql), or 'other' once MAX_STATEMENT_LABELS distinct labels are in use"""
+    label = _statement_labels.get(sql)
+    if label is None:
+        label = normalize_statement(sql)
+        if label not in _distinct_labels:
+            if len(_distinct_labels) >= MAX_STATEMENT_LABELS:
+                return 'other'
+            _distinct_labels.add(label)
+        if len(_statement_labels) < MAX_CACHED_STATEMENTS:
+            _statement_labels[sql] = label
+    return label
+
+
+class MetricsMiddleware:
+    """Times each HTTP request and labels it by route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # FastAPI records the matched route in the scope while routing
+            route = scope.get('route')
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, scope['method'],
+                                          route.path if route is not None else 'unmatched', str(status))
@@ -0,0 +1,399 @@
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, Union
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# A step is either a SQL statement or an async callable taking the connection
+Step = Union[str, Callable[[aiosqlite.Connection], Awaitable[None]]]
+
+
+# A change log row: (entity, key expression, deleted, optional condition),
+# expressions evaluated against NEW/OLD
+Change = Tuple[str, str, int, Optional[str]]
+
+
+def _revision_trigger(table: str, event: str, scopes: List[str], changes: Sequence[Change] = ()) -> str:
+    """Trigger bumping the 'database' revision and stamping it on each scope
+    expression in ``scopes`` (evaluated against NEW/OLD) and on each row of
+    ``changes`` in the change log"""
+    stamps = '\n            UNION ALL '.join(
+        f"SELECT {scope}, rev FROM revisions WHERE scope = 'database'" for scope in scopes
+    )
+    log = ''
+    if changes:
+        rows = '\n            UNION ALL '.join(
+            f"SELECT '{entity}', {key}, rev, {deleted} FROM revisions WHERE scope = 'database'"
+            + (f' AND ({condition})' if condition else '')
+            for entity, key, deleted, condition in changes
+        )
+        log = f'''
+            INSERT INTO change_log (entity, key, rev, deleted)
+            {rows}
+            ON CONFLICT (entity, key) DO UPDATE SET rev = excluded.rev, deleted = excluded.deleted;'''
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS trg_revisions_{table}_{event.lower()} AFTER {event} ON {table}
+        WHEN NOT EXISTS (SELECT 1 FROM trigger_control WHERE name = 'revisions')
+        BEGIN
+            UPDATE revisions SET rev = rev + 1 WHERE scope = 'database';
+            INSERT INTO revisions (scope, rev)
+            {stamps}
+            ON CONFLICT (scope) DO UPDATE SET rev = excluded.rev;{log}
+        END
+        '''
+
+
+# Change log keys: entries by their natural key, as a JSON [work_date, line_code]
+_ENTRY_KEY = 'json_array({row}.work_date, {row}.line_code)'
+_CHANGE_LOG_KEYS = {'time_entries': ('entry', _ENTRY_KEY), 'line_codes': ('line_code', '{row}.line_code'),
+                    'settings': ('setting', '{row}.key')}
+_REVISION_SCOPES = {
+    ('time_entries', 'INSERT'): ["'time_entries'", "'week:' || NEW.week_ending_date"],
+    ('time_entries', 'UPDATE'): ["'time_entries'", "'week:' || OLD.week_ending_date", "'week:' || NEW.week_ending_date"],
+    ('time_entries', 'DELETE'): ["'time_entries'", "'week:' || OLD.week_ending_date"],
+    **{(table, event): [f"'{table}'"] for table in ('line_codes', 'settings') for event in ('INSERT', 'UPDATE', 'DELETE')},
+}
+
+
+def _period_rollup_steps(table: str, period: str, length: int) -> List[str]:
+    """Table, triggers and backfill for a per-line rollup of time_entries
+    keyed on the first ``length`` characters of work_date"""
+    old_key = f'substr(OLD.work_date, 1, {length})'
+    new_key = f'substr(NEW.work_date, 1, {length})'
+    gate = "WHEN NOT EXISTS (SELECT 1 FROM trigger_control WHERE name = 'rollups')"
+    subtract = f'''
+            UPDATE {table}
+            SET st_hours = st_hours - IFNULL(OLD.st_hours, 0), ot_hours = ot_hours - IFNULL(OLD.ot_hours, 0),
+                entries = entries - 1
+            WHERE {period} = {old_key} AND line_code = OLD.line_code;
+            DELETE FROM {table} WHERE {period} = {old_key} AND line_code = OLD.line_code AND entries <= 0;'''
+    add = f'''
+            INSERT INTO {table} ({period}, line_code, st_hours, ot_hours, entries)
+            VALUES ({new_key}, NEW.line_code, IFNULL(NEW.st_hours, 0), IFNULL(NEW.ot_hours, 0), 1)
+            ON CONFLICT ({period}, line_code) DO UPDATE SET
+                st_hours = st_hours + excluded.st_hours,
+                ot_hours = ot_hours + excluded.ot_hours,
+                entries = entries + 1;'''
+    return [
+        f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            {period} TEXT NOT NULL,
+            line_code TEXT NOT NULL,
+            st_hours INTEGER NOT NULL DEFAULT 0,
+            ot_hours INTEGER NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({period}, line_code)
+        ) WITHOUT ROWID
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON time_entries
+        {gate}
+        BEGIN{add}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON time_entries
+        {gate}
+        BEGIN{subtract}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+        AFTER UPDATE OF work_date, line_code, st_hours, ot_hours ON time_entries
+        {gate}
+        BEGIN{subtract}{add}
+        END
+        ''',
+        # Backfill from the entries already stored
+        f'''
+        INSERT INTO {table} ({period}, line_code, st_hours, ot_hours, entries)
+        SELECT substr(work_date, 1, {length}), line_code, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+        FROM time_entries GROUP BY substr(work_date, 1, {length}), line_code
+        ''',
+    ]
+
+
+def _change_log_steps() -> List[str]:
+    """Recreate each revision trigger so the same trigger also logs the row's change"""
+    steps = []
+    for (table, event), scopes in _REVISION_SCOPES.items():
+        entity, key = _CHANGE_LOG_KEYS[table]
+        if event == 'INSERT':
+            changes = [(entity, key.format(row='NEW'), 0, None)]
+        elif event == 'DELETE':
+            changes = [(entity, key.format(row='OLD'), 1, None)]
+        else:
+            # A key change is a delete of the old key plus a write of the new one
+            changes = [(entity, key.format(row='OLD'), 1, f"{key.format(row='OLD')} IS NOT {key.format(row='NEW')}"),
+                       (entity, key.format(row='NEW'), 0, None)]
+        steps.append(f'DROP TRIGGER IF EXISTS trg_revisions_{table}_{event.lower()}')
+        steps.append(_revision_trigger(table, event, scopes, changes))
+    return steps
+
+
+# Ordered schema migrations: (version, description, steps).
+# The database's PRAGMA user_version records the last version applied.
+# Never edit a migration once it has shipped - append a new one instead.
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, 'baseline schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS time_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_date TEXT NOT NULL,
+            week_ending_date TEXT NOT NULL,
+            line_code TEXT NOT NULL,
+            st_hours INTEGER DEFAULT 0,
+            ot_hours INTEGER DEFAULT 0,
+            is_pay_week INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(work_date, line_code)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS line_codes (
+            line_code TEXT PRIMARY KEY,
+            label TEXT NOT NULL,
+            is_project INTEGER DEFAULT 0,
+            is_visible INTEGER DEFAULT 1,
+            sort_order INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, 'time_entries week and date-range indexes', [
+        # Week lookups (/entries?week_ending, /weekly-summary) in display order,
+        # covering the summary columns so aggregation never touches the table
+        '''
+        CREATE INDEX IF NOT EXISTS idx_time_entries_week
+        ON time_entries (week_ending_date, work_date, line_code, st_hours, ot_hours, is_pay_week)
+        ''',
+        # Date-range lookups (/entries?start_date, /export?start_date); covers
+        # range aggregates, while SELECT * can also use the UNIQUE index
+        '''
+        CREATE INDEX IF NOT EXISTS idx_time_entries_date
+        ON time_entries (work_date, line_code, week_ending_date, st_hours, ot_hours, is_pay_week)
+        ''',
+    ]),
+    (3, 'weekly_rollups maintained by time_entries triggers', [
+        # Bulk writers insert a row here inside their transaction to switch the
+        # rollup triggers off, then rebuild the affected rollups set-based
+        '''
+        CREATE TABLE IF NOT EXISTS trigger_control (
+            name TEXT PRIMARY KEY
+        ) WITHOUT ROWID
+        ''',
+        # Per week: one 'day' row per work_date and one 'line' row per line_code
+        '''
+        CREATE TABLE IF NOT EXISTS weekly_rollups (
+            week_ending_date TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            st_hours INTEGER NOT NULL DEFAULT 0,
+            ot_hours INTEGER NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (week_ending_date, kind, key)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_weekly_rollups_insert AFTER INSERT ON time_entries
+        WHEN NOT EXISTS (SELECT 1 FROM trigger_control WHERE name = 'rollups')
+        BEGIN
+            INSERT INTO weekly_rollups (week_ending_date, kind, key, st_hours, ot_hours, entries)
+            VALUES (NEW.week_ending_date, 'day', NEW.work_date, IFNULL(NEW.st_hours, 0), IFNULL(NEW.ot_hours, 0), 1),
+                   (NEW.week_ending_date, 'line', NEW.line_code, IFNULL(NEW.st_hours, 0), IFNULL(NEW.ot_hours, 0), 1)
+            ON CONFLICT (week_ending_date, kind, key) DO UPDATE SET
+                st_hours = st_hours + excluded.st_hours,
+                ot_hours = ot_hours + excluded.ot_hours,
+                entries = entries + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_weekly_rollups_delete AFTER DELETE ON time_entries
+        WHEN NOT EXISTS (SELECT 1 FROM trigger_control WHERE name = 'rollups')
+        BEGIN
+            UPDATE weekly_rollups
+            SET st_hours = st_hours - IFNULL(OLD.st_hours, 0), ot_hours = ot_hours - IFNULL(OLD.ot_hours, 0),
+                entries = entries - 1
+            WHERE week_ending_date = OLD.week_ending_date AND kind = 'day' AND key = OLD.work_date;
+            UPDATE weekly_rollups
+            SET st_hours = st_hours - IFNULL(OLD.st_hours, 0), ot_hours = ot_hours - IFNULL(OLD.ot_hours, 0),
+                entries = entries - 1
+            WHERE week_ending_date = OLD.week_ending_date AND kind = 'line' AND key = OLD.line_code;
+            DELETE FROM weekly_rollups WHERE week_ending_date = OLD.week_ending_date AND entries <= 0;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_weekly_rollups_update
+        AFTER UPDATE OF work_date, week_ending_date, line_code, st_hours, ot_hours ON time_entries
+        WHEN NOT EXISTS (SELECT 1 FROM trigger_control WHERE name = 'rollups')
+        BEGIN
+            UPDATE weekly_rollups
+            SET st_hours = st_hours - IFNULL(OLD.st_hours, 0), ot_hours = ot_hours - IFNULL(OLD.ot_hours, 0),
+                entries = entries - 1
+            WHERE week_ending_date = OLD.week_ending_date AND kind = 'day' AND key = OLD.work_date;
+            UPDATE weekly_rollups
+            SET st_hours = st_hours - IFNULL(OLD.st_hours, 0), ot_hours = ot_hours - IFNULL(OLD.ot_hours, 0),
+                entries = entries - 1
+            WHERE week_ending_date = OLD.week_ending_date AND kind = 'line' AND key = OLD.line_code;
+            DELETE FROM weekly_rollups WHERE week_ending_date = OLD.week_ending_date AND entries <= 0;
+            INSERT INTO weekly_rollups (week_ending_date, kind, key, st_hours, ot_hours, entries)
+            VALUES (NEW.week_ending_date, 'day', NEW.work_date, IFNULL(NEW.st_hours, 0), IFNULL(NEW.ot_hours, 0), 1),
+                   (NEW.week_ending_date, 'line', NEW.line_code, IFNULL(NEW.st_hours, 0), IFNULL(NEW.ot_hours, 0), 1)
+            ON CONFLICT (week_ending_date, kind, key) DO UPDATE SET
+                st_hours = st_hours + excluded.st_hours,
+                ot_hours = ot_hours + excluded.ot_hours,
+                entries = entries + 1;
+        END
+        ''',
+        # Backfill from the entries already stored
+        '''
+        INSERT INTO weekly_rollups (week_ending_date, kind, key, st_hours, ot_hours, entries)
+        SELECT week_ending_date, 'day', work_date, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+        FROM time_entries GROUP BY week_ending_date, work_date
+        UNION ALL
+        SELECT week_ending_date, 'line', line_code, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+        FROM time_entries GROUP BY week_ending_date, line_code
+        ''',
+    ]),
+    (4, 'revision counters for conditional GETs', [
+        # 'database' is the monotonic counter; every other scope (a table name
+        # or 'week:<week_ending_date>') holds the counter value of its last change
+        '''
+        CREATE TABLE IF NOT EXISTS revisions (
+            scope TEXT PRIMARY KEY,
+            rev INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        "INSERT OR IGNORE INTO revisions (scope, rev) VALUES ('database', 0)",
+        _revision_trigger('time_entries', 'INSERT', ["'time_entries'", "'week:' || NEW.week_ending_date"]),
+        _revision_trigger('time_entries', 'UPDATE', ["'time_entries'", "'week:' || OLD.week_ending_date",
+                                                     "'week:' || NEW.week_ending_date"]),
+        _revision_trigger('time_entries', 'DELETE', ["'time_entries'", "'week:' || OLD.week_ending_date"]),
+        *(_revision_trigger(table, event, [f"'{table}'"])
+          for table in ('line_codes', 'settings') for event in ('INSERT', 'UPDATE', 'DELETE')),
+    ]),
+    (5, 'change log for delta sync', [
+        # The latest revision at which each entry, line code or setting changed;
+        # deleted rows stay behind as tombstones. One row per key, so the table
+        # grows with the number of distinct keys, not with the number of writes
+        '''
+        CREATE TABLE IF NOT EXISTS change_log (
+            entity TEXT NOT NULL,
+            key TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (entity, key)
+        ) WITHOUT ROWID
+        ''',
+        # /sync pages through changes in revision order
+        'CREATE INDEX IF NOT EXISTS idx_change_log_rev ON change_log (rev, entity, key)',
+        *_change_log_steps(),
+        # Everything already stored counts as changed at one new revision
+        "UPDATE revisions SET rev = rev + 1 WHERE scope = 'database'",
+        '''
+        INSERT OR REPLACE INTO change_log (entity, key, rev, deleted)
+        SELECT 'entry', json_array(work_date, line_code), (SELECT rev FROM revisions WHERE scope = 'database'), 0
+        FROM time_entries
+        UNION ALL
+        SELECT 'line_code', line_code, (SELECT rev FROM revisions WHERE scope = 'database'), 0 FROM line_codes
+        UNION ALL
+        SELECT 'setting', key, (SELECT rev FROM revisions WHERE scope = 'database'), 0 FROM settings
+        ''',
+    ]),
+    (6, 'monthly and yearly rollups maintained by time_entries triggers', [
+        # Per line per month ('YYYY-MM') and per year ('YYYY'), so reports
+        # spanning years read a few hundred rows instead of every entry
+        *_period_rollup_steps('monthly_rollups', 'month', 7),
+        *_period_rollup_steps('yearly_rollups', 'year', 4),
+    ]),
+    (7, 'default line codes and settings', [
+        # Seeded once, here, rather than re-inserted on every startup; rows a
+        # database already has (or had and deleted since) are left alone
+        '''
+        INSERT OR IGNORE INTO line_codes (line_code, label, is_project, is_visible, sort_order) VALUES
+            ('VTR', 'VTR', 0, 1, 1),
+            ('GMRC', 'GMRC', 0, 1, 2),
+            ('CLP', 'CLP', 0, 1, 3),
+            ('WACR', 'WACR', 0, 1, 4),
+            ('WACR-CRD', 'WACR-CRD', 0, 1, 5),
+            ('NEGS', 'NEGS', 0, 1, 6),
+            ('NHC', 'NHC', 0, 1, 7),
+            ('NYOG', 'NYOG', 0, 1, 8),
+            ('PTO', 'PTO', 0, 1, 9),
+            ('HOLIDAY', 'HOLIDAY', 0, 1, 10)
+        ''',
+        # Nov 22, 2025 is the pay week ending Saturday
+        '''
+        INSERT OR IGNORE INTO settings (key, value) VALUES
+            ('base_pay_week_ending', '2025-11-22'),
+            ('pay_frequency_days', '14')
+        ''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    async with db.execute('PRAGMA user_version') as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply pending migrations and return the resulting schema version.
+
+    Each migration runs in its own IMMEDIATE transaction together with the
+    user_version bump, so a failed step leaves the database at the previous
+    version and concurrent workers wait on the lock instead of racing.
+    """
+    if await get_schema_version(db) >= LATEST_VERSION:
+        return LATEST_VERSION
+
+    for version, description, steps in MIGRATIONS:
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock; another worker may have got here first
+            if await get_schema_version(db) >= version:
+                await db.rollback()
+                continue
+            for step in steps:
+                if isinstance(step, str):
+                    await db.execute(step)
+                else:
+                    await step(db)
+            await db.execute(f'PRAGMA user_version = {int(version)}')
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        logger.info("Applied migration %d: %s", version, description)
+
+    return await get_schema_version(db)
+
+
+async def drop_triggers(db: aiosqlite.Connection, pattern: str) -> List[str]:
+    """Drop the triggers whose names match the GLOB ``pattern``, returning
+    their CREATE TRIGGER statements for create_triggers().
+
+    Inside a transaction, so a rollback brings them back by itself.
+    """
+    async with db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name GLOB ?",
+                          (pattern,)) as cursor:
+        triggers = await cursor.fetchall()
+    for name, _ in triggers:
+        await db.execute(f'DROP TRIGGER "{name}"')
+    return [sql for _, sql in triggers]
+
+
+async def create_triggers(db: aiosqlite.Connection, statements: List[str]):
+    for sql in statements:
+        await db.execute(sql)
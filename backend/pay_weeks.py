@@ -0,0 +1,134 @@
+"""Background recompute of the stored time_entries.is_pay_week flags.
+
+The flag is written with each entry, so changing base_pay_week_ending or
+pay_frequency_days leaves existing rows stale. PayWeekRecomputer rewrites
+them a range of weeks at a time, each range in its own short write
+transaction, so regular writers only ever wait for one chunk. Summaries
+derive the flag from the settings snapshot and are correct throughout.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import Optional, Tuple
+
+from db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Distinct week_ending_date values per chunk, read off idx_time_entries_week
+NEXT_WEEKS_SQL = '''
+    SELECT DISTINCT week_ending_date FROM time_entries
+    WHERE week_ending_date > ? ORDER BY week_ending_date LIMIT ?
+'''
+# The SQL twin of server.is_pay_week; only rows whose flag changes are written
+PAY_WEEK_UPDATE_SQL = '''
+    UPDATE time_entries
+    SET is_pay_week = (CAST(julianday(week_ending_date) - julianday(:base) AS INTEGER) % :frequency = 0)
+    WHERE week_ending_date BETWEEN :first AND :last
+      AND is_pay_week IS NOT (CAST(julianday(week_ending_date) - julianday(:base) AS INTEGER) % :frequency = 0)
+'''
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class PayWeekRecomputer:
+    """Runs at most one recompute job at a time and reports its status.
+
+    Starting a job while one is running stops the old one: the new job
+    covers every row anyway, with the newer settings. Jobs stop between
+    chunks, never in the middle of a transaction; a job is stopped as soon
+    as it is no longer the current one.
+
+    start() does not wait for the old job, which may be queued for the
+    writer connection the caller itself holds; the new job waits for it
+    instead before its first chunk.
+
+    ``schedule`` is the (base_saturday, frequency_days) the stored flags
+    follow as far as this process knows: the latest job's, or the one
+    given when the database was opened.
+    """
+
+    def __init__(self, pool: ConnectionPool, chunk_weeks: int = 26,
+                 schedule: Optional[Tuple[date, int]] = None):
+        self._pool = pool
+        self._chunk_weeks = chunk_weeks
+        self.schedule = schedule
+        self._task: Optional[asyncio.Task] = None
+        self._next_id = 1
+        self._status: Optional[dict] = None
+
+    @property
+    def status(self) -> Optional[dict]:
+        """Status of the latest job, or None if none has run in this process"""
+        return dict(self._status) if self._status is not None else None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, base_saturday: date, frequency_days: int) -> dict:
+        # No awaits: concurrent starts cannot interleave
+        previous = self._task
+        self.schedule = (base_saturday, frequency_days)
+        self._status = {
+            'id': self._next_id,
+            'state': 'running',
+            'base_pay_week_ending': base_saturday.isoformat(),
+            'pay_frequency_days': frequency_days,
+            'weeks_done': 0,
+            'rows_updated': 0,
+            'started_at': _now(),
+            'finished_at': None,
+            'error': None,
+        }
+        self._next_id += 1
+        self._task = asyncio.create_task(self._run(self._status, base_saturday, frequency_days, previous))
+        return self.status
+
+    async def stop(self):
+        """Stop the current job, if any, at its next chunk boundary"""
+        task, self._task = self._task, None
+        if task is not None:
+            await task
+
+    async def wait(self):
+        """Wait for the current job, if any, to finish"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self, status: dict, base_saturday: date, frequency_days: int,
+                   previous: Optional[asyncio.Task]):
+        job = asyncio.current_task()
+        params = {'base': base_saturday.isoformat(), 'frequency': frequency_days}
+        last_week = ''
+        try:
+            if previous is not None:
+                # It stops at its next chunk boundary, now that it is not current
+                await asyncio.wait([previous])
+            while self._task is job:
+                async with self._pool.acquire() as db:
+                    async with db.execute(NEXT_WEEKS_SQL, (last_week, self._chunk_weeks)) as cursor:
+                        weeks = [row[0] for row in await cursor.fetchall()]
+                    if not weeks:
+                        status.update(state='done', finished_at=_now())
+                        logger.info("Pay week recompute %d updated %d rows", status['id'], status['rows_updated'])
+                        return
+                    await db.execute('BEGIN IMMEDIATE')
+                    try:
+                        cursor = await db.execute(PAY_WEEK_UPDATE_SQL, dict(params, first=weeks[0], last=weeks[-1]))
+                        await db.commit()
+                    except BaseException:
+                        await db.rollback()
+                        raise
+                status['weeks_done'] += len(weeks)
+                status['rows_updated'] += cursor.rowcount
+                last_week = weeks[-1]
+                # Let queued requests have the write lock between chunks
+                await asyncio.sleep(0)
+        except Exception as e:
+            logger.exception("Pay week recompute %d failed", status['id'])
+            status.update(state='failed', error=str(e), finished_at=_now())
+            return
+        status.update(state='cancelled', finished_at=_now())
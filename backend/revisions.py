@@ -0,0 +1,122 @@
+"""Revision counters behind the API's ETags.
+
+Triggers on time_entries, line_codes and settings (migration 4) bump a
+single monotonic 'database' revision on every write and stamp it on the
+scopes the write touched: the table itself and, for entries, the
+'week:<week_ending_date>' of the old and new row. A scope's revision
+therefore changes exactly when something readable through it changes.
+
+The same triggers (since migration 5) record in change_log the revision at
+which each entry, line code and setting last changed, leaving a tombstone
+row for deletions, which is what /api/sync reads.
+
+A restored backup carries the revisions it was taken at, which clients may
+already hold for other content. restart_revisions() moves every scope past
+the live database's revision and records it as the 'restore' revision, so
+every ETag changes and syncs from before the restore start over.
+"""
+import json
+from typing import List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from migrations import create_triggers, drop_triggers
+
+REVISIONS_SQL = 'SELECT scope, rev FROM revisions WHERE scope IN ({placeholders})'
+NEXT_REVISION_SQL = "UPDATE revisions SET rev = rev + 1 WHERE scope = 'database' RETURNING rev"
+STAMP_SQL = '''
+    INSERT INTO revisions (scope, rev) VALUES (?, ?)
+    ON CONFLICT (scope) DO UPDATE SET rev = excluded.rev
+'''
+STAMP_WEEKS_SQL = '''
+    INSERT INTO revisions (scope, rev)
+    SELECT 'week:' || week_ending_date, :rev FROM time_entries
+    WHERE week_ending_date BETWEEN :first AND :last GROUP BY week_ending_date
+    ON CONFLICT (scope) DO UPDATE SET rev = excluded.rev
+'''
+RESTART_SQL = 'UPDATE revisions SET rev = ?'
+RESTART_STAMP_SQL = '''
+    INSERT INTO revisions (scope, rev) VALUES ('database', :rev), ('restore', :rev)
+    ON CONFLICT (scope) DO UPDATE SET rev = excluded.rev
+'''
+# Change log rows for a JSON array of written keys, by entity. Entry keys
+# arrive as [work_date, line_code] pairs and are rebuilt the way the
+# triggers build them
+LOG_UPSERT_SQL = '''
+    INSERT INTO change_log (entity, key, rev, deleted)
+    SELECT {select}, :rev, 0 FROM json_each(:keys) WHERE 1
+    ON CONFLICT (entity, key) DO UPDATE SET rev = excluded.rev, deleted = excluded.deleted
+'''
+LOG_KEYS_SQL = {
+    'entry': LOG_UPSERT_SQL.format(
+        select="'entry', json_array(json_extract(value, '$[0]'), json_extract(value, '$[1]'))"),
+    'line_code': LOG_UPSERT_SQL.format(select="'line_code', value"),
+    'setting': LOG_UPSERT_SQL.format(select="'setting', value"),
+}
+
+
+def week_scope(week_ending: str) -> str:
+    return f'week:{week_ending}'
+
+
+async def get_revisions(db: aiosqlite.Connection, *scopes: str) -> Tuple[int, ...]:
+    """Current revision of each scope, 0 for scopes never written"""
+    placeholders = ', '.join('?' * len(scopes))
+    async with db.execute(REVISIONS_SQL.format(placeholders=placeholders), scopes) as cursor:
+        revs = dict(await cursor.fetchall())
+    return tuple(revs.get(scope, 0) for scope in scopes)
+
+
+async def suspend_revision_triggers(db: aiosqlite.Connection) -> List[str]:
+    """Drop the revision triggers for the rest of the current transaction,
+    returning what resume_revision_triggers() needs to put them back.
+
+    Bulk writers call bump_revisions() themselves before resuming.
+    """
+    return await drop_triggers(db, 'trg_revisions_*')
+
+
+async def resume_revision_triggers(db: aiosqlite.Connection, triggers: List[str]):
+    await create_triggers(db, triggers)
+
+
+async def restart_revisions(db: aiosqlite.Connection, after: int) -> int:
+    """Set every scope's revision to one past both ``after`` and the current
+    'database' revision; returns it. Commits."""
+    current, = await get_revisions(db, 'database')
+    rev = max(after, current) + 1
+    await db.execute(RESTART_SQL, (rev,))
+    await db.execute(RESTART_STAMP_SQL, {'rev': rev})
+    await db.commit()
+    return rev
+
+
+async def next_revision(db: aiosqlite.Connection) -> int:
+    """Take the next 'database' revision, for a bulk writer to log its keys
+    at with log_changes() and then stamp with bump_revisions()"""
+    async with db.execute(NEXT_REVISION_SQL) as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def log_changes(db: aiosqlite.Connection, entity: str, keys: Sequence, rev: int):
+    """Log each key of ``entity`` in ``keys`` as changed at ``rev``, in one
+    statement. Bulk writers only insert or update, so there are no
+    tombstones to write."""
+    await db.execute(LOG_KEYS_SQL[entity], {'rev': rev, 'keys': json.dumps(keys)})
+
+
+async def bump_revisions(db: aiosqlite.Connection, *scopes: str, weeks: Optional[Tuple[str, str]] = None,
+                         rev: Optional[int] = None) -> int:
+    """Stamp ``rev`` (by default the next revision) on ``scopes`` and, given
+    a (first, last) ``weeks`` range, on every stored week within it.
+
+    The keys written are logged by the caller, with log_changes().
+
+    Runs inside the caller's transaction and does not commit.
+    """
+    if rev is None:
+        rev = await next_revision(db)
+    await db.executemany(STAMP_SQL, [(scope, rev) for scope in scopes])
+    if weeks is not None:
+        await db.execute(STAMP_WEEKS_SQL, {'rev': rev, 'first': weeks[0], 'last': weeks[1]})
+    return rev
@@ -0,0 +1,201 @@
+"""Maintenance and consistency checks for the trigger-maintained rollup
+tables: weekly_rollups, monthly_rollups and yearly_rollups.
+
+    python rollups.py [--rebuild] [path/to/timesheet.db]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+from typing import List
+
+import aiosqlite
+
+from migrations import create_triggers, drop_triggers
+
+# What weekly_rollups should contain, computed from scratch
+WEEKLY_ROLLUPS_RECOMPUTE_SQL = '''
+    SELECT week_ending_date, 'day' AS kind, work_date AS key,
+           SUM(IFNULL(st_hours, 0)) AS st_hours, SUM(IFNULL(ot_hours, 0)) AS ot_hours, COUNT(*) AS entries
+    FROM time_entries GROUP BY week_ending_date, work_date
+    UNION ALL
+    SELECT week_ending_date, 'line', line_code,
+           SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+    FROM time_entries GROUP BY week_ending_date, line_code
+'''
+
+WEEKLY_ROLLUPS_DIFF_SQL = f'''
+    WITH expected AS ({WEEKLY_ROLLUPS_RECOMPUTE_SQL}),
+         actual AS (SELECT week_ending_date, kind, key, st_hours, ot_hours, entries FROM weekly_rollups)
+    SELECT 'missing', * FROM (SELECT * FROM expected EXCEPT SELECT * FROM actual)
+    UNION ALL
+    SELECT 'unexpected', * FROM (SELECT * FROM actual EXCEPT SELECT * FROM expected)
+    ORDER BY 2, 3, 4, 1
+'''
+
+
+async def check_weekly_rollups(db: aiosqlite.Connection) -> List[dict]:
+    """Compare weekly_rollups to a full recompute from time_entries.
+
+    Returns one dict per differing row: 'missing' rows are what the rollup
+    should hold, 'unexpected' rows are what it holds instead. An empty list
+    means the rollups are consistent.
+    """
+    async with db.execute(WEEKLY_ROLLUPS_DIFF_SQL) as cursor:
+        rows = await cursor.fetchall()
+    return [
+        {'problem': row[0], 'week_ending_date': row[1], 'kind': row[2], 'key': row[3],
+         'st_hours': row[4], 'ot_hours': row[5], 'entries': row[6]}
+        for row in rows
+    ]
+
+
+WEEKLY_ROLLUPS_RANGE_RECOMPUTE_SQL = '''
+    INSERT INTO weekly_rollups (week_ending_date, kind, key, st_hours, ot_hours, entries)
+    SELECT week_ending_date, 'day', work_date, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+    FROM time_entries WHERE week_ending_date BETWEEN :start AND :end
+    GROUP BY week_ending_date, work_date
+    UNION ALL
+    SELECT week_ending_date, 'line', line_code, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+    FROM time_entries WHERE week_ending_date BETWEEN :start AND :end
+    GROUP BY week_ending_date, line_code
+'''
+
+
+# Per line rollups keyed on a prefix of work_date: table -> (period column, prefix length)
+PERIOD_ROLLUPS = {'monthly_rollups': ('month', 7), 'yearly_rollups': ('year', 4)}
+
+PERIOD_ROLLUPS_RECOMPUTE_SQL = '''
+    SELECT substr(work_date, 1, {length}) AS period, line_code,
+           SUM(IFNULL(st_hours, 0)) AS st_hours, SUM(IFNULL(ot_hours, 0)) AS ot_hours, COUNT(*) AS entries
+    FROM time_entries GROUP BY substr(work_date, 1, {length}), line_code
+'''
+
+PERIOD_ROLLUPS_DIFF_SQL = '''
+    WITH expected AS ({recompute}),
+         actual AS (SELECT {period}, line_code, st_hours, ot_hours, entries FROM {table})
+    SELECT 'missing', * FROM (SELECT * FROM expected EXCEPT SELECT * FROM actual)
+    UNION ALL
+    SELECT 'unexpected', * FROM (SELECT * FROM actual EXCEPT SELECT * FROM expected)
+    ORDER BY 2, 3, 1
+'''
+
+
+async def check_period_rollups(db: aiosqlite.Connection) -> List[dict]:
+    """check_weekly_rollups() for monthly_rollups and yearly_rollups"""
+    problems = []
+    for table, (period, length) in PERIOD_ROLLUPS.items():
+        sql = PERIOD_ROLLUPS_DIFF_SQL.format(
+            recompute=PERIOD_ROLLUPS_RECOMPUTE_SQL.format(length=length), period=period, table=table)
+        async with db.execute(sql) as cursor:
+            problems.extend(
+                {'problem': row[0], 'table': table, 'period': row[1], 'line_code': row[2],
+                 'st_hours': row[3], 'ot_hours': row[4], 'entries': row[5]}
+                for row in await cursor.fetchall()
+            )
+    return problems
+
+
+# Whole months touched by :start..:end, recomputed from time_entries
+MONTHLY_ROLLUPS_RANGE_SQL = '''
+    INSERT INTO monthly_rollups (month, line_code, st_hours, ot_hours, entries)
+    SELECT substr(work_date, 1, 7), line_code, SUM(IFNULL(st_hours, 0)), SUM(IFNULL(ot_hours, 0)), COUNT(*)
+    FROM time_entries
+    WHERE work_date >= substr(:start, 1, 7) AND work_date < date(substr(:end, 1, 7) || '-01', '+1 month')
+    GROUP BY substr(work_date, 1, 7), line_code
+'''
+# Whole years touched by :start..:end, summed from the (already rebuilt) months
+YEARLY_ROLLUPS_RANGE_SQL = '''
+    INSERT INTO yearly_rollups (year, line_code, st_hours, ot_hours, entries)
+    SELECT substr(month, 1, 4), line_code, SUM(st_hours), SUM(ot_hours), SUM(entries)
+    FROM monthly_rollups
+    WHERE month >= substr(:start, 1, 4) AND month <= substr(:end, 1, 4) || '-12'
+    GROUP BY substr(month, 1, 4), line_code
+'''
+
+
+async def suspend_rollup_triggers(db: aiosqlite.Connection) -> List[str]:
+    """Drop the rollup triggers for the rest of the current transaction,
+    returning what resume_rollup_triggers() needs to put them back.
+
+    For bulk writes, where one set-based rebuild_rollups_range() at the end
+    is far cheaper than per-row trigger work. Dropping them, rather than
+    gating them through trigger_control, also saves the gate's lookup on
+    every row. Must be paired with resume_rollup_triggers() before commit;
+    a rollback restores them by itself.
+    """
+    return await drop_triggers(db, 'trg_*_rollups_*')
+
+
+async def resume_rollup_triggers(db: aiosqlite.Connection, triggers: List[str]):
+    await create_triggers(db, triggers)
+
+
+async def rebuild_rollups_range(db: aiosqlite.Connection, start: str, end: str):
+    """Recompute rollups for weeks ending between start and end (inclusive),
+    and the monthly and yearly rollups of every month and year they touch.
+
+    Runs inside the caller's transaction and does not commit.
+    """
+    params = {'start': start, 'end': end}
+    await db.execute('DELETE FROM weekly_rollups WHERE week_ending_date BETWEEN :start AND :end', params)
+    await db.execute(WEEKLY_ROLLUPS_RANGE_RECOMPUTE_SQL, params)
+    await db.execute('DELETE FROM monthly_rollups WHERE month BETWEEN substr(:start, 1, 7) AND substr(:end, 1, 7)',
+                     params)
+    await db.execute(MONTHLY_ROLLUPS_RANGE_SQL, params)
+    await db.execute('DELETE FROM yearly_rollups WHERE year BETWEEN substr(:start, 1, 4) AND substr(:end, 1, 4)',
+                     params)
+    await db.execute(YEARLY_ROLLUPS_RANGE_SQL, params)
+
+
+async def rebuild_weekly_rollups(db: aiosqlite.Connection):
+    """Replace weekly_rollups with a full recompute, in one transaction"""
+    await db.execute('BEGIN IMMEDIATE')
+    try:
+        await db.execute('DELETE FROM weekly_rollups')
+        await db.execute(
+            'INSERT INTO weekly_rollups (week_ending_date, kind, key, st_hours, ot_hours, entries) '
+            + WEEKLY_ROLLUPS_RECOMPUTE_SQL
+        )
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+
+
+async def rebuild_period_rollups(db: aiosqlite.Connection):
+    """Replace monthly_rollups and yearly_rollups with a full recompute, in one transaction"""
+    await db.execute('BEGIN IMMEDIATE')
+    try:
+        for table, (period, length) in PERIOD_ROLLUPS.items():
+            await db.execute(f'DELETE FROM {table}')
+            await db.execute(
+                f'INSERT INTO {table} ({period}, line_code, st_hours, ot_hours, entries) '
+                + PERIOD_ROLLUPS_RECOMPUTE_SQL.format(length=length)
+            )
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+
+
+async def main(args):
+    async with aiosqlite.connect(args.db_path) as db:
+        weekly = await check_weekly_rollups(db)
+        periods = await check_period_rollups(db)
+        for problem in weekly + periods:
+            print(problem)
+        print(f"{len(weekly) + len(periods)} inconsistent rollup rows")
+        if weekly and args.rebuild:
+            await rebuild_weekly_rollups(db)
+            print("weekly_rollups rebuilt")
+        if periods and args.rebuild:
+            await rebuild_period_rollups(db)
+            print("monthly_rollups and yearly_rollups rebuilt")
+        return 1 if (weekly or periods) and not args.rebuild else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the rollup tables against time_entries")
+    parser.add_argument('db_path', nargs='?', default=Path(__file__).parent / 'timesheet.db')
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the rollups if they differ")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, Response, StreamingResponse
 import os
 import logging
 from pathlib import Path
@@ -8,13 +10,75 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import aiosqlite
+import asyncio
+import base64
+import binascii
+import codecs
 import json
+import shutil
+
+from backups import BackupScheduler, InvalidBackup, backup_name, check_backup, list_backups, restore, snapshot
+from db import ConnectionPool, ReadWritePool
+from fast_json import FastJSONResponse, dumps as json_bytes
+from importer import (ImportValidationError, import_records, iter_export_dict_records,
+                      iter_json_export_records, iter_ndjson_records)
+import metrics
+from migrations import migrate
+from pay_weeks import PayWeekRecomputer
+from revisions import get_revisions, restart_revisions, week_scope
+from settings_store import SETTING_PARSERS, AppSettings, SettingsStore
+from slow_queries import SlowQueryLog
+from tenants import DEFAULT_TENANT, Tenant, TenantRegistry, valid_tenant_id
+import columnar
+import week_calendar
+from write_coalescer import WriteCoalescer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # SQLite database path
-DB_PATH = ROOT_DIR / 'timesheet.db'
+DB_PATH = Path(os.environ.get('DB_PATH', ROOT_DIR / 'timesheet.db'))
+
+# Connection pool settings: DB_POOL_SIZE query-only connections for GET
+# requests plus one writer connection for everything else (a pool size of 0
+# opens a connection per request for both)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '4'))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+
+# Per-tenant databases, chosen by the X-Tenant-ID header (requests without it
+# use DB_PATH). Tenant files live in TENANT_DB_DIR, by default "tenant_dbs" next
+# to DB_PATH; at most TENANT_MAX_OPEN are open at once, and tenants idle for
+# TENANT_IDLE_SECONDS are closed (0 keeps them open until evicted)
+TENANT_DB_DIR = os.environ.get('TENANT_DB_DIR')
+TENANT_POOL_SIZE = int(os.environ.get('TENANT_POOL_SIZE', '2'))
+TENANT_MAX_OPEN = int(os.environ.get('TENANT_MAX_OPEN', '64'))
+TENANT_IDLE_SECONDS = float(os.environ.get('TENANT_IDLE_SECONDS', '300'))
+
+# Statements slower than this are logged with their query plan (0 disables),
+# at most once per statement per interval
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG_INTERVAL_SECONDS = float(os.environ.get('SLOW_QUERY_LOG_INTERVAL_SECONDS', '60'))
+
+# How often each worker checks for settings changed by other workers (0 disables)
+SETTINGS_REFRESH_SECONDS = float(os.environ.get('SETTINGS_REFRESH_SECONDS', '1.0'))
+
+# Weeks of entries per transaction when recomputing stored pay week flags
+PAY_WEEK_RECOMPUTE_CHUNK_WEEKS = int(os.environ.get('PAY_WEEK_RECOMPUTE_CHUNK_WEEKS', '26'))
+
+# Backups, taken with SQLite's backup API BACKUP_PAGES_PER_STEP pages at a
+# time, go in BACKUP_DIR/<tenant id>/, by default "db_backups" next to
+# DB_PATH. Each open tenant is backed up every BACKUP_INTERVAL_SECONDS
+# (0 takes backups only on request), keeping the newest BACKUP_KEEP
+BACKUP_DIR = os.environ.get('BACKUP_DIR')
+BACKUP_INTERVAL_SECONDS = float(os.environ.get('BACKUP_INTERVAL_SECONDS', '0'))
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '7'))
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', '256'))
+
+# Group commit for POST /entries: single-entry writes arriving within
+# ENTRY_WRITE_WINDOW_MS of each other (up to ENTRY_WRITE_BATCH_ROWS) share
+# one transaction. 0 writes each entry in its own transaction
+ENTRY_WRITE_WINDOW_MS = float(os.environ.get('ENTRY_WRITE_WINDOW_MS', '0'))
+ENTRY_WRITE_BATCH_ROWS = int(os.environ.get('ENTRY_WRITE_BATCH_ROWS', '256'))
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -22,6 +86,55 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+async def get_tenant(request: Request):
+    """The tenant named by the X-Tenant-ID header, held open for the request"""
+    tenant_id = request.headers.get('x-tenant-id') or DEFAULT_TENANT
+    if not valid_tenant_id(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid X-Tenant-ID")
+    async with app.state.tenants.use(tenant_id) as tenant:
+        yield tenant
+
+# Methods whose routes only read, and so run on a reader connection
+READ_METHODS = frozenset({'GET', 'HEAD'})
+
+async def get_db(request: Request, tenant: Tenant = Depends(get_tenant)):
+    """Borrow a pooled connection to the tenant's database for the current
+    request: a reader for GET requests, otherwise the writer"""
+    acquire = tenant.pool.acquire_read if request.method in READ_METHODS else tenant.pool.acquire
+    async with acquire() as db:
+        yield db
+
+def get_app_settings(tenant: Tenant = Depends(get_tenant)) -> AppSettings:
+    """Current settings snapshot; never touches the database"""
+    return tenant.settings.current
+
+async def check_not_modified(request: Request, response: Response, db: aiosqlite.Connection,
+                             *scopes: str, settings: Optional[AppSettings] = None) -> Optional[Response]:
+    """Conditional GET: tag ``response`` with an ETag built from the revisions
+    of ``scopes``, and return a 304 to send instead if the client already has
+    that version.
+    
+    Call it before running the route's query: the revision is read first, so
+    a write landing in between can only make the ETag older than the body,
+    which costs the client a refetch rather than a stale cache.
+    
+    Pass ``settings`` when the body is computed from the settings cache: the
+    tag then carries the revision that snapshot was loaded at rather than the
+    database's, which the cache can briefly lag.
+    """
+    revisions = list(await get_revisions(db, *scopes))
+    if settings is not None:
+        revisions.append(settings.revision)
+    etag = '"' + '.'.join(str(rev) for rev in revisions) + '"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        if '*' in tags or etag in tags or f'W/{etag}' in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 # Pydantic Models
 class TimeEntry(BaseModel):
     id: Optional[int] = None
@@ -40,6 +153,17 @@ class TimeEntryCreate(BaseModel):
     st_hours: int = 0
     ot_hours: int = 0
 
+class BatchEntryResult(BaseModel):
+    index: int  # position in the request body
+    status: str  # 'ok' or 'error'
+    entry: Optional[TimeEntry] = None
+    detail: Optional[str] = None
+
+class TimeEntryBatchResult(BaseModel):
+    applied: int  # distinct (work_date, line_code) rows written
+    failed: int
+    results: List[BatchEntryResult]
+
 class LineCode(BaseModel):
     line_code: str
     label: str
@@ -61,6 +185,13 @@ class Setting(BaseModel):
     value: str
     updated_at: Optional[str] = None
 
+class ImportResult(BaseModel):
+    message: str
+    entries: int
+    line_codes: int
+    settings: int
+    chunks: int
+
 class WeekInfo(BaseModel):
     week_ending_date: str
     is_pay_week: bool
@@ -77,79 +208,51 @@ class WeeklySummary(BaseModel):
     daily_totals: dict
     line_totals: dict
 
+class WeeklySummaryPage(BaseModel):
+    summaries: List[WeeklySummary]
+    next_start: Optional[str] = None  # pass as start= to fetch the following page
+
+class PayPeriodSummary(BaseModel):
+    period_start_date: str
+    period_ending_date: str
+    total_st: int
+    total_ot: int
+    total_hours: int
+    lines_used: List[str]
+    daily_totals: dict
+    line_totals: dict
+
+class PayPeriodPage(BaseModel):
+    periods: List[PayPeriodSummary]
+    next_start: Optional[str] = None
+
+class PeriodReport(BaseModel):
+    period: str  # YYYY-MM in monthly reports, YYYY in yearly ones
+    total_st: int
+    total_ot: int
+    total_hours: int
+    entries: int
+    lines_used: List[str]
+    line_totals: dict
+
 # Database initialization
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Time entries table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS time_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                work_date TEXT NOT NULL,
-                week_ending_date TEXT NOT NULL,
-                line_code TEXT NOT NULL,
-                st_hours INTEGER DEFAULT 0,
-                ot_hours INTEGER DEFAULT 0,
-                is_pay_week INTEGER DEFAULT 0,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(work_date, line_code)
-            )
-        ''')
-        
-        # Line codes table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS line_codes (
-                line_code TEXT PRIMARY KEY,
-                label TEXT NOT NULL,
-                is_project INTEGER DEFAULT 0,
-                is_visible INTEGER DEFAULT 1,
-                sort_order INTEGER DEFAULT 0,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Settings table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        await db.commit()
-        
-        # Initialize default line codes
-        default_lines = [
-            ('VTR', 'VTR', 0, 1, 1),
-            ('GMRC', 'GMRC', 0, 1, 2),
-            ('CLP', 'CLP', 0, 1, 3),
-            ('WACR', 'WACR', 0, 1, 4),
-            ('WACR-CRD', 'WACR-CRD', 0, 1, 5),
-            ('NEGS', 'NEGS', 0, 1, 6),
-            ('NHC', 'NHC', 0, 1, 7),
-            ('NYOG', 'NYOG', 0, 1, 8),
-            ('PTO', 'PTO', 0, 1, 9),
-            ('HOLIDAY', 'HOLIDAY', 0, 1, 10),
-        ]
-        
-        for line_code, label, is_project, is_visible, sort_order in default_lines:
-            await db.execute(
-                'INSERT OR IGNORE INTO line_codes (line_code, label, is_project, is_visible, sort_order) VALUES (?, ?, ?, ?, ?)',
-                (line_code, label, is_project, is_visible, sort_order)
-            )
-        
-        # Initialize default settings - Nov 22, 2025 is the pay week ending Saturday
-        await db.execute(
-            'INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
-            ('base_pay_week_ending', '2025-11-22')
-        )
-        await db.execute(
-            'INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
-            ('pay_frequency_days', '14')
-        )
-        
-        await db.commit()
+async def init_db(db: aiosqlite.Connection):
+    """Bring the database up to date. The schema and the default line codes
+    and settings are all migrations, so for a current database this is one
+    PRAGMA read: no writes and no write lock"""
+    await migrate(db)
+
+async def reload_settings(tenant: Tenant, db: aiosqlite.Connection) -> AppSettings:
+    """Refresh the settings cache after a write; restart the pay week
+    recompute if the pay schedule differs from the one the stored flags follow.
+    
+    Compared against the recomputer's schedule rather than the cache: the
+    settings watcher may already have loaded the new values."""
+    settings = await tenant.settings.load(db)
+    schedule = (settings.base_pay_week_ending, settings.pay_frequency_days)
+    if schedule != tenant.pay_weeks.schedule:
+        await tenant.pay_weeks.start(*schedule)
+    return settings
 
 # Helper functions for date calculations
 def get_week_ending(work_date: date) -> date:
@@ -169,37 +272,240 @@ def get_week_ending(work_date: date) -> date:
     
     return work_date + timedelta(days=days_until_saturday)
 
-def is_pay_week(saturday: date, base_saturday: date) -> bool:
+def is_pay_week(saturday: date, base_saturday: date, frequency_days: int = 14) -> bool:
     """Check if a Saturday is a pay week"""
     diff = (saturday - base_saturday).days
-    return diff % 14 == 0
+    return diff % frequency_days == 0
+
+def get_period_ending(work_date: date, base_saturday: date, frequency_days: int) -> date:
+    """Last day of the pay period containing work_date (Python twin of PERIOD_KEY_SQL)"""
+    diff = (work_date - base_saturday).days
+    return work_date + timedelta(days=-diff % frequency_days)
+
+def get_period_start(period_ending: date, frequency_days: int) -> date:
+    """First day of the pay period ending on period_ending"""
+    return period_ending - timedelta(days=frequency_days - 1)
 
 def get_week_start(saturday: date) -> date:
     """Get Sunday of the week (6 days before Saturday)"""
     return saturday - timedelta(days=6)
 
+# Lookups used by the routes below. They are kept here so
+# tests/test_migrations.py can check with EXPLAIN QUERY PLAN that each one
+# is served by an index rather than a table scan.
+ENTRIES_BY_WEEK_SQL = 'SELECT * FROM time_entries WHERE week_ending_date = ? ORDER BY work_date, line_code'
+# Keyset pages over a date range: each page seeks past the last (work_date,
+# line_code) of the previous one in the UNIQUE index, so page N costs the same as page 1
+ENTRIES_BY_RANGE_SQL = (
+    'SELECT * FROM time_entries WHERE work_date >= ? AND work_date <= ? '
+    'ORDER BY work_date, line_code LIMIT ?'
+)
+ENTRIES_AFTER_CURSOR_SQL = (
+    'SELECT * FROM time_entries WHERE (work_date, line_code) > (?, ?) AND work_date <= ? '
+    'ORDER BY work_date, line_code LIMIT ?'
+)
+WEEK_SUMMARY_SQL = 'SELECT kind, key, st_hours, ot_hours FROM weekly_rollups WHERE week_ending_date = ?'
+# weekly_rollups is the (week, day) and (week, line) GROUP BY of time_entries,
+# so a run of weeks is one primary-key range read in week order
+RANGE_SUMMARY_SQL = (
+    'SELECT week_ending_date, kind, key, st_hours, ot_hours FROM weekly_rollups '
+    'WHERE week_ending_date >= ? AND week_ending_date <= ?'
+)
+# monthly_rollups and yearly_rollups are the (month, line) and (year, line)
+# GROUP BY of time_entries: years of reports are one short primary-key range read
+MONTHLY_REPORT_SQL = (
+    'SELECT month, line_code, st_hours, ot_hours, entries FROM monthly_rollups WHERE month >= ? AND month <= ?'
+)
+YEARLY_REPORT_SQL = (
+    'SELECT year, line_code, st_hours, ot_hours, entries FROM yearly_rollups WHERE year >= ? AND year <= ?'
+)
+# The same for some lines only: one primary key seek per period and line
+MONTHLY_LINES_REPORT_SQL = (
+    'SELECT month, line_code, st_hours, ot_hours, entries FROM monthly_rollups '
+    'WHERE month IN ({periods}) AND line_code IN ({lines})'
+)
+YEARLY_LINES_REPORT_SQL = (
+    'SELECT year, line_code, st_hours, ot_hours, entries FROM yearly_rollups '
+    'WHERE year IN ({periods}) AND line_code IN ({lines})'
+)
+EXPORT_RANGE_SQL = 'SELECT * FROM time_entries WHERE work_date >= ? AND work_date <= ?'
+# One page of change_log in (rev, entity, key) order, each change joined to
+# the row it names: rev, entity, key, deleted, then time_entries.*,
+# line_codes.* and settings.* (all NULL but the entity's own, or all NULL
+# for a tombstone). Only entry keys are JSON, and SQLite may evaluate the
+# join terms in any order, hence the CASE
+SYNC_PAGE_SQL = '''
+    SELECT c.rev, c.entity, c.key, c.deleted, te.*, lc.*, s.* FROM change_log c
+    LEFT JOIN time_entries te ON c.entity = 'entry' AND NOT c.deleted
+        AND te.work_date = json_extract(CASE WHEN c.entity = 'entry' THEN c.key END, '$[0]')
+        AND te.line_code = json_extract(CASE WHEN c.entity = 'entry' THEN c.key END, '$[1]')
+    LEFT JOIN line_codes lc ON c.entity = 'line_code' AND NOT c.deleted AND lc.line_code = c.key
+    LEFT JOIN settings s ON c.entity = 'setting' AND NOT c.deleted AND s.key = c.key
+    WHERE {where}
+    ORDER BY c.rev, c.entity, c.key LIMIT :limit
+'''
+SYNC_SINCE_SQL = SYNC_PAGE_SQL.format(where='c.rev > :since')
+SYNC_AFTER_CURSOR_SQL = SYNC_PAGE_SQL.format(where='(c.rev, c.entity, c.key) > (:rev, :entity, :key)')
+
+# Rows fetched from the cursor per chunk when streaming an export
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', '1000'))
+
+# Pay period key: the period's last day, i.e. work_date rounded up to the next
+# :base + n * :frequency. The outer % keeps the offset in 0..frequency-1
+# whichever sign SQLite gives the inner one (dates before the base).
+PERIOD_KEY_SQL = '''
+    date(work_date, printf('%+d days',
+        ((:frequency - CAST(julianday(work_date) - julianday(:base) AS INTEGER) % :frequency) % :frequency)))
+'''
+# Day and line totals per pay period over a work_date range, in one pass
+PAY_PERIOD_TOTALS_SQL = f'''
+    WITH keyed AS (
+        SELECT {PERIOD_KEY_SQL} AS period_ending, work_date, line_code,
+               IFNULL(st_hours, 0) AS st_hours, IFNULL(ot_hours, 0) AS ot_hours
+        FROM time_entries WHERE work_date >= :start AND work_date <= :end
+    )
+    SELECT period_ending, 'day', work_date, SUM(st_hours), SUM(ot_hours) FROM keyed GROUP BY period_ending, work_date
+    UNION ALL
+    SELECT period_ending, 'line', line_code, SUM(st_hours), SUM(ot_hours) FROM keyed GROUP BY period_ending, line_code
+'''
+
+# Multi-row upsert; {values} is filled with one "(?, ?, ?, ?, ?, ?)" group per row
+ENTRY_UPSERT_SQL = '''
+    INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week)
+    VALUES {values}
+    ON CONFLICT(work_date, line_code) DO UPDATE SET
+        st_hours = excluded.st_hours,
+        ot_hours = excluded.ot_hours,
+        week_ending_date = excluded.week_ending_date,
+        is_pay_week = excluded.is_pay_week,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING *
+'''
+# Rows per upsert statement (6 bound parameters each, well under SQLite's limit)
+UPSERT_CHUNK_ROWS = 500
+MAX_BATCH_ENTRIES = int(os.environ.get('MAX_BATCH_ENTRIES', '10000'))
+MAX_WEEK_INFO_DATES = int(os.environ.get('MAX_WEEK_INFO_DATES', '100000'))
+# Entries per /entries date-range page
+DEFAULT_ENTRY_PAGE = 1000
+MAX_ENTRY_PAGE = 10000
+# Weeks per /summaries page
+DEFAULT_SUMMARY_WEEKS = 26
+MAX_SUMMARY_WEEKS = 520
+# Pay periods per /pay-periods page
+DEFAULT_PAY_PERIODS = 26
+MAX_PAY_PERIODS = 260
+# Periods per /reports request
+MAX_REPORT_MONTHS = 1200
+MAX_REPORT_YEARS = 100
+# Changes per /sync page
+DEFAULT_SYNC_PAGE = 5000
+MAX_SYNC_PAGE = 50000
+
+def entry_from_row(row) -> TimeEntry:
+    return TimeEntry(
+        id=row[0],
+        work_date=row[1],
+        week_ending_date=row[2],
+        line_code=row[3],
+        st_hours=row[4],
+        ot_hours=row[5],
+        is_pay_week=bool(row[6]),
+        created_at=row[7],
+        updated_at=row[8]
+    )
+
+def encode_entry_cursor(work_date: str, line_code: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([work_date, line_code]).encode()).decode()
+
+def decode_entry_cursor(cursor: str) -> tuple:
+    """(work_date, line_code) of the last entry on the previous page"""
+    try:
+        work_date, line_code = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(work_date, str) or not isinstance(line_code, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return work_date, line_code
+
+def encode_sync_cursor(rev: int, entity: str, key: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rev, entity, key]).encode()).decode()
+
+def decode_sync_cursor(cursor: str) -> dict:
+    """rev, entity and key of the last change on the previous page"""
+    try:
+        rev, entity, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(rev, int) or not isinstance(entity, str) or not isinstance(key, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {'rev': rev, 'entity': entity, 'key': key}
+
+def entry_dict(row) -> dict:
+    return {
+        'id': row[0],
+        'work_date': row[1],
+        'week_ending_date': row[2],
+        'line_code': row[3],
+        'st_hours': row[4],
+        'ot_hours': row[5],
+        'is_pay_week': bool(row[6]),
+        'created_at': row[7],
+        'updated_at': row[8]
+    }
+
+def line_code_dict(row) -> dict:
+    return {
+        'line_code': row[0],
+        'label': row[1],
+        'is_project': bool(row[2]),
+        'is_visible': bool(row[3]),
+        'sort_order': row[4],
+        'created_at': row[5]
+    }
+
+def setting_dict(row) -> dict:
+    return {
+        'key': row[0],
+        'value': row[1],
+        'updated_at': row[2]
+    }
+
+def dict_rows(to_dict):
+    """Row factory for the fast list paths: the cursor yields response-ready
+    dicts that go straight into a FastJSONResponse"""
+    return lambda cursor, row: to_dict(row)
+
+async def upsert_entries(db: aiosqlite.Connection, rows: list) -> dict:
+    """Insert or update (work_date, week_ending_date, line_code, st, ot, is_pay) rows.
+    
+    Returns the stored rows keyed by (work_date, line_code). Does not commit.
+    """
+    stored = {}
+    for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        chunk = rows[start:start + UPSERT_CHUNK_ROWS]
+        sql = ENTRY_UPSERT_SQL.format(values=', '.join(['(?, ?, ?, ?, ?, ?)'] * len(chunk)))
+        async with db.execute(sql, [value for row in chunk for value in row]) as cursor:
+            for row in await cursor.fetchall():
+                stored[(row[1], row[3])] = row
+    return stored
+
+async def upsert_entry(db: aiosqlite.Connection, row: tuple):
+    """upsert_entries() for one row, returning the stored row. Does not commit."""
+    return (await upsert_entries(db, [row]))[(row[0], row[2])]
+
 # API Routes
 @api_router.get("/")
 async def root():
     return {"message": "VRS Time Wizard API"}
 
 @api_router.get("/week-info")
-async def get_week_info(work_date: str):
+async def get_week_info(work_date: str, settings: AppSettings = Depends(get_app_settings)):
     """Get week ending date and pay week status for a given date"""
     try:
         work_date_obj = datetime.strptime(work_date, '%Y-%m-%d').date()
         week_ending = get_week_ending(work_date_obj)
         
-        # Get base pay week from settings
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                'SELECT value FROM settings WHERE key = ?',
-                ('base_pay_week_ending',)
-            ) as cursor:
-                row = await cursor.fetchone()
-                base_date = datetime.strptime(row[0], '%Y-%m-%d').date() if row else date(2025, 11, 22)
-        
-        is_pay = is_pay_week(week_ending, base_date)
+        is_pay = is_pay_week(week_ending, settings.base_pay_week_ending, settings.pay_frequency_days)
         week_start = get_week_start(week_ending)
         
         return WeekInfo(
@@ -211,445 +517,807 @@ async def get_week_info(work_date: str):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.post("/week-info/batch", response_model=List[WeekInfo])
+async def get_week_info_batch(work_dates: List[str], settings: AppSettings = Depends(get_app_settings)):
+    """Week info for many dates at once, in request order"""
+    if len(work_dates) > MAX_WEEK_INFO_DATES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_WEEK_INFO_DATES} dates per request")
+    days, valid = week_calendar.parse_dates(work_dates)
+    if not valid.all():
+        index = int(valid.argmin())
+        raise HTTPException(status_code=400,
+                            detail=f"invalid date {work_dates[index]!r} at index {index}, expected YYYY-MM-DD")
+    
+    saturdays = week_calendar.week_endings(days)
+    week_endings = week_calendar.iso_dates(saturdays)
+    week_starts = week_calendar.iso_dates(week_calendar.week_starts(saturdays))
+    pay_flags = week_calendar.pay_week_flags(
+        saturdays, settings.base_pay_week_ending, settings.pay_frequency_days
+    ).tolist()
+    return [
+        {'week_ending_date': week_ending, 'is_pay_week': is_pay, 'week_start': week_start, 'week_end': week_ending}
+        for week_ending, is_pay, week_start in zip(week_endings, pay_flags, week_starts)
+    ]
+
 @api_router.get("/entries")
-async def get_entries(week_ending: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
-    """Get time entries by week or date range"""
+async def get_entries(request: Request, response: Response, week_ending: Optional[str] = None,
+                      start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      limit: int = DEFAULT_ENTRY_PAGE, cursor: Optional[str] = None,
+                      db: aiosqlite.Connection = Depends(get_db)):
+    """Get time entries for a week, or one page of a date range.
+    
+    Range results come as {"entries": [...], "next_cursor": ...}; pass
+    next_cursor back as cursor= until it is null.
+    """
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            if week_ending:
-                query = 'SELECT * FROM time_entries WHERE week_ending_date = ? ORDER BY work_date, line_code'
-                async with db.execute(query, (week_ending,)) as cursor:
-                    rows = await cursor.fetchall()
-            elif start_date and end_date:
-                query = 'SELECT * FROM time_entries WHERE work_date >= ? AND work_date <= ? ORDER BY work_date, line_code'
-                async with db.execute(query, (start_date, end_date)) as cursor:
-                    rows = await cursor.fetchall()
+        if week_ending:
+            not_modified = await check_not_modified(request, response, db, week_scope(week_ending))
+            if not_modified is not None:
+                return not_modified
+            async with db.execute(ENTRIES_BY_WEEK_SQL, (week_ending,)) as db_cursor:
+                db_cursor.row_factory = dict_rows(entry_dict)
+                return FastJSONResponse(await db_cursor.fetchall(), headers=response.headers)
+        elif start_date and end_date:
+            if not 1 <= limit <= MAX_ENTRY_PAGE:
+                raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_ENTRY_PAGE}")
+            if cursor:
+                query, params = ENTRIES_AFTER_CURSOR_SQL, (*decode_entry_cursor(cursor), end_date, limit + 1)
             else:
-                raise HTTPException(status_code=400, detail="Must provide week_ending or start_date/end_date")
-            
-            entries = []
-            for row in rows:
-                entries.append(TimeEntry(
-                    id=row[0],
-                    work_date=row[1],
-                    week_ending_date=row[2],
-                    line_code=row[3],
-                    st_hours=row[4],
-                    ot_hours=row[5],
-                    is_pay_week=bool(row[6]),
-                    created_at=row[7],
-                    updated_at=row[8]
-                ))
-            
-            return entries
+                query, params = ENTRIES_BY_RANGE_SQL, (start_date, end_date, limit + 1)
+            not_modified = await check_not_modified(request, response, db, 'time_entries')
+            if not_modified is not None:
+                return not_modified
+            # One extra row says whether another page follows
+            async with db.execute(query, params) as db_cursor:
+                db_cursor.row_factory = dict_rows(entry_dict)
+                entries = await db_cursor.fetchall()
+            next_cursor = None
+            if len(entries) > limit:
+                del entries[limit:]
+                next_cursor = encode_entry_cursor(entries[-1]['work_date'], entries[-1]['line_code'])
+            return FastJSONResponse({'entries': entries, 'next_cursor': next_cursor}, headers=response.headers)
+        else:
+            raise HTTPException(status_code=400, detail="Must provide week_ending or start_date/end_date")
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/entries")
-async def create_or_update_entry(entry: TimeEntryCreate):
+async def create_or_update_entry(entry: TimeEntryCreate, tenant: Tenant = Depends(get_tenant),
+                                 settings: AppSettings = Depends(get_app_settings)):
     """Create or update a time entry"""
     try:
         work_date_obj = datetime.strptime(entry.work_date, '%Y-%m-%d').date()
         week_ending = get_week_ending(work_date_obj)
         
-        # Get base pay week from settings
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                'SELECT value FROM settings WHERE key = ?',
-                ('base_pay_week_ending',)
-            ) as cursor:
-                row = await cursor.fetchone()
-                base_date = datetime.strptime(row[0], '%Y-%m-%d').date() if row else date(2025, 11, 22)
-        
-        is_pay = is_pay_week(week_ending, base_date)
+        is_pay = is_pay_week(week_ending, settings.base_pay_week_ending, settings.pay_frequency_days)
         week_ending_str = week_ending.strftime('%Y-%m-%d')
+        # Stored as YYYY-MM-DD whatever padding was posted: lookups and rollups key on the text
+        row = (work_date_obj.isoformat(), week_ending_str, entry.line_code, entry.st_hours, entry.ot_hours,
+               int(is_pay))
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Check if entry exists
-            async with db.execute(
-                'SELECT id FROM time_entries WHERE work_date = ? AND line_code = ?',
-                (entry.work_date, entry.line_code)
-            ) as cursor:
-                existing = await cursor.fetchone()
-            
-            if existing:
-                # Update existing entry
-                await db.execute(
-                    '''UPDATE time_entries 
-                       SET st_hours = ?, ot_hours = ?, week_ending_date = ?, is_pay_week = ?, updated_at = CURRENT_TIMESTAMP
-                       WHERE work_date = ? AND line_code = ?''',
-                    (entry.st_hours, entry.ot_hours, week_ending_str, int(is_pay), entry.work_date, entry.line_code)
-                )
-            else:
-                # Insert new entry
-                await db.execute(
-                    '''INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week)
-                       VALUES (?, ?, ?, ?, ?, ?)''',
-                    (entry.work_date, week_ending_str, entry.line_code, entry.st_hours, entry.ot_hours, int(is_pay))
-                )
-            
+        # No connection is held while waiting for a coalesced batch, which
+        # needs one of its own to commit
+        if tenant.entry_writes is not None:
+            return entry_from_row(await tenant.entry_writes.submit(row))
+        async with tenant.pool.acquire() as db:
+            stored = await upsert_entry(db, row)
             await db.commit()
-            
-            # Return the updated entry
-            async with db.execute(
-                'SELECT * FROM time_entries WHERE work_date = ? AND line_code = ?',
-                (entry.work_date, entry.line_code)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return TimeEntry(
-                    id=row[0],
-                    work_date=row[1],
-                    week_ending_date=row[2],
-                    line_code=row[3],
-                    st_hours=row[4],
-                    ot_hours=row[5],
-                    is_pay_week=bool(row[6]),
-                    created_at=row[7],
-                    updated_at=row[8]
-                )
+        return entry_from_row(stored)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/entries/batch")
+async def create_or_update_entries(entries: List[TimeEntryCreate], db: aiosqlite.Connection = Depends(get_db),
+                                   settings: AppSettings = Depends(get_app_settings)):
+    """Create or update many time entries in one transaction"""
+    if len(entries) > MAX_BATCH_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ENTRIES} entries per batch")
+    
+    # Week endings and pay week flags for the whole batch in one vectorized pass
+    days, valid = week_calendar.parse_dates([entry.work_date for entry in entries])
+    saturdays = week_calendar.week_endings(days[valid])
+    week_endings = iter(week_calendar.iso_dates(saturdays))
+    pay_flags = iter(week_calendar.pay_week_flags(
+        saturdays, settings.base_pay_week_ending, settings.pay_frequency_days
+    ).tolist())
+    
+    rows = {}
+    keys = []
+    results = []
+    for index, entry in enumerate(entries):
+        if not valid[index]:
+            keys.append(None)
+            results.append(BatchEntryResult(index=index, status='error',
+                                            detail=f"invalid work_date {entry.work_date!r}, expected YYYY-MM-DD"))
+            continue
+        
+        # Later rows for the same day and line win, as if posted one by one
+        key = (entry.work_date, entry.line_code)
+        rows[key] = (entry.work_date, next(week_endings), entry.line_code,
+                     entry.st_hours, entry.ot_hours, int(next(pay_flags)))
+        keys.append(key)
+        results.append(None)
+    
+    try:
+        stored = await upsert_entries(db, list(rows.values()))
+        await db.commit()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    for index, key in enumerate(keys):
+        if key is not None:
+            results[index] = BatchEntryResult(index=index, status='ok', entry=entry_from_row(stored[key]))
+    
+    return TimeEntryBatchResult(
+        applied=len(rows),
+        failed=sum(1 for key in keys if key is None),
+        results=results
+    )
+
+def summarize_totals(rows) -> dict:
+    """Totals, lines used and day/line breakdowns from (kind, key, st_hours, ot_hours) rows"""
+    total_st = 0
+    total_ot = 0
+    daily_totals = {}
+    line_totals = {}
+    
+    for kind, key, st_hours, ot_hours in rows:
+        totals = {'st': st_hours, 'ot': ot_hours, 'total': st_hours + ot_hours}
+        if kind == 'day':
+            daily_totals[key] = totals
+            total_st += st_hours
+            total_ot += ot_hours
+        else:
+            line_totals[key] = totals
+    
+    return dict(
+        total_st=total_st,
+        total_ot=total_ot,
+        total_hours=total_st + total_ot,
+        lines_used=sorted(line_totals),
+        daily_totals=daily_totals,
+        line_totals=line_totals
+    )
+
+def build_weekly_summary(week_ending: str, is_pay: bool, rows) -> WeeklySummary:
+    return WeeklySummary(week_ending_date=week_ending, is_pay_week=is_pay, **summarize_totals(rows))
+
+async def fetch_pay_periods(db: aiosqlite.Connection, settings: AppSettings,
+                            first_period: date, last_period: date) -> List[PayPeriodSummary]:
+    """Summaries for every pay period ending between first_period and last_period, empty ones included"""
+    frequency = settings.pay_frequency_days
+    params = {
+        'base': settings.base_pay_week_ending.isoformat(),
+        'frequency': frequency,
+        'start': get_period_start(first_period, frequency).isoformat(),
+        'end': last_period.isoformat(),
+    }
+    rows_by_period = {}
+    async with db.execute(PAY_PERIOD_TOTALS_SQL, params) as cursor:
+        async for period_ending, kind, key, st_hours, ot_hours in cursor:
+            rows_by_period.setdefault(period_ending, []).append((kind, key, st_hours, ot_hours))
+    
+    periods = []
+    for offset in range((last_period - first_period).days // frequency + 1):
+        period = first_period + timedelta(days=offset * frequency)
+        period_ending = period.isoformat()
+        periods.append(PayPeriodSummary(
+            period_start_date=get_period_start(period, frequency).isoformat(),
+            period_ending_date=period_ending,
+            **summarize_totals(rows_by_period.get(period_ending, ()))
+        ))
+    return periods
+
+async def fetch_period_reports(db: aiosqlite.Connection, sql: str, lines_sql: str, periods: List[str],
+                               line_codes: Optional[List[str]]) -> List[PeriodReport]:
+    """Reports for every period in ``periods`` (empty ones included), from a
+    rollup query over periods[0]..periods[-1], or with ``line_codes`` from
+    ``lines_sql`` over just those lines"""
+    if line_codes:
+        query = lines_sql.format(periods=', '.join('?' * len(periods)), lines=', '.join('?' * len(line_codes)))
+        params = [*periods, *line_codes]
+    else:
+        query, params = sql, (periods[0], periods[-1])
+    rows_by_period = {}
+    async with db.execute(query, params) as cursor:
+        async for period, line_code, st_hours, ot_hours, entries in cursor:
+            rows_by_period.setdefault(period, []).append((line_code, st_hours, ot_hours, entries))
+    
+    reports = []
+    for period in periods:
+        line_totals = {
+            line_code: {'st': st_hours, 'ot': ot_hours, 'total': st_hours + ot_hours, 'entries': entries}
+            for line_code, st_hours, ot_hours, entries in rows_by_period.get(period, ())
+        }
+        total_st = sum(totals['st'] for totals in line_totals.values())
+        total_ot = sum(totals['ot'] for totals in line_totals.values())
+        reports.append(PeriodReport(
+            period=period,
+            total_st=total_st,
+            total_ot=total_ot,
+            total_hours=total_st + total_ot,
+            entries=sum(totals['entries'] for totals in line_totals.values()),
+            lines_used=sorted(line_totals),
+            line_totals=line_totals
+        ))
+    return reports
 
 @api_router.get("/weekly-summary")
-async def get_weekly_summary(week_ending: str):
+async def get_weekly_summary(request: Request, response: Response, week_ending: str,
+                             db: aiosqlite.Connection = Depends(get_db),
+                             settings: AppSettings = Depends(get_app_settings)):
     """Get summary for a specific week"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Get all entries for the week
-            async with db.execute(
-                'SELECT * FROM time_entries WHERE week_ending_date = ?',
-                (week_ending,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-            
-            if not rows:
-                # No entries for this week
-                week_ending_obj = datetime.strptime(week_ending, '%Y-%m-%d').date()
-                async with db.execute(
-                    'SELECT value FROM settings WHERE key = ?',
-                    ('base_pay_week_ending',)
-                ) as cursor:
-                    row = await cursor.fetchone()
-                    base_date = datetime.strptime(row[0], '%Y-%m-%d').date() if row else date(2025, 11, 22)
-                
-                is_pay = is_pay_week(week_ending_obj, base_date)
-                
-                return WeeklySummary(
-                    week_ending_date=week_ending,
-                    is_pay_week=is_pay,
-                    total_st=0,
-                    total_ot=0,
-                    total_hours=0,
-                    lines_used=[],
-                    daily_totals={},
-                    line_totals={}
-                )
-            
-            total_st = 0
-            total_ot = 0
-            lines_used = set()
-            daily_totals = {}
-            line_totals = {}
-            
-            for row in rows:
-                st_hours = row[4]
-                ot_hours = row[5]
-                line_code = row[3]
-                work_date = row[1]
-                
-                total_st += st_hours
-                total_ot += ot_hours
-                lines_used.add(line_code)
-                
-                # Daily totals
-                if work_date not in daily_totals:
-                    daily_totals[work_date] = {'st': 0, 'ot': 0, 'total': 0}
-                daily_totals[work_date]['st'] += st_hours
-                daily_totals[work_date]['ot'] += ot_hours
-                daily_totals[work_date]['total'] += st_hours + ot_hours
-                
-                # Line totals
-                if line_code not in line_totals:
-                    line_totals[line_code] = {'st': 0, 'ot': 0, 'total': 0}
-                line_totals[line_code]['st'] += st_hours
-                line_totals[line_code]['ot'] += ot_hours
-                line_totals[line_code]['total'] += st_hours + ot_hours
-            
-            is_pay = bool(rows[0][6]) if rows else False
-            
-            return WeeklySummary(
-                week_ending_date=week_ending,
-                is_pay_week=is_pay,
-                total_st=total_st,
-                total_ot=total_ot,
-                total_hours=total_st + total_ot,
-                lines_used=sorted(list(lines_used)),
-                daily_totals=daily_totals,
-                line_totals=line_totals
-            )
+        week_ending_obj = datetime.strptime(week_ending, '%Y-%m-%d').date()
+        # The pay week flag depends on the settings as well as on the week's entries
+        not_modified = await check_not_modified(request, response, db, week_scope(week_ending), settings=settings)
+        if not_modified is not None:
+            return not_modified
+        is_pay = is_pay_week(week_ending_obj, settings.base_pay_week_ending, settings.pay_frequency_days)
+        
+        # Day and line totals are kept current by triggers on time_entries
+        async with db.execute(WEEK_SUMMARY_SQL, (week_ending,)) as cursor:
+            rows = await cursor.fetchall()
+        
+        return build_weekly_summary(week_ending, is_pay, rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/summaries", response_model=WeeklySummaryPage)
+async def get_summaries(start: str, end: str, limit: int = DEFAULT_SUMMARY_WEEKS,
+                        db: aiosqlite.Connection = Depends(get_db),
+                        settings: AppSettings = Depends(get_app_settings)):
+    """Weekly summaries for every week touching start..end, including empty weeks"""
+    if not 1 <= limit <= MAX_SUMMARY_WEEKS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SUMMARY_WEEKS}")
+    # Weeks past date.max raise OverflowError
+    try:
+        first_week = get_week_ending(datetime.strptime(start, '%Y-%m-%d').date())
+        last_week = get_week_ending(datetime.strptime(end, '%Y-%m-%d').date())
+        if last_week < first_week:
+            raise ValueError("end must not be before start")
+        weeks = min((last_week - first_week).days // 7 + 1, limit)
+        page_end = first_week + timedelta(weeks=weeks - 1)
+        next_start = page_end + timedelta(weeks=1) if page_end < last_week else None
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows_by_week = {}
+    async with db.execute(RANGE_SUMMARY_SQL, (first_week.isoformat(), page_end.isoformat())) as cursor:
+        async for week_ending, kind, key, st_hours, ot_hours in cursor:
+            rows_by_week.setdefault(week_ending, []).append((kind, key, st_hours, ot_hours))
+    
+    summaries = []
+    for offset in range(weeks):
+        week = first_week + timedelta(weeks=offset)
+        week_ending = week.isoformat()
+        is_pay = is_pay_week(week, settings.base_pay_week_ending, settings.pay_frequency_days)
+        summaries.append(build_weekly_summary(week_ending, is_pay, rows_by_week.get(week_ending, ())))
+    
+    return WeeklySummaryPage(
+        summaries=summaries,
+        next_start=next_start.isoformat() if next_start else None
+    )
+
+@api_router.get("/reports/monthly", response_model=List[PeriodReport])
+async def get_monthly_report(request: Request, response: Response, start: str, end: str,
+                             line_code: Optional[List[str]] = Query(None),
+                             db: aiosqlite.Connection = Depends(get_db)):
+    """Totals by line for every month from start to end (YYYY-MM), empty months included"""
+    try:
+        first = datetime.strptime(start, '%Y-%m').date()
+        last = datetime.strptime(end, '%Y-%m').date()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if last < first:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    first_month = first.year * 12 + first.month - 1
+    count = last.year * 12 + last.month - first_month
+    if count > MAX_REPORT_MONTHS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_REPORT_MONTHS} months per report")
+    
+    not_modified = await check_not_modified(request, response, db, 'time_entries')
+    if not_modified is not None:
+        return not_modified
+    months = [f'{month // 12:04d}-{month % 12 + 1:02d}' for month in range(first_month, first_month + count)]
+    return await fetch_period_reports(db, MONTHLY_REPORT_SQL, MONTHLY_LINES_REPORT_SQL, months, line_code)
+
+@api_router.get("/reports/yearly", response_model=List[PeriodReport])
+async def get_yearly_report(request: Request, response: Response, start: str, end: str,
+                            line_code: Optional[List[str]] = Query(None),
+                            db: aiosqlite.Connection = Depends(get_db)):
+    """Totals by line for every year from start to end (YYYY), empty years included"""
+    try:
+        first = datetime.strptime(start, '%Y').year
+        last = datetime.strptime(end, '%Y').year
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if last < first:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if last - first + 1 > MAX_REPORT_YEARS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_REPORT_YEARS} years per report")
+    
+    not_modified = await check_not_modified(request, response, db, 'time_entries')
+    if not_modified is not None:
+        return not_modified
+    years = [f'{year:04d}' for year in range(first, last + 1)]
+    return await fetch_period_reports(db, YEARLY_REPORT_SQL, YEARLY_LINES_REPORT_SQL, years, line_code)
+
+@api_router.get("/pay-periods", response_model=PayPeriodPage)
+async def get_pay_periods(start: str, end: str, limit: int = DEFAULT_PAY_PERIODS,
+                          db: aiosqlite.Connection = Depends(get_db),
+                          settings: AppSettings = Depends(get_app_settings)):
+    """Pay period summaries for every period touching start..end"""
+    base, frequency = settings.base_pay_week_ending, settings.pay_frequency_days
+    if not 1 <= limit <= MAX_PAY_PERIODS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAY_PERIODS}")
+    # Periods that start before date.min or end after date.max raise OverflowError
+    try:
+        first_period = get_period_ending(datetime.strptime(start, '%Y-%m-%d').date(), base, frequency)
+        last_period = get_period_ending(datetime.strptime(end, '%Y-%m-%d').date(), base, frequency)
+        if last_period < first_period:
+            raise ValueError("end must not be before start")
+        get_period_start(first_period, frequency)
+        periods = min((last_period - first_period).days // frequency + 1, limit)
+        page_end = first_period + timedelta(days=frequency * (periods - 1))
+        next_start = page_end + timedelta(days=frequency) if page_end < last_period else None
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PayPeriodPage(
+        periods=await fetch_pay_periods(db, settings, first_period, page_end),
+        next_start=next_start.isoformat() if next_start else None
+    )
+
+@api_router.get("/pay-periods/{period_ending}", response_model=PayPeriodSummary)
+async def get_pay_period(period_ending: str, db: aiosqlite.Connection = Depends(get_db),
+                         settings: AppSettings = Depends(get_app_settings)):
+    """Totals by line and by day for the pay period ending on period_ending"""
+    try:
+        period = datetime.strptime(period_ending, '%Y-%m-%d').date()
+        get_period_start(period, settings.pay_frequency_days)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not is_pay_week(period, settings.base_pay_week_ending, settings.pay_frequency_days):
+        raise HTTPException(status_code=400, detail=f"{period_ending} does not end a pay period")
+    return (await fetch_pay_periods(db, settings, period, period))[0]
+
 @api_router.get("/lines")
-async def get_lines():
+async def get_lines(request: Request, response: Response, db: aiosqlite.Connection = Depends(get_db)):
     """Get all line codes"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute('SELECT * FROM line_codes ORDER BY sort_order') as cursor:
-                rows = await cursor.fetchall()
-                lines = []
-                for row in rows:
-                    lines.append(LineCode(
-                        line_code=row[0],
-                        label=row[1],
-                        is_project=bool(row[2]),
-                        is_visible=bool(row[3]),
-                        sort_order=row[4],
-                        created_at=row[5]
-                    ))
-                return lines
+        not_modified = await check_not_modified(request, response, db, 'line_codes')
+        if not_modified is not None:
+            return not_modified
+        async with db.execute('SELECT * FROM line_codes ORDER BY sort_order') as cursor:
+            cursor.row_factory = dict_rows(line_code_dict)
+            return FastJSONResponse(await cursor.fetchall(), headers=response.headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/sync")
+async def sync(since: int = 0, limit: int = DEFAULT_SYNC_PAGE, cursor: Optional[str] = None,
+               db: aiosqlite.Connection = Depends(get_db)):
+    """Entries, line codes and settings changed after revision ``since``,
+    with the keys of those deleted since then.
+    
+    Each change is listed once, as its latest state. Pass next_cursor back
+    as cursor= (with the same since) until it is null, then keep the last
+    page's revision as the next since. A since of 0 fetches everything; a
+    409 (since is from another database, or from before a restore) means
+    the client should drop its copy and do that.
+    """
+    if not 1 <= limit <= MAX_SYNC_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SYNC_PAGE}")
+    if cursor:
+        query, params = SYNC_AFTER_CURSOR_SQL, {**decode_sync_cursor(cursor), 'limit': limit + 1}
+    else:
+        query, params = SYNC_SINCE_SQL, {'since': since, 'limit': limit + 1}
+    # One read snapshot, so the revision matches the changes listed
+    await db.execute('BEGIN')
+    try:
+        revision, restored = await get_revisions(db, 'database', 'restore')
+        if since > revision:
+            raise HTTPException(status_code=409,
+                                detail=f"since {since} is ahead of this database (revision {revision}); sync from 0")
+        if 0 < since < restored:
+            raise HTTPException(status_code=409,
+                                detail=f"the database was restored from a backup at revision {restored}; sync from 0")
+        async with db.execute(query, params) as db_cursor:
+            changes = await db_cursor.fetchall()
+    finally:
+        await db.rollback()
+    
+    # One extra row says whether another page follows
+    next_cursor = None
+    if len(changes) > limit:
+        del changes[limit:]
+        next_cursor = encode_sync_cursor(*changes[-1][:3])
+    body = {'revision': revision, 'next_cursor': next_cursor, 'entries': [], 'line_codes': [], 'settings': [],
+            'deleted': {'entries': [], 'line_codes': [], 'settings': []}}
+    deleted = body['deleted']
+    for row in changes:
+        entity, key = row[1], row[2]
+        # A live change whose row is gone was deleted with the triggers off
+        if entity == 'entry':
+            if row[4] is not None:
+                body['entries'].append(entry_dict(row[4:13]))
+            else:
+                work_date, line_code = json.loads(key)
+                deleted['entries'].append({'work_date': work_date, 'line_code': line_code})
+        elif entity == 'line_code':
+            if row[13] is not None:
+                body['line_codes'].append(line_code_dict(row[13:19]))
+            else:
+                deleted['line_codes'].append(key)
+        elif row[19] is not None:
+            body['settings'].append(setting_dict(row[19:22]))
+        else:
+            deleted['settings'].append(key)
+    return FastJSONResponse(body)
+
 @api_router.post("/lines")
-async def create_line(line: LineCodeCreate):
+async def create_line(line: LineCodeCreate, db: aiosqlite.Connection = Depends(get_db)):
     """Create a new line code (typically for projects)"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Get max sort order
-            async with db.execute('SELECT MAX(sort_order) FROM line_codes') as cursor:
-                row = await cursor.fetchone()
-                max_sort = row[0] if row[0] else 0
-            
-            label = line.label if line.label else line.line_code
-            
-            await db.execute(
-                'INSERT INTO line_codes (line_code, label, is_project, is_visible, sort_order) VALUES (?, ?, ?, ?, ?)',
-                (line.line_code, label, int(line.is_project), 1, max_sort + 1)
+        # Get max sort order
+        async with db.execute('SELECT MAX(sort_order) FROM line_codes') as cursor:
+            row = await cursor.fetchone()
+            max_sort = row[0] if row[0] else 0
+        
+        label = line.label if line.label else line.line_code
+        
+        await db.execute(
+            'INSERT INTO line_codes (line_code, label, is_project, is_visible, sort_order) VALUES (?, ?, ?, ?, ?)',
+            (line.line_code, label, int(line.is_project), 1, max_sort + 1)
+        )
+        await db.commit()
+        
+        async with db.execute(
+            'SELECT * FROM line_codes WHERE line_code = ?',
+            (line.line_code,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return LineCode(
+                line_code=row[0],
+                label=row[1],
+                is_project=bool(row[2]),
+                is_visible=bool(row[3]),
+                sort_order=row[4],
+                created_at=row[5]
             )
-            await db.commit()
-            
-            async with db.execute(
-                'SELECT * FROM line_codes WHERE line_code = ?',
-                (line.line_code,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return LineCode(
-                    line_code=row[0],
-                    label=row[1],
-                    is_project=bool(row[2]),
-                    is_visible=bool(row[3]),
-                    sort_order=row[4],
-                    created_at=row[5]
-                )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/lines/{line_code}")
-async def update_line(line_code: str, update: LineCodeUpdate):
+async def update_line(line_code: str, update: LineCodeUpdate, db: aiosqlite.Connection = Depends(get_db)):
     """Update line visibility"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                'UPDATE line_codes SET is_visible = ? WHERE line_code = ?',
-                (int(update.is_visible), line_code)
+        await db.execute(
+            'UPDATE line_codes SET is_visible = ? WHERE line_code = ?',
+            (int(update.is_visible), line_code)
+        )
+        await db.commit()
+        
+        async with db.execute(
+            'SELECT * FROM line_codes WHERE line_code = ?',
+            (line_code,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Line code not found")
+            return LineCode(
+                line_code=row[0],
+                label=row[1],
+                is_project=bool(row[2]),
+                is_visible=bool(row[3]),
+                sort_order=row[4],
+                created_at=row[5]
             )
-            await db.commit()
-            
-            async with db.execute(
-                'SELECT * FROM line_codes WHERE line_code = ?',
-                (line_code,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    raise HTTPException(status_code=404, detail="Line code not found")
-                return LineCode(
-                    line_code=row[0],
-                    label=row[1],
-                    is_project=bool(row[2]),
-                    is_visible=bool(row[3]),
-                    sort_order=row[4],
-                    created_at=row[5]
-                )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/lines/{line_code}")
-async def delete_line(line_code: str):
+async def delete_line(line_code: str, db: aiosqlite.Connection = Depends(get_db)):
     """Delete a line code (only projects)"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Check if it's a project line
-            async with db.execute(
-                'SELECT is_project FROM line_codes WHERE line_code = ?',
-                (line_code,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    raise HTTPException(status_code=404, detail="Line code not found")
-                if not row[0]:
-                    raise HTTPException(status_code=400, detail="Cannot delete standard line codes")
-            
-            await db.execute('DELETE FROM line_codes WHERE line_code = ?', (line_code,))
-            await db.commit()
-            return {"message": "Line code deleted"}
+        # Check if it's a project line
+        async with db.execute(
+            'SELECT is_project FROM line_codes WHERE line_code = ?',
+            (line_code,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Line code not found")
+            if not row[0]:
+                raise HTTPException(status_code=400, detail="Cannot delete standard line codes")
+        
+        await db.execute('DELETE FROM line_codes WHERE line_code = ?', (line_code,))
+        await db.commit()
+        return {"message": "Line code deleted"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/settings")
-async def get_settings():
+async def get_settings(request: Request, response: Response, db: aiosqlite.Connection = Depends(get_db)):
     """Get all settings"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute('SELECT * FROM settings') as cursor:
-                rows = await cursor.fetchall()
-                settings = []
-                for row in rows:
-                    settings.append(Setting(
-                        key=row[0],
-                        value=row[1],
-                        updated_at=row[2]
-                    ))
-                return settings
+        not_modified = await check_not_modified(request, response, db, 'settings')
+        if not_modified is not None:
+            return not_modified
+        async with db.execute('SELECT * FROM settings') as cursor:
+            cursor.row_factory = dict_rows(setting_dict)
+            return FastJSONResponse(await cursor.fetchall(), headers=response.headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/settings/{key}")
-async def update_setting(key: str, setting: Setting):
+async def update_setting(key: str, setting: Setting, db: aiosqlite.Connection = Depends(get_db),
+                         tenant: Tenant = Depends(get_tenant)):
     """Update a setting"""
+    parse = SETTING_PARSERS.get(key)
+    if parse is not None:
+        try:
+            parse(setting.value)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"invalid {key}: {e}")
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                'INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
-                (key, setting.value)
+        await db.execute(
+            'INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+            (key, setting.value)
+        )
+        await db.commit()
+        await reload_settings(tenant, db)
+        
+        async with db.execute(
+            'SELECT * FROM settings WHERE key = ?',
+            (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return Setting(
+                key=row[0],
+                value=row[1],
+                updated_at=row[2]
             )
-            await db.commit()
-            
-            async with db.execute(
-                'SELECT * FROM settings WHERE key = ?',
-                (key,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return Setting(
-                    key=row[0],
-                    value=row[1],
-                    updated_at=row[2]
-                )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/jobs/pay-week-recompute")
+async def get_pay_week_recompute(tenant: Tenant = Depends(get_tenant)):
+    """Status of the latest recompute of stored pay week flags"""
+    status = tenant.pay_weeks.status
+    if status is None:
+        raise HTTPException(status_code=404, detail="No recompute has run since startup")
+    return status
+
+@api_router.post("/jobs/pay-week-recompute", status_code=202)
+async def start_pay_week_recompute(tenant: Tenant = Depends(get_tenant),
+                                   settings: AppSettings = Depends(get_app_settings)):
+    """Recompute stored pay week flags against the current settings"""
+    return await tenant.pay_weeks.start(settings.base_pay_week_ending, settings.pay_frequency_days)
+
+async def stream_export_ndjson(tenant_id: str, start_date: Optional[str], end_date: Optional[str]):
+    """Yield the export as NDJSON, one tagged record per line, a chunk at a time"""
+    # The request's own tenant and connection are released before the body
+    # is sent, so the stream holds its own for as long as it runs
+    async with app.state.tenants.use(tenant_id) as tenant, tenant.pool.acquire_read() as db:
+        # One read transaction keeps every record in the same snapshot
+        await db.execute('BEGIN')
+        yield json_bytes({'type': 'export', 'export_date': datetime.now().isoformat()}) + b'\n'
+        
+        sources = [
+            ('line_code', line_code_dict, 'SELECT * FROM line_codes', ()),
+            ('setting', setting_dict, 'SELECT * FROM settings', ()),
+        ]
+        if start_date and end_date:
+            sources.append(('entry', entry_dict, EXPORT_RANGE_SQL, (start_date, end_date)))
+        else:
+            sources.append(('entry', entry_dict, 'SELECT * FROM time_entries', ()))
+        
+        for record_type, to_dict, query, params in sources:
+            async with db.execute(query, params) as cursor:
+                cursor.row_factory = dict_rows(lambda row: {'type': record_type, **to_dict(row)})
+                while True:
+                    records = await cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                    if not records:
+                        break
+                    metrics.EXPORT_ROWS.inc('ndjson', record_type, amount=len(records))
+                    yield b'\n'.join(map(json_bytes, records)) + b'\n'
+        await db.rollback()
+
+async def read_export_columns(db: aiosqlite.Connection, start_date: Optional[str], end_date: Optional[str]):
+    """The entries as columnar arrays, all read and checked before the
+    response starts, so a bad row is an error status rather than a cut-off archive"""
+    # One read transaction keeps every column in the same snapshot
+    await db.execute('BEGIN')
+    try:
+        columns = await columnar.read_columns(db, start_date, end_date, chunk_rows=EXPORT_CHUNK_ROWS)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"cannot export entries as columns: {e}")
+    finally:
+        await db.rollback()
+    metrics.EXPORT_ROWS.inc('columnar', 'entry', amount=len(columns['work_day']))
+    return columns
+
 @api_router.get("/export")
-async def export_data(start_date: Optional[str] = None, end_date: Optional[str] = None):
-    """Export all data as JSON"""
+async def export_data(start_date: Optional[str] = None, end_date: Optional[str] = None, format: str = 'json',
+                      tenant: Tenant = Depends(get_tenant)):
+    """Export all data as JSON, or as streamed NDJSON with format=ndjson, or
+    the entries alone as NumPy column arrays (see columnar.py) with format=columnar"""
+    # Only the formats read here borrow a reader; the NDJSON stream holds its own
+    if format == 'ndjson':
+        return StreamingResponse(stream_export_ndjson(tenant.id, start_date, end_date),
+                                 media_type='application/x-ndjson')
+    if format == 'columnar':
+        async with tenant.pool.acquire_read() as db:
+            columns = await read_export_columns(db, start_date, end_date)
+        return StreamingResponse(columnar.iter_npz(columns), media_type=columnar.MEDIA_TYPE,
+                                 headers={'Content-Disposition': 'attachment; filename="entries.npz"'})
+    if format != 'json':
+        raise HTTPException(status_code=400, detail="format must be 'json', 'ndjson' or 'columnar'")
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with tenant.pool.acquire_read() as db:
             # Get entries
             if start_date and end_date:
-                query = 'SELECT * FROM time_entries WHERE work_date >= ? AND work_date <= ?'
-                async with db.execute(query, (start_date, end_date)) as cursor:
-                    entry_rows = await cursor.fetchall()
+                async with db.execute(EXPORT_RANGE_SQL, (start_date, end_date)) as cursor:
+                    cursor.row_factory = dict_rows(entry_dict)
+                    entries = await cursor.fetchall()
             else:
                 async with db.execute('SELECT * FROM time_entries') as cursor:
-                    entry_rows = await cursor.fetchall()
+                    cursor.row_factory = dict_rows(entry_dict)
+                    entries = await cursor.fetchall()
             
             # Get lines
             async with db.execute('SELECT * FROM line_codes') as cursor:
-                line_rows = await cursor.fetchall()
+                cursor.row_factory = dict_rows(line_code_dict)
+                line_codes = await cursor.fetchall()
             
             # Get settings
             async with db.execute('SELECT * FROM settings') as cursor:
-                setting_rows = await cursor.fetchall()
-            
-            entries = []
-            for row in entry_rows:
-                entries.append({
-                    'id': row[0],
-                    'work_date': row[1],
-                    'week_ending_date': row[2],
-                    'line_code': row[3],
-                    'st_hours': row[4],
-                    'ot_hours': row[5],
-                    'is_pay_week': bool(row[6]),
-                    'created_at': row[7],
-                    'updated_at': row[8]
-                })
-            
-            lines = []
-            for row in line_rows:
-                lines.append({
-                    'line_code': row[0],
-                    'label': row[1],
-                    'is_project': bool(row[2]),
-                    'is_visible': bool(row[3]),
-                    'sort_order': row[4],
-                    'created_at': row[5]
-                })
-            
-            settings = []
-            for row in setting_rows:
-                settings.append({
-                    'key': row[0],
-                    'value': row[1],
-                    'updated_at': row[2]
-                })
-            
-            return {
-                'export_date': datetime.now().isoformat(),
-                'entries': entries,
-                'line_codes': lines,
-                'settings': settings
-            }
+                cursor.row_factory = dict_rows(setting_dict)
+                settings = await cursor.fetchall()
+        
+        metrics.EXPORT_ROWS.inc('json', 'entry', amount=len(entries))
+        metrics.EXPORT_ROWS.inc('json', 'line_code', amount=len(line_codes))
+        metrics.EXPORT_ROWS.inc('json', 'setting', amount=len(settings))
+        return FastJSONResponse({
+            'export_date': datetime.now().isoformat(),
+            'entries': entries,
+            'line_codes': line_codes,
+            'settings': settings
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/import")
-async def import_data(data: dict):
-    """Import data from JSON export"""
+def log_import_progress(counts: dict):
+    logger.info("Import progress: %d entries, %d line codes, %d settings",
+                counts['entry'], counts['line_code'], counts['setting'])
+
+async def run_import(tenant: Tenant, db: aiosqlite.Connection, records) -> ImportResult:
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Import line codes
-            if 'line_codes' in data:
-                for line in data['line_codes']:
-                    await db.execute(
-                        '''INSERT OR REPLACE INTO line_codes (line_code, label, is_project, is_visible, sort_order)
-                           VALUES (?, ?, ?, ?, ?)''',
-                        (line['line_code'], line['label'], int(line['is_project']), 
-                         int(line['is_visible']), line['sort_order'])
-                    )
-            
-            # Import settings
-            if 'settings' in data:
-                for setting in data['settings']:
-                    await db.execute(
-                        'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
-                        (setting['key'], setting['value'])
-                    )
-            
-            # Import entries
-            if 'entries' in data:
-                for entry in data['entries']:
-                    await db.execute(
-                        '''INSERT OR REPLACE INTO time_entries 
-                           (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week)
-                           VALUES (?, ?, ?, ?, ?, ?)''',
-                        (entry['work_date'], entry['week_ending_date'], entry['line_code'],
-                         entry['st_hours'], entry['ot_hours'], int(entry['is_pay_week']))
-                    )
-            
-            await db.commit()
-            return {"message": "Data imported successfully"}
+        counts = await import_records(db, records, progress=log_import_progress)
+    except (ImportValidationError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    for record_type in ('entry', 'line_code', 'setting'):
+        metrics.IMPORT_ROWS.inc(record_type, amount=counts[record_type])
+    await reload_settings(tenant, db)
+    return ImportResult(
+        message="Data imported successfully",
+        entries=counts['entry'],
+        line_codes=counts['line_code'],
+        settings=counts['setting'],
+        chunks=counts['chunks']
+    )
+
+@api_router.post("/import")
+async def import_data(data: dict, db: aiosqlite.Connection = Depends(get_db),
+                      tenant: Tenant = Depends(get_tenant)):
+    """Import data from JSON export"""
+    return await run_import(tenant, db, iter_export_dict_records(data))
+
+@api_router.post("/import/stream")
+async def import_stream(request: Request, format: Optional[str] = None, db: aiosqlite.Connection = Depends(get_db),
+                        tenant: Tenant = Depends(get_tenant)):
+    """Import a JSON or NDJSON export, parsing the request body as it arrives"""
+    if format is None:
+        format = 'ndjson' if 'ndjson' in request.headers.get('content-type', '') else 'json'
+    if format not in ('json', 'ndjson'):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    
+    async def text_chunks():
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        async for chunk in request.stream():
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+    
+    if format == 'ndjson':
+        records = iter_ndjson_records(text_chunks())
+    else:
+        records = iter_json_export_records(text_chunks())
+    return await run_import(tenant, db, records)
+
+def backup_dict(path: Path) -> dict:
+    return next(backup for backup in list_backups(path.parent) if backup['name'] == path.name)
+
+@api_router.get("/backups")
+async def get_backups(tenant: Tenant = Depends(get_tenant)):
+    """Stored backups of the tenant's database, newest first"""
+    return list_backups(tenant.backups.directory)
+
+@api_router.post("/backups", status_code=201)
+async def create_backup(tenant: Tenant = Depends(get_tenant)):
+    """Store a backup of the tenant's database now"""
+    return backup_dict(await tenant.backups.backup_now())
+
+@api_router.get("/backups/snapshot")
+async def download_snapshot(db: aiosqlite.Connection = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    """A consistent copy of the tenant's database as a SQLite file, taken
+    while writes carry on"""
+    directory = tenant.backups.directory
+    directory.mkdir(parents=True, exist_ok=True)
+    name = backup_name()
+    # Not a .db name, so it is never listed as a stored backup
+    path = await snapshot(db, directory / f'{name}.download', BACKUP_PAGES_PER_STEP)
+    return FileResponse(path, media_type='application/vnd.sqlite3', filename=f'{tenant.id}-{name}',
+                        background=BackgroundTask(path.unlink, missing_ok=True))
+
+async def restore_backup(tenant: Tenant, path: Path) -> int:
+    """Swap the tenant's database for the one at ``path``, which is modified
+    on the way; returns the revision the restored database starts at"""
+    await check_backup(path)
+    async with aiosqlite.connect(path) as source:
+        # Older backups are brought up to the current schema first
+        await init_db(source)
+        async with tenant.pool.acquire() as db:
+            revision, = await get_revisions(db, 'database')
+            revision = await restart_revisions(source, revision)
+            await restore(db, source)
+            await reload_settings(tenant, db)
+    return revision
+
+@api_router.post("/backups/restore")
+async def restore_database(request: Request, name: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Replace the tenant's database with a stored backup (name=) or with the
+    SQLite file in the request body. Readers see either the old database or
+    the restored one, never a mix."""
+    directory = tenant.backups.directory
+    directory.mkdir(parents=True, exist_ok=True)
+    work = directory / f'{backup_name()}.restore'
+    try:
+        if name:
+            stored = directory / name
+            if Path(name).name != name or not name.endswith('.db') or not stored.is_file():
+                raise HTTPException(status_code=404, detail="Backup not found")
+            # Restoring modifies the file, so work on a copy
+            await asyncio.to_thread(shutil.copyfile, stored, work)
+        else:
+            with open(work, 'wb') as file:
+                async for chunk in request.stream():
+                    file.write(chunk)
+        try:
+            revision = await restore_backup(tenant, work)
+        except InvalidBackup as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        work.unlink(missing_ok=True)
+    logger.info("Restored tenant %s at revision %d", tenant.id, revision)
+    return {"message": "Database restored", "revision": revision}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -657,6 +1325,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so it times everything the app does for a request
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -665,11 +1335,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def tenant_db_path(tenant_id: str) -> Path:
+    if tenant_id == DEFAULT_TENANT:
+        return DB_PATH
+    return Path(TENANT_DB_DIR or DB_PATH.parent / 'tenant_dbs') / f'{tenant_id}.db'
+
+async def open_tenant(tenant_id: str) -> Tenant:
+    """Open a tenant's database, creating and migrating it on first use"""
+    path = tenant_db_path(tenant_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    readers = DB_POOL_SIZE if tenant_id == DEFAULT_TENANT else TENANT_POOL_SIZE
+    if readers > 0:
+        pool = ReadWritePool(path, readers=readers, busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                             slow_query_log=app.state.slow_query_log)
+    else:
+        pool = ConnectionPool(path, size=0, busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                              slow_query_log=app.state.slow_query_log)
+    await pool.open()
+    try:
+        settings = SettingsStore()
+        async with pool.acquire() as db:
+            await init_db(db)
+            await settings.load(db)
+    except BaseException:
+        await pool.close()
+        raise
+    settings.start_watching(path, SETTINGS_REFRESH_SECONDS)
+    pay_weeks = PayWeekRecomputer(pool, chunk_weeks=PAY_WEEK_RECOMPUTE_CHUNK_WEEKS, schedule=(
+        settings.current.base_pay_week_ending, settings.current.pay_frequency_days))
+    entry_writes = (WriteCoalescer(pool, upsert_entry, ENTRY_WRITE_WINDOW_MS / 1000, ENTRY_WRITE_BATCH_ROWS)
+                    if ENTRY_WRITE_WINDOW_MS > 0 else None)
+    backups = BackupScheduler(pool, Path(BACKUP_DIR or DB_PATH.parent / 'db_backups') / tenant_id,
+                              BACKUP_INTERVAL_SECONDS, keep=BACKUP_KEEP, pages_per_step=BACKUP_PAGES_PER_STEP)
+    backups.start()
+    return Tenant(tenant_id, path, pool, settings, pay_weeks, entry_writes, backups)
+
 @app.on_event("startup")
 async def startup():
-    await init_db()
+    app.state.slow_query_log = (SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG_INTERVAL_SECONDS)
+                                if SLOW_QUERY_MS > 0 else None)
+    app.state.tenants = TenantRegistry(open_tenant, max_open=TENANT_MAX_OPEN, idle_seconds=TENANT_IDLE_SECONDS)
+    await app.state.tenants.start()
     logger.info("Database initialized")
 
 @app.on_event("shutdown")
 async def shutdown():
+    await app.state.tenants.close()
     logger.info("Shutting down")
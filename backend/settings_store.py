@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple, Union
+
+import aiosqlite
+
+from revisions import get_revisions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_PAY_WEEK_ENDING = date(2025, 11, 22)
+DEFAULT_PAY_FREQUENCY_DAYS = 14
+
+
+def parse_base_pay_week_ending(value: str) -> date:
+    """A YYYY-MM-DD Saturday; raises ValueError otherwise"""
+    try:
+        base = datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"base_pay_week_ending must be a YYYY-MM-DD date, not {value!r}")
+    if base.weekday() != 5:
+        raise ValueError(f"base_pay_week_ending must be a Saturday, not a {base.strftime('%A')}")
+    return base
+
+
+def parse_pay_frequency_days(value: str) -> int:
+    """A positive whole number of weeks, in days; raises ValueError otherwise"""
+    try:
+        frequency = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"pay_frequency_days must be a whole number of days, not {value!r}")
+    # Pay weeks are whole Saturday-ending weeks
+    if frequency <= 0 or frequency % 7:
+        raise ValueError(f"pay_frequency_days must be a positive multiple of 7, not {frequency}")
+    return frequency
+
+
+# Settings with a typed value: key -> parser raising ValueError
+SETTING_PARSERS = {
+    'base_pay_week_ending': parse_base_pay_week_ending,
+    'pay_frequency_days': parse_pay_frequency_days,
+}
+
+
+@dataclass(frozen=True)
+class AppSettings:
+    """Immutable, parsed snapshot of the settings table"""
+    base_pay_week_ending: date = DEFAULT_BASE_PAY_WEEK_ENDING
+    pay_frequency_days: int = DEFAULT_PAY_FREQUENCY_DAYS
+    values: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    # Revision of the 'settings' scope these values were read at
+    revision: int = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str]], revision: int = 0) -> 'AppSettings':
+        values = dict(rows)
+        base = DEFAULT_BASE_PAY_WEEK_ENDING
+        frequency = DEFAULT_PAY_FREQUENCY_DAYS
+        # PUT /settings refuses bad values; these can only come from an import or an older version
+        try:
+            if 'base_pay_week_ending' in values:
+                base = parse_base_pay_week_ending(values['base_pay_week_ending'])
+        except ValueError:
+            logger.warning("Ignoring invalid base_pay_week_ending %r", values['base_pay_week_ending'])
+        try:
+            if 'pay_frequency_days' in values:
+                frequency = parse_pay_frequency_days(values['pay_frequency_days'])
+        except ValueError:
+            logger.warning("Ignoring invalid pay_frequency_days %r", values['pay_frequency_days'])
+        return cls(base_pay_week_ending=base, pay_frequency_days=frequency, values=MappingProxyType(values),
+                   revision=revision)
+
+
+class SettingsStore:
+    """In-process cache of the settings table.
+
+    Handlers read ``current`` without touching the database. Writes made by
+    this worker call ``load()`` on the writing connection right after commit.
+    Writes made by other workers are picked up by ``watch()``, which polls
+    ``PRAGMA data_version`` on its own connection (an in-memory counter that
+    changes whenever another connection commits) and reloads when it moves.
+    The snapshot is replaced by a single assignment, so readers always see
+    either the old or the new settings, never a mix.
+    """
+
+    def __init__(self):
+        self._current = AppSettings()
+        self._task: Optional[asyncio.Task] = None
+        # Loads are numbered when they start; a slow load that started before
+        # a newer one must not overwrite the newer snapshot when it finishes
+        self._next_ticket = 0
+        self._applied_ticket = -1
+
+    @property
+    def current(self) -> AppSettings:
+        return self._current
+
+    async def load(self, db: aiosqlite.Connection) -> AppSettings:
+        """Re-read the settings table and swap in a new snapshot"""
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        # Rows and revision from one snapshot, so ETags built from the
+        # revision describe exactly these values
+        own_transaction = not db.in_transaction
+        if own_transaction:
+            await db.execute('BEGIN')
+        try:
+            async with db.execute('SELECT key, value FROM settings') as cursor:
+                rows = await cursor.fetchall()
+            revision, = await get_revisions(db, 'settings')
+        finally:
+            if own_transaction:
+                await db.rollback()
+        if ticket > self._applied_ticket:
+            self._applied_ticket = ticket
+            self._current = AppSettings.from_rows(rows, revision)
+        return self._current
+
+    def start_watching(self, path: Union[str, Path], interval: float):
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch(path, interval))
+
+    async def stop_watching(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, path: Union[str, Path], interval: float):
+        async with aiosqlite.connect(path) as db:
+            last_version = None
+            while True:
+                try:
+                    async with db.execute('PRAGMA data_version') as cursor:
+                        version = (await cursor.fetchone())[0]
+                    if version != last_version:
+                        await self.load(db)
+                        last_version = version
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Settings refresh failed")
+                await asyncio.sleep(interval)
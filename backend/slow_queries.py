@@ -0,0 +1,91 @@
+"""Slow query log with sampled EXPLAIN QUERY PLAN capture.
+
+Pooled connections hand every statement's duration to a SlowQueryLog.
+Statements over the threshold are counted in metrics. At most one per
+statement per interval is logged, with its parameter types (never the
+values), its duration and its query plan, flagged when the plan scans
+the whole of time_entries. The EXPLAIN runs on the same connection right
+after the slow statement, so the plan is the one that was used.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+from metrics import DB_SLOW_QUERIES, statement_label
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN QUERY PLAN can describe (not PRAGMA, BEGIN, COMMIT, ...)
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+# "time_entries te", "time_entries AS te": plans name the table by its alias
+_ALIAS_RE = re.compile(
+    r'\btime_entries\s+(?:AS\s+)?(?!(?:WHERE|SET|ORDER|GROUP|JOIN|ON|USING|LIMIT|VALUES|INNER|LEFT|CROSS|NATURAL|'
+    r'DEFAULT|SELECT|UNION|HAVING|WINDOW|RETURNING)\b)([A-Za-z_]\w*)',
+    re.IGNORECASE)
+
+
+def parameter_shape(parameters: Any) -> str:
+    """Types of the bound parameters, e.g. ``(str, str, int)``"""
+    if not parameters:
+        return '()'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+def full_scans_of_time_entries(sql: str, plan: List[str]) -> List[str]:
+    """Plan steps that read every row of time_entries, by table or by index"""
+    names = {'time_entries', *(alias.lower() for alias in _ALIAS_RE.findall(sql))}
+    scans = []
+    for detail in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if match and match.group(1).lower() in names:
+            scans.append(detail)
+    return scans
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, interval_seconds: float = 60.0):
+        self.threshold = threshold_ms / 1000
+        self.interval_seconds = interval_seconds
+        # statement label -> [monotonic time of last report, slow runs since]
+        self._reports: Dict[str, list] = {}
+
+    async def record(self, db: aiosqlite.Connection, sql: str, parameters: Any, seconds: float,
+                     many: Optional[int] = None):
+        """Note a statement that ran over the threshold; ``many`` is the row
+        count for executemany, whose ``parameters`` is then the first row"""
+        label = statement_label(sql)
+        DB_SLOW_QUERIES.inc(label)
+        now = time.monotonic()
+        report = self._reports.get(label)
+        if report is not None and now - report[0] < self.interval_seconds:
+            report[1] += 1
+            return
+        suppressed = report[1] if report is not None else 0
+        self._reports[label] = [now, 0]
+
+        plan = await self.explain(db, sql, parameters)
+        scans = full_scans_of_time_entries(sql, plan) if plan is not None else []
+        shape = parameter_shape(parameters)
+        if many is not None:
+            shape = f'{many} x {shape}'
+        logger.warning(
+            "Slow query%s: %.1fms %s params=%s plan=%s%s",
+            ' (FULL SCAN of time_entries)' if scans else '', seconds * 1000, label, shape,
+            ' | '.join(plan) if plan is not None else 'n/a',
+            f' ({suppressed} more since the last report)' if suppressed else '')
+
+    async def explain(self, db: aiosqlite.Connection, sql: str, parameters: Any) -> Optional[List[str]]:
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            # The base class method, so the EXPLAIN is not itself timed and recorded
+            async with aiosqlite.Connection.execute(db, 'EXPLAIN QUERY PLAN ' + sql, parameters or ()) as cursor:
+                return [row[3] for row in await cursor.fetchall()]
+        except Exception as e:
+            logger.debug("Could not explain %s: %s", sql, e)
+            return None
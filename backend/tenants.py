@@ -0,0 +1,178 @@
+"""Per-tenant databases behind an LRU of open ones.
+
+Each tenant (a user or a crew, named by the X-Tenant-ID header) has its
+own SQLite file, created and migrated the first time a request names it,
+so tenants never wait on each other's write lock. Requests without the
+header use the default tenant, the DB_PATH database of a single-user
+install. TenantRegistry keeps recently used tenants open: a tenant beyond
+``max_open``, or idle for ``idle_seconds``, is closed once no request or
+background job is using it, and reopened on its next request.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from backups import BackupScheduler
+from db import ConnectionPool, ReadWritePool
+from metrics import TENANTS_OPEN
+from pay_weeks import PayWeekRecomputer
+from settings_store import SettingsStore
+from write_coalescer import WriteCoalescer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = 'default'
+# Tenant ids become file names, so nothing that could leave the directory
+TENANT_ID_RE = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,63}')
+
+
+def valid_tenant_id(tenant_id: str) -> bool:
+    return TENANT_ID_RE.fullmatch(tenant_id) is not None
+
+
+class Tenant:
+    """One open tenant database and the per-database state that goes with it"""
+
+    def __init__(self, tenant_id: str, path: Path, pool: Union[ConnectionPool, ReadWritePool], settings: SettingsStore,
+                 pay_weeks: PayWeekRecomputer, entry_writes: Optional[WriteCoalescer] = None,
+                 backups: Optional[BackupScheduler] = None):
+        self.id = tenant_id
+        self.path = path
+        self.pool = pool
+        self.settings = settings
+        self.pay_weeks = pay_weeks
+        self.entry_writes = entry_writes
+        self.backups = backups
+        self.users = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def busy(self) -> bool:
+        return self.users > 0 or self.pay_weeks.running
+
+    async def close(self):
+        if self.backups is not None:
+            await self.backups.stop()
+        if self.entry_writes is not None:
+            await self.entry_writes.close()
+        await self.settings.stop_watching()
+        await self.pay_weeks.stop()
+        await self.pool.close()
+
+
+class TenantRegistry:
+    def __init__(self, open_tenant: Callable[[str], Awaitable[Tenant]], max_open: int = 64,
+                 idle_seconds: float = 300.0):
+        self._open_tenant = open_tenant
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        # Least recently used first
+        self._tenants: 'OrderedDict[str, Tenant]' = OrderedDict()
+        self._opening: Dict[str, asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    @property
+    def open_ids(self) -> List[str]:
+        return list(self._tenants)
+
+    @property
+    def default(self) -> Tenant:
+        return self._tenants[DEFAULT_TENANT]
+
+    async def start(self):
+        """Open the default tenant, which stays open, and start closing idle ones"""
+        await self._get(DEFAULT_TENANT)
+        if self.idle_seconds > 0:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        while self._tenants:
+            _, tenant = self._tenants.popitem()
+            TENANTS_OPEN.set(len(self._tenants))
+            await tenant.close()
+
+    @asynccontextmanager
+    async def use(self, tenant_id: str):
+        """Hold ``tenant_id`` open for the duration of the block"""
+        tenant = await self._get(tenant_id)
+        tenant.users += 1
+        try:
+            if len(self._tenants) > self.max_open:
+                await self._evict(len(self._tenants) - self.max_open)
+            yield tenant
+        finally:
+            tenant.users -= 1
+            tenant.last_used = time.monotonic()
+
+    async def _get(self, tenant_id: str) -> Tenant:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is not None:
+            self._tenants.move_to_end(tenant_id)
+            return tenant
+        # Concurrent first requests for a tenant open it once
+        lock = self._opening.setdefault(tenant_id, asyncio.Lock())
+        try:
+            async with lock:
+                tenant = self._tenants.get(tenant_id)
+                if tenant is None:
+                    tenant = await self._open_tenant(tenant_id)
+                    self._tenants[tenant_id] = tenant
+                    TENANTS_OPEN.set(len(self._tenants))
+                    logger.info("Opened tenant %s (%d open)", tenant_id, len(self._tenants))
+        finally:
+            self._opening.pop(tenant_id, None)
+        return tenant
+
+    async def _evict(self, count: int):
+        """Close up to ``count`` of the least recently used tenants not in use"""
+        victims = []
+        for tenant in self._tenants.values():
+            if len(victims) == count:
+                break
+            if tenant.id != DEFAULT_TENANT and not tenant.busy:
+                victims.append(tenant)
+        await self._close_tenants(victims)
+
+    async def close_idle(self):
+        """Close tenants unused for ``idle_seconds``, and any still over ``max_open``"""
+        cutoff = time.monotonic() - self.idle_seconds
+        await self._close_tenants([
+            tenant for tenant in self._tenants.values()
+            if tenant.id != DEFAULT_TENANT and not tenant.busy and tenant.last_used < cutoff
+        ])
+        if len(self._tenants) > self.max_open:
+            await self._evict(len(self._tenants) - self.max_open)
+
+    async def _close_tenants(self, tenants: List[Tenant]):
+        # Out of the map first, so requests arriving meanwhile open a fresh one
+        tenants = [tenant for tenant in tenants if self._tenants.get(tenant.id) is tenant]
+        for tenant in tenants:
+            del self._tenants[tenant.id]
+        TENANTS_OPEN.set(len(self._tenants))
+        for tenant in tenants:
+            try:
+                await tenant.close()
+            except Exception:
+                logger.exception("Failed to close tenant %s", tenant.id)
+            logger.info("Closed tenant %s (%d open)", tenant.id, len(self._tenants))
+
+    async def _reap(self):
+        interval = min(self.idle_seconds, 30.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.close_idle()
+            except Exception:
+                logger.exception("Closing idle tenants failed")
@@ -0,0 +1,69 @@
+"""Week and pay-week arithmetic over whole arrays of dates.
+
+Array counterparts of get_week_ending, get_week_start and is_pay_week in
+server.py, working on NumPy ``datetime64[D]`` arrays so bulk paths do one
+vectorized pass instead of a Python call per date.
+"""
+from datetime import date
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Day 0 of datetime64[D] (1970-01-01) was a Thursday, two days before a Saturday
+_DAYS_TO_FIRST_SATURDAY = 2
+
+
+def parse_dates(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse YYYY-MM-DD strings into a datetime64[D] array.
+
+    Returns ``(days, valid)``. Entries that are not strict YYYY-MM-DD dates
+    are NaT in ``days`` and False in ``valid``; nothing is raised, so callers
+    can report bad rows individually.
+    """
+    if all(type(value) is str and len(value) == 10 for value in values):
+        try:
+            days = np.array(values, dtype='datetime64[D]')
+        except ValueError:
+            pass
+        else:
+            return days, np.ones(len(days), dtype=bool)
+
+    # Some value is bad: fall back to one at a time to find out which
+    days = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[D]')
+    valid = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        if type(value) is str and len(value) == 10:
+            try:
+                days[index] = np.datetime64(value, 'D')
+            except ValueError:
+                continue
+            valid[index] = True
+    return days, valid
+
+
+def week_endings(days: np.ndarray) -> np.ndarray:
+    """Saturday ending each date's week (a Saturday maps to itself)"""
+    offsets = (_DAYS_TO_FIRST_SATURDAY - days.astype(np.int64)) % 7
+    return days + offsets.astype('timedelta64[D]')
+
+
+def week_starts(saturdays: np.ndarray) -> np.ndarray:
+    """Sunday starting each week, given its Saturday"""
+    return saturdays - np.timedelta64(6, 'D')
+
+
+def pay_week_flags(saturdays: np.ndarray, base_saturday: date, frequency_days: int = 14) -> np.ndarray:
+    """Boolean array, True where the Saturday ends a pay period"""
+    diff = (saturdays - np.datetime64(base_saturday, 'D')).astype(np.int64)
+    return diff % frequency_days == 0
+
+
+def iso_dates(days: np.ndarray) -> List[str]:
+    """datetime64[D] array back to a list of YYYY-MM-DD strings.
+
+    Formatting is the slow part, so each distinct date is formatted once;
+    week endings in particular repeat heavily.
+    """
+    unique, inverse = np.unique(days, return_inverse=True)
+    formatted = np.array(np.datetime_as_string(unique, unit='D'), dtype=object)
+    return formatted[inverse].tolist()
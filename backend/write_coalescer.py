@@ -0,0 +1,114 @@
+"""Group commit for small writes from concurrent requests.
+
+Each single-entry POST otherwise pays for its own write transaction and
+commit, and SQLite runs them one at a time. WriteCoalescer queues writes
+for up to ``window_seconds`` (or until ``max_rows`` are waiting) and
+applies the queue in one transaction with one commit. Every write runs
+under its own savepoint, so a row that fails is rolled back and reported
+to its own caller while the rest of the batch still commits.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+
+from db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+Write = Callable[[aiosqlite.Connection, Any], Awaitable[Any]]
+
+
+class WriteCoalescer:
+    def __init__(self, pool: ConnectionPool, write: Write, window_seconds: float = 0.005, max_rows: int = 256):
+        self._pool = pool
+        self._write = write
+        self.window_seconds = window_seconds
+        self.max_rows = max_rows
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._full = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue ``item`` for ``write(db, item)`` and wait for its batch to commit.
+
+        Returns what ``write`` returned for this item, or raises what it (or
+        the commit) raised. A caller cancelled before its batch starts is
+        dropped from it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+        return await future
+
+    async def close(self):
+        """Commit whatever is queued without waiting out the window"""
+        if self._flusher is not None:
+            self.window_seconds = 0
+            self._full.set()
+            await self._flusher
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if len(self._pending) < self.max_rows and self.window_seconds > 0:
+                    self._full.clear()
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.window_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                batch = self._pending[:self.max_rows]
+                del self._pending[:self.max_rows]
+                await self._flush(batch)
+        finally:
+            self._flusher = None
+            # Cancelled: nothing will write what is still queued
+            for _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future]]):
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            async with self._pool.acquire() as db:
+                await db.execute('BEGIN IMMEDIATE')
+                try:
+                    for item, _ in batch:
+                        await db.execute('SAVEPOINT coalesced_write')
+                        try:
+                            outcomes.append((True, await self._write(db, item)))
+                        except Exception as e:
+                            await db.execute('ROLLBACK TO coalesced_write')
+                            outcomes.append((False, e))
+                        await db.execute('RELEASE coalesced_write')
+                    await db.commit()
+                except BaseException:
+                    await db.rollback()
+                    raise
+        except BaseException as e:
+            if isinstance(e, Exception):
+                logger.exception("Coalesced write of %d rows failed", len(batch))
+            for _, future in batch:
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,52 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / 'benchmarks'))
+
+import harness  # noqa: E402
+import server  # noqa: E402
+
+
+class SyncClient:
+    """Blocking wrapper around the in-process ASGI client"""
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def get(self, path, **kwargs):
+        return self.run(self.client.get(path, **kwargs))
+
+    def post(self, path, **kwargs):
+        return self.run(self.client.post(path, **kwargs))
+
+    def put(self, path, **kwargs):
+        return self.run(self.client.put(path, **kwargs))
+
+    def request(self, method, path, **kwargs):
+        return self.run(self.client.request(method, path, **kwargs))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'timesheet.db'
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    monkeypatch.setattr(server, 'DB_PATH', db_path)
+    loop = asyncio.new_event_loop()
+    asgi_client = loop.run_until_complete(harness.start_app(db_path))
+    try:
+        yield SyncClient(loop, asgi_client)
+    finally:
+        loop.run_until_complete(harness.stop_app())
+        loop.close()
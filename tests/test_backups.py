@@ -0,0 +1,112 @@
+import asyncio
+import sqlite3
+
+import server
+from backups import BackupScheduler, snapshot
+from db import ReadWritePool
+
+
+def add_entry(client, work_date, line_code='VTR', headers=None):
+    response = client.post('/api/entries', headers=headers, json_body={
+        'work_date': work_date, 'line_code': line_code, 'st_hours': 8})
+    assert response.status_code == 200
+
+
+def week(client, headers=None):
+    entries = client.get('/api/entries', headers=headers, params={'week_ending': '2025-11-22'}).json()
+    return [(entry['work_date'], entry['line_code']) for entry in entries]
+
+
+def test_snapshot_is_consistent_while_writes_continue(db_path, tmp_path):
+    async def scenario():
+        pool = ReadWritePool(db_path, readers=1)
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                await db.execute('CREATE TABLE t (x INTEGER, pad TEXT)')
+                await db.executemany('INSERT INTO t VALUES (?, ?)', [(i, 'x' * 500) for i in range(5000)])
+                await db.commit()
+
+            async def write():
+                for i in range(50):
+                    async with pool.acquire() as db:
+                        await db.execute('INSERT INTO t VALUES (?, ?)', (-1 - i, 'y'))
+                        await db.commit()
+                    await asyncio.sleep(0)
+
+            writes = asyncio.create_task(write())
+            async with pool.acquire_read() as db:
+                path = await snapshot(db, tmp_path / 'copy.db', pages_per_step=8)
+            await writes
+            return path
+        finally:
+            await pool.close()
+
+    path = asyncio.run(scenario())
+    with sqlite3.connect(path) as copy:
+        assert copy.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        assert copy.execute('PRAGMA quick_check').fetchone()[0] == 'ok'
+        # Exactly the rows committed when the copy began
+        assert copy.execute('SELECT COUNT(*) FROM t WHERE x >= 0').fetchone()[0] == 5000
+        assert copy.execute('SELECT COUNT(*) FROM t').fetchone()[0] in range(5000, 5051)
+    assert not (tmp_path / 'copy.db.partial').exists()
+
+
+def test_stored_backups_are_listed_pruned_and_taken_on_schedule(client, db_path):
+    tenant = server.app.state.tenants.default
+    tenant.backups.keep = 2
+    created = [client.post('/api/backups').json() for _ in range(3)]
+    listed = client.get('/api/backups').json()
+    assert [backup['name'] for backup in listed] == [created[2]['name'], created[1]['name']]
+    assert all(backup['size_bytes'] > 0 for backup in listed)
+
+    async def scheduled():
+        scheduler = BackupScheduler(tenant.pool, db_path.parent / 'scheduled', interval_seconds=0.01)
+        scheduler.start()
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+        return list((db_path.parent / 'scheduled').glob('*.db'))
+
+    assert client.run(scheduled())
+
+
+def test_snapshot_download_restores_into_another_tenant(client):
+    add_entry(client, '2025-11-17')
+    response = client.get('/api/backups/snapshot')
+    assert response.status_code == 200
+    assert response.body.startswith(b'SQLite format 3\x00')
+    assert list(server.app.state.tenants.default.backups.directory.glob('*.download')) == []
+
+    other = {'X-Tenant-ID': 'restored'}
+    add_entry(client, '2025-11-18', 'GMRC', headers=other)
+    restored = client.post('/api/backups/restore', headers=other, body=response.body)
+    assert restored.status_code == 200
+    assert week(client, other) == [('2025-11-17', 'VTR')]
+
+
+def test_restore_rolls_back_data_and_invalidates_caches(client):
+    add_entry(client, '2025-11-17')
+    backup = client.post('/api/backups').json()['name']
+    add_entry(client, '2025-11-18', 'GMRC')
+    lines = client.get('/api/lines')
+    since = client.get('/api/sync').json()['revision']
+
+    response = client.post('/api/backups/restore', params={'name': backup})
+    assert response.status_code == 200
+    assert response.json()['revision'] > since
+    assert week(client) == [('2025-11-17', 'VTR')]
+    # Same line codes as before, but every ETag moves on
+    relisted = client.get('/api/lines', headers={'If-None-Match': lines.headers['etag']})
+    assert relisted.status_code == 200
+    assert client.get('/api/sync', params={'since': since}).status_code == 409
+    full = client.get('/api/sync').json()
+    assert [entry['work_date'] for entry in full['entries']] == ['2025-11-17']
+
+
+def test_invalid_restores_leave_the_database_alone(client):
+    add_entry(client, '2025-11-17')
+    assert client.post('/api/backups/restore', body=b'not a database' * 100).status_code == 400
+    assert client.post('/api/backups/restore', params={'name': '../timesheet.db'}).status_code == 404
+    assert client.post('/api/backups/restore', params={'name': 'missing.db'}).status_code == 404
+    assert week(client) == [('2025-11-17', 'VTR')]
+    assert list(server.app.state.tenants.default.backups.directory.glob('*.restore')) == []
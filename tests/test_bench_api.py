@@ -0,0 +1,43 @@
+import bench_api
+import datagen
+
+
+def test_synthetic_dataset_imports_cleanly(client):
+    dataset = datagen.synthetic_dataset(years=1, project_lines=20)
+    response = client.post('/api/import/stream', params={'format': 'ndjson'}, body=datagen.ndjson_body(dataset))
+    assert response.status_code == 200
+    assert response.json()['entries'] == len(dataset['entries'])
+    assert response.json()['line_codes'] == 20
+
+
+def test_compare_flags_only_regressions_beyond_tolerance_and_floor():
+    baseline = {'levels': {'8': {
+        'slow': {'p95_ms': 10.0, 'rps': 500.0},
+        'noisy': {'p95_ms': 0.2, 'rps': 5000.0},
+        'steady': {'p95_ms': 10.0, 'rps': 500.0},
+    }}}
+    results = {'levels': {'8': {
+        'slow': {'p95_ms': 20.0, 'rps': 250.0},
+        'noisy': {'p95_ms': 0.6, 'rps': 2500.0},
+        'steady': {'p95_ms': 11.0, 'rps': 480.0},
+        'new': {'p95_ms': 99.0, 'rps': 1.0},
+    }}}
+    assert bench_api.compare(results, baseline, tolerance=0.25) == [
+        'slow @ 8: p95 10.0ms -> 20.0ms',
+        'slow @ 8: 500.0 -> 250.0 req/s',
+    ]
+
+
+def test_standard_lines_are_seeded_line_codes(client):
+    seeded = {line['line_code'] for line in client.get('/api/lines').json()}
+    assert set(datagen.STANDARD_LINES) <= seeded
+
+
+def test_synthetic_entries_book_holidays_and_pto_alongside_projects():
+    entries = datagen.synthetic_dataset(years=2, project_lines=300)['entries']
+    holidays = {entry['work_date'][5:] for entry in entries if entry['line_code'] == 'HOLIDAY'}
+    assert holidays and holidays <= {f'{month:02d}-{day:02d}' for month, day in datagen.HOLIDAYS}
+    assert any(entry['line_code'] == 'PTO' for entry in entries)
+    # A day off is the only entry on its date
+    days_off = {entry['work_date'] for entry in entries if entry['line_code'] in ('PTO', 'HOLIDAY')}
+    assert sum(entry['work_date'] in days_off for entry in entries) == len(days_off)
@@ -0,0 +1,116 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import server
+from db import ConnectionPool, ReadWritePool
+
+
+def test_pool_reuses_connections_in_wal_mode(db_path):
+    async def scenario():
+        pool = ConnectionPool(db_path, size=2, busy_timeout_ms=1234)
+        await pool.open()
+        try:
+            seen = set()
+            for _ in range(5):
+                async with pool.acquire() as db:
+                    seen.add(id(db))
+                    async with db.execute('PRAGMA journal_mode') as cursor:
+                        assert (await cursor.fetchone())[0] == 'wal'
+                    async with db.execute('PRAGMA busy_timeout') as cursor:
+                        assert (await cursor.fetchone())[0] == 1234
+            assert len(seen) <= 2
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_pool_rolls_back_abandoned_transactions(db_path):
+    async def scenario():
+        pool = ConnectionPool(db_path, size=1)
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                await db.execute('CREATE TABLE t (x INTEGER)')
+                await db.commit()
+                await db.execute('INSERT INTO t VALUES (1)')
+            async with pool.acquire() as db:
+                assert not db.in_transaction
+                async with db.execute('SELECT COUNT(*) FROM t') as cursor:
+                    assert (await cursor.fetchone())[0] == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_unpooled_mode_opens_connection_per_acquire(db_path):
+    async def scenario():
+        pool = ConnectionPool(db_path, size=0)
+        await pool.open()
+        async with pool.acquire() as first:
+            pass
+        async with pool.acquire() as second:
+            pass
+        assert first is not second
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_routes_use_pooled_connection(client):
+    response = client.post('/api/entries', json_body={
+        'work_date': '2025-11-18', 'line_code': 'VTR', 'st_hours': 8, 'ot_hours': 2,
+    })
+    assert response.status_code == 200
+    assert response.json()['week_ending_date'] == '2025-11-22'
+
+    entries = client.get('/api/entries', params={'week_ending': '2025-11-22'}).json()
+    assert [(e['line_code'], e['st_hours'], e['ot_hours']) for e in entries] == [('VTR', 8, 2)]
+    assert server.app.state.tenants.default.pool.size == server.DB_POOL_SIZE
+
+
+def test_readers_see_a_snapshot_and_cannot_write(db_path):
+    async def scenario():
+        pool = ReadWritePool(db_path, readers=2)
+        await pool.open()
+        try:
+            async with pool.acquire() as writer:
+                await writer.execute('CREATE TABLE t (x INTEGER)')
+                await writer.execute('INSERT INTO t VALUES (1)')
+                await writer.commit()
+            async with pool.acquire_read() as reader:
+                with pytest.raises(sqlite3.OperationalError):
+                    await reader.execute('INSERT INTO t VALUES (2)')
+                await reader.rollback()
+                await reader.execute('BEGIN')
+                async with reader.execute('SELECT COUNT(*) FROM t') as cursor:
+                    assert (await cursor.fetchone())[0] == 1
+                # The writer commits while the read is open, without waiting for it
+                async with pool.acquire() as writer:
+                    await writer.execute('INSERT INTO t VALUES (3)')
+                    await writer.commit()
+                async with reader.execute('SELECT COUNT(*) FROM t') as cursor:
+                    assert (await cursor.fetchone())[0] == 1
+            async with pool.acquire_read() as reader:
+                async with reader.execute('SELECT COUNT(*) FROM t') as cursor:
+                    assert (await cursor.fetchone())[0] == 2
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_reads_do_not_queue_behind_the_writer(client):
+    pool = server.app.state.tenants.default.pool
+
+    async def scenario():
+        async with pool.acquire():
+            # The writer is taken, so only a reader can serve these
+            lines = await asyncio.wait_for(client.client.get('/api/lines'), 5)
+            export = await asyncio.wait_for(client.client.get('/api/export', params={'format': 'ndjson'}), 5)
+            return lines.status_code, export.status_code
+
+    assert client.run(scenario()) == (200, 200)
@@ -0,0 +1,187 @@
+import json
+from datetime import date, timedelta
+
+from starlette.responses import JSONResponse
+
+import server
+
+
+def test_single_upsert_inserts_then_updates(client):
+    first = client.post('/api/entries', json_body={
+        'work_date': '2025-11-23', 'line_code': 'VTR', 'st_hours': 8,
+    }).json()
+    assert first['week_ending_date'] == '2025-11-29'
+    assert first['is_pay_week'] is False
+
+    second = client.post('/api/entries', json_body={
+        'work_date': '2025-11-23', 'line_code': 'VTR', 'st_hours': 4, 'ot_hours': 2,
+    }).json()
+    assert second['id'] == first['id']
+    assert (second['st_hours'], second['ot_hours']) == (4, 2)
+
+
+def test_batch_reports_per_row_results(client):
+    client.post('/api/entries', json_body={'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 1})
+
+    response = client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 8},
+        {'work_date': 'not-a-date', 'line_code': 'VTR', 'st_hours': 8},
+        {'work_date': '2025-11-18', 'line_code': 'GMRC', 'st_hours': 6, 'ot_hours': 2},
+        {'work_date': '2025-11-18', 'line_code': 'GMRC', 'st_hours': 7},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['applied'], body['failed']) == (2, 1)
+
+    results = body['results']
+    assert [r['status'] for r in results] == ['ok', 'error', 'ok', 'ok']
+    assert results[0]['entry']['st_hours'] == 8
+    assert results[0]['entry']['is_pay_week'] is True
+    assert results[1]['entry'] is None and results[1]['detail']
+    # Duplicate keys collapse to the last row
+    assert results[2]['entry'] == results[3]['entry']
+    assert results[3]['entry']['st_hours'] == 7
+
+    week = client.get('/api/entries', params={'week_ending': '2025-11-22'}).json()
+    assert [(e['work_date'], e['line_code'], e['st_hours']) for e in week] == [
+        ('2025-11-17', 'VTR', 8), ('2025-11-18', 'GMRC', 7),
+    ]
+
+
+def test_batch_scales_past_one_statement(client):
+    start = date(2024, 1, 1)
+    entries = [
+        {'work_date': (start + timedelta(days=i // 5)).isoformat(), 'line_code': f'L{i % 5}', 'st_hours': 8}
+        for i in range(3000)
+    ]
+    body = client.post('/api/entries/batch', json_body=entries).json()
+    assert body['applied'] == 3000
+    assert all(r['status'] == 'ok' for r in body['results'])
+    assert len({r['entry']['id'] for r in body['results']}) == 3000
+
+
+def test_weekly_summary_reads_maintained_rollups(client):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 8, 'ot_hours': 2},
+        {'work_date': '2025-11-17', 'line_code': 'GMRC', 'st_hours': 2},
+        {'work_date': '2025-11-18', 'line_code': 'VTR', 'st_hours': 6, 'ot_hours': 1},
+        {'work_date': '2025-11-19', 'line_code': 'PTO'},
+    ])
+    # Updating an entry moves its hours rather than adding to them
+    client.post('/api/entries', json_body={'work_date': '2025-11-18', 'line_code': 'VTR', 'st_hours': 4})
+
+    summary = client.get('/api/weekly-summary', params={'week_ending': '2025-11-22'}).json()
+    assert summary['is_pay_week'] is True
+    assert (summary['total_st'], summary['total_ot'], summary['total_hours']) == (14, 2, 16)
+    assert summary['lines_used'] == ['GMRC', 'PTO', 'VTR']
+    assert summary['daily_totals'] == {
+        '2025-11-17': {'st': 10, 'ot': 2, 'total': 12},
+        '2025-11-18': {'st': 4, 'ot': 0, 'total': 4},
+        '2025-11-19': {'st': 0, 'ot': 0, 'total': 0},
+    }
+    assert summary['line_totals']['VTR'] == {'st': 12, 'ot': 2, 'total': 14}
+
+    empty = client.get('/api/weekly-summary', params={'week_ending': '2025-11-29'}).json()
+    assert (empty['is_pay_week'], empty['total_hours'], empty['lines_used']) == (False, 0, [])
+
+
+def test_range_summaries_include_empty_weeks_and_page(client):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-11-03', 'line_code': 'VTR', 'st_hours': 8},
+        {'work_date': '2025-11-18', 'line_code': 'GMRC', 'st_hours': 6, 'ot_hours': 1},
+    ])
+    page = client.get('/api/summaries', params={'start': '2025-11-03', 'end': '2025-11-27', 'limit': 3}).json()
+    assert [s['week_ending_date'] for s in page['summaries']] == ['2025-11-08', '2025-11-15', '2025-11-22']
+    assert [s['is_pay_week'] for s in page['summaries']] == [True, False, True]
+    assert [s['total_hours'] for s in page['summaries']] == [8, 0, 7]
+    assert page['summaries'][2] == client.get('/api/weekly-summary', params={'week_ending': '2025-11-22'}).json()
+    assert page['next_start'] == '2025-11-29'
+
+    rest = client.get('/api/summaries', params={'start': page['next_start'], 'end': '2025-11-27'}).json()
+    assert [s['week_ending_date'] for s in rest['summaries']] == ['2025-11-29']
+    assert rest['next_start'] is None
+
+    assert client.get('/api/summaries', params={'start': '2025-11-27', 'end': '2025-11-01'}).status_code == 400
+
+
+def test_range_summaries_at_the_end_of_the_calendar(client):
+    # 9999-12-31 is a Friday: its week would end after date.max
+    response = client.get('/api/summaries', params={'start': '9999-12-25', 'end': '9999-12-31'})
+    assert response.status_code == 400
+    page = client.get('/api/summaries', params={'start': '9999-11-01', 'end': '9999-12-24', 'limit': 52}).json()
+    assert page['summaries'][-1]['week_ending_date'] == '9999-12-25'
+    assert page['next_start'] is None
+
+
+def test_pay_periods_follow_configured_frequency(client):
+    client.put('/api/settings/pay_frequency_days', json_body={'key': 'pay_frequency_days', 'value': '28'})
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-10-26', 'line_code': 'VTR', 'st_hours': 8},  # first day of the period
+        {'work_date': '2025-11-10', 'line_code': 'VTR', 'st_hours': 6, 'ot_hours': 2},
+        {'work_date': '2025-11-22', 'line_code': 'GMRC', 'st_hours': 4},  # last day
+        {'work_date': '2025-11-23', 'line_code': 'VTR', 'st_hours': 1},  # next period
+    ])
+    assert client.get('/api/week-info', params={'work_date': '2025-11-03'}).json()['is_pay_week'] is False
+
+    period = client.get('/api/pay-periods/2025-11-22').json()
+    assert period['period_start_date'] == '2025-10-26'
+    assert (period['total_st'], period['total_ot']) == (18, 2)
+    assert period['line_totals'] == {'VTR': {'st': 14, 'ot': 2, 'total': 16}, 'GMRC': {'st': 4, 'ot': 0, 'total': 4}}
+    assert sorted(period['daily_totals']) == ['2025-10-26', '2025-11-10', '2025-11-22']
+
+    assert client.get('/api/pay-periods/2025-11-15').status_code == 400
+
+    page = client.get('/api/pay-periods', params={'start': '2025-09-01', 'end': '2025-12-01', 'limit': 3}).json()
+    assert [p['period_ending_date'] for p in page['periods']] == ['2025-09-27', '2025-10-25', '2025-11-22']
+    assert [p['total_hours'] for p in page['periods']] == [0, 0, 20]
+    assert page['periods'][2] == period
+    assert page['next_start'] == '2025-12-20'
+
+
+def test_pay_periods_at_the_ends_of_the_calendar(client):
+    # The period ending 0001-01-13 would start before date.min, and the one
+    # holding 9999-12-31 would end after date.max
+    for start, end in [('0001-01-01', '0001-02-01'), ('9999-12-01', '9999-12-31')]:
+        assert client.get('/api/pay-periods', params={'start': start, 'end': end}).status_code == 400
+    assert client.get('/api/pay-periods/0001-01-13').status_code == 400
+
+    page = client.get('/api/pay-periods', params={'start': '9999-12-01', 'end': '9999-12-25'}).json()
+    assert [p['period_ending_date'] for p in page['periods']] == ['9999-12-11', '9999-12-25']
+    assert page['next_start'] is None
+
+
+def test_range_pages_follow_the_cursor_through_every_entry(client):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': f'2025-03-{day:02d}', 'line_code': line, 'st_hours': 8}
+        for day in range(1, 11) for line in ('VTR', 'GMRC', 'CLP')
+    ])
+    params = {'start_date': '2025-03-02', 'end_date': '2025-03-09', 'limit': 5}
+    seen = []
+    while True:
+        page = client.get('/api/entries', params=params).json()
+        assert len(page['entries']) <= 5
+        seen.extend((e['work_date'], e['line_code']) for e in page['entries'])
+        if page['next_cursor'] is None:
+            break
+        params['cursor'] = page['next_cursor']
+
+    assert seen == sorted((f'2025-03-{day:02d}', line) for day in range(2, 10) for line in ('VTR', 'GMRC', 'CLP'))
+    assert client.get('/api/entries', params=dict(params, cursor='not-a-cursor')).status_code == 400
+    assert client.get('/api/entries', params=dict(params, limit=0)).status_code == 400
+
+
+def test_fast_list_paths_match_model_serialization(client):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 8, 'ot_hours': 1},
+        {'work_date': '2025-11-18', 'line_code': 'GMRC'},
+    ])
+    client.post('/api/lines', json_body={'line_code': 'P-Ü', 'label': 'Überstunden', 'is_project': True})
+
+    for path, params, model in [
+        ('/api/entries', {'week_ending': '2025-11-22'}, server.TimeEntry),
+        ('/api/lines', None, server.LineCode),
+        ('/api/settings', None, server.Setting),
+    ]:
+        body = client.get(path, params=params).body
+        expected = JSONResponse([model(**item).model_dump() for item in json.loads(body)]).body
+        assert body == expected, path
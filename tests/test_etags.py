@@ -0,0 +1,75 @@
+import sqlite3
+
+import server
+
+
+def revalidate(client, path, etag, **params):
+    return client.get(path, params=params or None, headers={'If-None-Match': etag})
+
+
+def test_unchanged_resource_answers_304_without_a_body(client):
+    first = client.get('/api/lines')
+    etag = first.headers['etag']
+    assert etag.startswith('"') and first.headers['cache-control'] == 'no-cache'
+
+    again = revalidate(client, '/api/lines', etag)
+    assert (again.status_code, again.body) == (304, b'')
+    assert again.headers['etag'] == etag
+    assert revalidate(client, '/api/lines', f'"stale", W/{etag}').status_code == 304
+
+    client.post('/api/lines', json_body={'line_code': 'P-9', 'is_project': True})
+    changed = revalidate(client, '/api/lines', etag)
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+
+
+def test_week_etags_only_change_with_their_week_or_settings(client):
+    params = {'week_ending': '2025-11-22'}
+    client.post('/api/entries', json_body={'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 8})
+    entries_etag = client.get('/api/entries', params=params).headers['etag']
+    summary_etag = client.get('/api/weekly-summary', params=params).headers['etag']
+
+    # A write to another week leaves this week's tags alone
+    client.post('/api/entries', json_body={'work_date': '2025-11-24', 'line_code': 'VTR', 'st_hours': 8})
+    assert revalidate(client, '/api/entries', entries_etag, **params).status_code == 304
+    assert revalidate(client, '/api/weekly-summary', summary_etag, **params).status_code == 304
+
+    # A pay schedule change can flip the summary's pay week flag
+    client.put('/api/settings/base_pay_week_ending', json_body={'key': 'base_pay_week_ending', 'value': '2025-11-29'})
+    client.run(server.app.state.tenants.default.pay_weeks.wait())
+    response = revalidate(client, '/api/weekly-summary', summary_etag, **params)
+    assert response.status_code == 200 and response.json()['is_pay_week'] is False
+    # ...and the recompute rewrote the stored flags the entries carry
+    assert revalidate(client, '/api/entries', entries_etag, **params).status_code == 200
+
+
+def test_summary_etag_follows_the_settings_the_body_was_computed_from(client, db_path):
+    params = {'week_ending': '2025-11-22'}
+    summary = client.get('/api/weekly-summary', params=params)
+    # Another worker changes the schedule; this worker's cache has not seen it yet
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE settings SET value = '2025-11-29' WHERE key = 'base_pay_week_ending'")
+    lagging = revalidate(client, '/api/weekly-summary', summary.headers['etag'], **params)
+    assert lagging.status_code == 304
+
+    tenant = server.app.state.tenants.default
+
+    async def reload():
+        async with tenant.pool.acquire_read() as reader:
+            await tenant.settings.load(reader)
+    client.run(reload())
+    response = revalidate(client, '/api/weekly-summary', summary.headers['etag'], **params)
+    assert response.status_code == 200
+    assert response.json()['is_pay_week'] is not summary.json()['is_pay_week']
+
+
+def test_import_bumps_revisions(client):
+    range_params = {'start_date': '2025-11-01', 'end_date': '2025-11-30'}
+    entries_etag = client.get('/api/entries', params=range_params).headers['etag']
+    settings_etag = client.get('/api/settings').headers['etag']
+
+    client.post('/api/import', json_body={'entries': [
+        {'work_date': '2025-11-17', 'week_ending_date': '2025-11-22', 'line_code': 'VTR', 'st_hours': 4},
+    ]})
+    assert revalidate(client, '/api/entries', entries_etag, **range_params).status_code == 200
+    assert revalidate(client, '/api/settings', settings_etag).status_code == 304
@@ -0,0 +1,135 @@
+import json
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import server
+from columnar import iter_npz, load_columnar
+
+
+def seed_entries(client, days, lines=('VTR', 'GMRC')):
+    start = date(2025, 1, 5)
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': (start + timedelta(days=d)).isoformat(), 'line_code': line, 'st_hours': 8, 'ot_hours': 1}
+        for d in range(days) for line in lines
+    ])
+
+
+def test_ndjson_export_matches_json_export(client, monkeypatch):
+    monkeypatch.setattr(server, 'EXPORT_CHUNK_ROWS', 7)
+    seed_entries(client, 30)
+
+    response = client.get('/api/export', params={'format': 'ndjson'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.body.decode().splitlines()]
+
+    assert records[0]['type'] == 'export'
+    by_type = {}
+    for record in records[1:]:
+        by_type.setdefault(record.pop('type'), []).append(record)
+
+    full = client.get('/api/export').json()
+    assert by_type['entry'] == full['entries']
+    assert by_type['line_code'] == full['line_codes']
+    assert by_type['setting'] == full['settings']
+
+
+def test_ndjson_export_honours_date_range(client):
+    seed_entries(client, 30)
+    response = client.get('/api/export', params={
+        'format': 'ndjson', 'start_date': '2025-01-10', 'end_date': '2025-01-11',
+    })
+    entries = [json.loads(line) for line in response.body.decode().splitlines()]
+    entries = [e for e in entries if e['type'] == 'entry']
+    assert sorted({e['work_date'] for e in entries}) == ['2025-01-10', '2025-01-11']
+
+
+def test_columnar_export_round_trips_the_entries(client, monkeypatch):
+    monkeypatch.setattr(server, 'EXPORT_CHUNK_ROWS', 7)
+    seed_entries(client, 30, lines=('VTR', 'GMRC', 'P-1'))
+
+    response = client.get('/api/export', params={'format': 'columnar'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-npz'
+    columns = load_columnar(response.body)
+    assert columns['work_day'].dtype == np.int32
+    assert columns['line'].dtype == columns['st_hours'].dtype == columns['ot_hours'].dtype == np.int16
+    assert list(columns['line_codes']) == ['GMRC', 'P-1', 'VTR']
+
+    entries = sorted(client.get('/api/export').json()['entries'], key=lambda e: (e['work_date'], e['line_code']))
+    assert len(columns['work_day']) == len(entries) == 90
+    assert np.datetime_as_string(columns['work_date']).tolist() == [e['work_date'] for e in entries]
+    assert columns['line_code'].tolist() == [e['line_code'] for e in entries]
+    assert columns['st_hours'].tolist() == [e['st_hours'] for e in entries]
+    assert columns['ot_hours'].tolist() == [e['ot_hours'] for e in entries]
+    assert columns['is_pay_week'].tolist() == [e['is_pay_week'] for e in entries]
+
+
+def test_columnar_export_honours_date_range_and_empty_results(client):
+    seed_entries(client, 30)
+    columns = load_columnar(client.get('/api/export', params={
+        'format': 'columnar', 'start_date': '2025-01-10', 'end_date': '2025-01-11',
+    }).body)
+    assert sorted(set(np.datetime_as_string(columns['work_date']))) == ['2025-01-10', '2025-01-11']
+
+    empty = load_columnar(client.get('/api/export', params={
+        'format': 'columnar', 'start_date': '2030-01-01', 'end_date': '2030-12-31',
+    }).body)
+    assert len(empty['work_day']) == len(empty['line_codes']) == 0
+
+
+def test_columnar_reader_rejects_other_versions():
+    body = b''.join(iter_npz({'version': np.array(99, dtype=np.int32)}))
+    with pytest.raises(ValueError, match='version 99'):
+        load_columnar(body)
+
+
+def test_unknown_export_format_is_rejected(client):
+    assert client.get('/api/export', params={'format': 'xml'}).status_code == 400
+
+
+def test_columnar_export_widens_hours_that_overflow_int16(client):
+    client.post('/api/entries', json_body={'work_date': '2025-01-06', 'line_code': 'VTR', 'st_hours': 40000})
+    client.post('/api/entries', json_body={'work_date': '2025-01-07', 'line_code': 'VTR', 'ot_hours': 2 ** 40})
+
+    response = client.get('/api/export', params={'format': 'columnar'})
+    assert response.status_code == 200
+    columns = load_columnar(response.body)
+    assert columns['st_hours'].dtype == np.int32 and columns['st_hours'].tolist() == [40000, 0]
+    assert columns['ot_hours'].dtype == np.int64 and columns['ot_hours'].tolist() == [0, 2 ** 40]
+
+
+def test_columnar_export_reads_loose_dates_and_rejects_bad_ones_up_front(client, db_path):
+    seed_entries(client, 2)
+    with sqlite3.connect(db_path) as conn:
+        # Older rows stored dates as posted, without zero padding
+        conn.execute("INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours) "
+                     "VALUES ('2025-2-3', '2025-02-08', 'VTR', 5)")
+    columns = load_columnar(client.get('/api/export', params={'format': 'columnar'}).body)
+    assert '2025-02-03' in np.datetime_as_string(columns['work_date']).tolist()
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO time_entries (work_date, week_ending_date, line_code) "
+                     "VALUES ('someday', '2025-02-08', 'VTR')")
+    response = client.get('/api/export', params={'format': 'columnar'})
+    assert response.status_code == 500
+    assert 'someday' in response.json()['detail']
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson', 'columnar'])
+def test_export_borrows_one_reader(client, monkeypatch, fmt):
+    seed_entries(client, 3)
+    pool = server.app.state.tenants.default.pool
+    acquire_read = pool.acquire_read
+    borrowed = []
+
+    def counting_acquire_read():
+        borrowed.append(fmt)
+        return acquire_read()
+
+    monkeypatch.setattr(pool, 'acquire_read', counting_acquire_read)
+    assert client.get('/api/export', params={'format': fmt}).status_code == 200
+    assert len(borrowed) == 1
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from importer import ImportValidationError, JSONExportParser, iter_ndjson_records
+
+EXPORT = {
+    'export_date': '2025-11-20T10:00:00',
+    'version': 12,
+    'line_codes': [{'line_code': 'P-100', 'label': 'Project 100', 'is_project': True,
+                    'is_visible': True, 'sort_order': 11}],
+    'settings': [{'key': 'pay_frequency_days', 'value': '14'}],
+    'entries': [
+        {'work_date': '2025-11-17', 'week_ending_date': '2025-11-22', 'line_code': 'P-100',
+         'st_hours': 8, 'ot_hours': 2, 'is_pay_week': True},
+        {'work_date': '2025-11-18', 'week_ending_date': '2025-11-22', 'line_code': 'VTR',
+         'st_hours': 6, 'ot_hours': 0, 'is_pay_week': True},
+    ],
+}
+
+
+def parse_in_slices(text, size):
+    parser = JSONExportParser()
+    records = []
+    for start in range(0, len(text), size):
+        records.extend(parser.feed(text[start:start + size]))
+    records.extend(parser.feed('', final=True))
+    return records
+
+
+@pytest.mark.parametrize('size', [1, 3, 17, 10_000])
+def test_json_parser_yields_records_regardless_of_chunking(size):
+    records = parse_in_slices(json.dumps(EXPORT, indent=2), size)
+    assert [t for t, _ in records] == ['line_code', 'setting', 'entry', 'entry']
+    assert records[2][1] == EXPORT['entries'][0]
+
+
+def test_json_parser_rejects_truncated_document():
+    with pytest.raises(ImportValidationError):
+        parse_in_slices(json.dumps(EXPORT)[:-20], 64)
+
+
+def test_ndjson_parser_handles_lines_split_across_chunks():
+    text = ''.join(json.dumps({'type': 'entry', **e}) + '\n' for e in EXPORT['entries'])
+
+    async def chunks():
+        for start in range(0, len(text), 5):
+            yield text[start:start + 5]
+
+    async def collect():
+        return [record async for batch in iter_ndjson_records(chunks()) for record in batch]
+
+    records = asyncio.run(collect())
+    assert [r for _, r in records] == EXPORT['entries']
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_stream_import_round_trips_an_export(client, fmt):
+    client.post('/api/lines', json_body={'line_code': 'P-7', 'is_project': True})
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': f'2025-03-{day:02d}', 'line_code': line, 'st_hours': 8, 'ot_hours': day % 3}
+        for day in range(1, 29) for line in ('VTR', 'P-7')
+    ])
+    exported = client.get('/api/export', params={'format': fmt}).body
+
+    # Wipe the hours, then restore them from the export
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': f'2025-03-{day:02d}', 'line_code': 'VTR'} for day in range(1, 29)
+    ])
+    response = client.post('/api/import/stream', params={'format': fmt}, body=exported)
+    assert response.status_code == 200, response.body
+    assert response.json()['entries'] == 56
+
+    restored = client.get('/api/entries', params={'start_date': '2025-03-01', 'end_date': '2025-03-31'}).json()['entries']
+    assert sum(e['st_hours'] + e['ot_hours'] for e in restored) == 56 * 8 + 2 * sum(d % 3 for d in range(1, 29))
+
+
+
+@pytest.mark.parametrize('path', ['/api/import', '/api/import/stream'])
+def test_both_imports_skip_unknown_sections(client, path):
+    extra = dict(EXPORT, attachments=[{'name': 'notes.txt'}], notes={'entries': []})
+    response = client.post(path, body=json.dumps(extra).encode(), headers={'Content-Type': 'application/json'})
+    assert response.status_code == 200, response.body
+    body = response.json()
+    assert (body['line_codes'], body['settings'], body['entries']) == (1, 1, 2)
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_null_hours_round_trip_as_zero(client, db_path, fmt):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours) "
+                     "VALUES ('2025-11-17', '2025-11-22', 'VTR', NULL, 2)")
+    exported = client.get('/api/export', params={'format': fmt}).body
+    response = client.post('/api/import/stream', params={'format': fmt}, body=exported)
+    assert response.status_code == 200, response.body
+    [entry] = client.get('/api/entries', params={'week_ending': '2025-11-22'}).json()
+    assert (entry['st_hours'], entry['ot_hours']) == (0, 2)
+
+def test_invalid_row_rolls_back_whole_import(client):
+    bad = dict(EXPORT, entries=EXPORT['entries'] + [{'work_date': 'yesterday', 'week_ending_date': '2025-11-22',
+                                                       'line_code': 'VTR'}])
+    response = client.post('/api/import/stream', body=json.dumps(bad).encode())
+    assert response.status_code == 400
+    assert 'record 5' in response.json()['detail']
+
+    lines = [line['line_code'] for line in client.get('/api/lines').json()]
+    assert 'P-100' not in lines
+    assert client.get('/api/entries', params={'week_ending': '2025-11-22'}).json() == []
+
+
+def test_import_rejects_week_ending_that_does_not_match_work_date(client):
+    bad = dict(EXPORT, entries=[dict(EXPORT['entries'][0], week_ending_date='2025-11-15')])
+    response = client.post('/api/import', json_body=bad)
+    assert response.status_code == 400
+    assert 'record 3' in response.json()['detail']
+    assert 'does not end the week' in response.json()['detail']
+
+
+def test_legacy_import_reports_counts(client):
+    body = client.post('/api/import', json_body=EXPORT).json()
+    assert body['message'] == 'Data imported successfully'
+    assert (body['entries'], body['line_codes'], body['settings']) == (2, 1, 1)
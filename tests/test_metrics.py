@@ -0,0 +1,79 @@
+import metrics
+import server
+
+
+def sample(text, name):
+    """Value of the sample line that starts with ``name`` in a /metrics body"""
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = metrics.Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 3.65',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_requests_queries_and_rows(client):
+    client.post('/api/entries', json_body={'work_date': '2025-11-17', 'line_code': 'VTR', 'st_hours': 8})
+    before = client.get('/metrics').body.decode()
+    client.get('/api/entries', params={'week_ending': '2025-11-22'})
+    client.get('/api/nowhere')
+    client.get('/api/export')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    after = response.body.decode()
+    route_count = 'timewizard_http_request_duration_seconds_count{method="GET",route="/api/entries",status="200"}'
+    assert sample(after, route_count) == sample(before, route_count) + 1
+    unmatched = 'timewizard_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}'
+    assert sample(after, unmatched) >= 1
+    query_count = f'timewizard_db_query_duration_seconds_count{{statement="{server.ENTRIES_BY_WEEK_SQL}"}}'
+    assert sample(after, query_count) == sample(before, query_count) + 1
+    exported = 'timewizard_export_rows_total{format="json",type="entry"}'
+    assert sample(after, exported) == sample(before, exported) + 1
+    assert sample(after, 'timewizard_db_transactions_total{outcome="commit"}') >= 1
+    # The readers plus the writer
+    assert sample(after, 'timewizard_db_connections_open') == server.DB_POOL_SIZE + 1
+    # The scrape itself is the only request in flight
+    assert sample(after, 'timewizard_http_requests_in_flight') == 1
+
+
+def test_batch_upserts_of_any_size_share_one_statement_series(client):
+    label = metrics.statement_label(server.ENTRY_UPSERT_SQL.format(values='(?, ?, ?, ?, ?, ?)'))
+    upsert_count = f'timewizard_db_query_duration_seconds_count{{statement="{label}"}}'
+    before = sample(client.get('/metrics').body.decode(), upsert_count)
+    for size in (1, 2, 3, 7, 30):
+        response = client.post('/api/entries/batch', json_body=[
+            {'work_date': f'2025-{month:02d}-{day:02d}', 'line_code': 'VTR', 'st_hours': 8}
+            for month, day in [(1 + i // 28, 1 + i % 28) for i in range(size)]
+        ])
+        assert response.status_code == 200
+
+    body = client.get('/metrics').body.decode()
+    assert sample(body, upsert_count) == before + 5
+    assert len(label) <= metrics.MAX_STATEMENT_LABEL_LENGTH
+    # No per-size series alongside it
+    assert '(?, ?, ?, ?, ?, ?), (?' not in body
+
+
+def test_statement_labels_collapse_in_lists_and_cap_length():
+    assert metrics.normalize_statement('SELECT x FROM t\n  WHERE y IN (?, ?, ?)') == 'SELECT x FROM t WHERE y IN (?, ...)'
+    long_sql = 'SELECT ' + ', '.join(f'column_{i}' for i in range(100)) + ' FROM t'
+    label = metrics.normalize_statement(long_sql)
+    assert len(label) == metrics.MAX_STATEMENT_LABEL_LENGTH
+    assert label != metrics.normalize_statement(long_sql.replace('FROM t', 'FROM u'))
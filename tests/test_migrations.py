@@ -0,0 +1,118 @@
+import asyncio
+import shutil
+import sqlite3
+from datetime import date, timedelta
+
+import aiosqlite
+import pytest
+
+import migrations
+import server
+
+ROUTE_QUERIES = {
+    'entries by week': (server.ENTRIES_BY_WEEK_SQL, ('2025-11-22',)),
+    'entries by range': (server.ENTRIES_BY_RANGE_SQL, ('2025-01-01', '2025-03-31', 1001)),
+    'entries after cursor': (server.ENTRIES_AFTER_CURSOR_SQL, ('2025-01-01', 'GMRC', '2025-03-31', 1001)),
+    'weekly summary': (server.WEEK_SUMMARY_SQL, ('2025-11-22',)),
+    'export range': (server.EXPORT_RANGE_SQL, ('2025-01-01', '2025-03-31')),
+    'range summary': (server.RANGE_SUMMARY_SQL, ('2025-01-04', '2025-06-28')),
+    'monthly report': (server.MONTHLY_REPORT_SQL, ('2023-01', '2025-12')),
+    'yearly report': (server.YEARLY_REPORT_SQL, ('2023', '2025')),
+    'monthly report by line': (server.MONTHLY_LINES_REPORT_SQL.format(periods='?, ?', lines='?'),
+                               ('2024-01', '2024-02', 'VTR')),
+    'yearly report by line': (server.YEARLY_LINES_REPORT_SQL.format(periods='?, ?', lines='?, ?'),
+                              ('2024', '2025', 'VTR', 'CLP')),
+    'sync since': (server.SYNC_SINCE_SQL, {'since': 1000, 'limit': 5001}),
+    'sync after cursor': (server.SYNC_AFTER_CURSOR_SQL, {'rev': 1000, 'entity': 'entry', 'key': '[]', 'limit': 5001}),
+}
+# settings holds the two seeded keys, which SQLite rightly scans rather than seeks
+SMALL_TABLE_SCANS = {'SCAN s LEFT-JOIN'}
+
+
+def run_migrate(path):
+    async def scenario():
+        async with aiosqlite.connect(path) as db:
+            return await migrations.migrate(db)
+
+    return asyncio.run(scenario())
+
+
+def test_fresh_database_reaches_latest_version(db_path):
+    assert run_migrate(db_path) == migrations.LATEST_VERSION
+    # Second run is a no-op
+    assert run_migrate(db_path) == migrations.LATEST_VERSION
+
+    with sqlite3.connect(db_path) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_time_entries_week', 'idx_time_entries_date'} <= indexes
+
+
+def test_existing_unversioned_database_is_upgraded_in_place(db_path):
+    shutil.copy(server.ROOT_DIR / 'timesheet.db', db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+        before = conn.execute('SELECT * FROM time_entries ORDER BY id').fetchall()
+
+    assert run_migrate(db_path) == migrations.LATEST_VERSION
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT * FROM time_entries ORDER BY id').fetchall() == before
+
+
+def test_failed_migration_leaves_previous_version(db_path, monkeypatch):
+    run_migrate(db_path)
+    broken = migrations.LATEST_VERSION + 1
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [
+        (broken, 'broken', ['CREATE TABLE half_done (x INTEGER)', 'THIS IS NOT SQL']),
+    ])
+    monkeypatch.setattr(migrations, 'LATEST_VERSION', broken)
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_migrate(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == broken - 1
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
+
+
+def test_startup_on_a_current_database_writes_nothing(db_path):
+    run_migrate(db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM line_codes').fetchone()[0] == 10
+        assert conn.execute('SELECT COUNT(*) FROM settings').fetchone()[0] == 2
+        conn.execute("DELETE FROM line_codes WHERE line_code = 'NYOG'")
+
+    async def boot():
+        async with aiosqlite.connect(db_path) as db:
+            await server.init_db(db)
+            return db.total_changes, db.in_transaction
+
+    assert asyncio.run(boot()) == (0, False)
+    with sqlite3.connect(db_path) as conn:
+        # Defaults are seeded once, not restored on every boot
+        assert conn.execute("SELECT COUNT(*) FROM line_codes WHERE line_code = 'NYOG'").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize('name', sorted(ROUTE_QUERIES))
+def test_route_queries_use_an_index(db_path, name):
+    run_migrate(db_path)
+    with sqlite3.connect(db_path) as conn:
+        day = date(2023, 1, 1)
+        rows = []
+        for offset in range(3 * 365):
+            work_date = day + timedelta(days=offset)
+            week_ending = server.get_week_ending(work_date).isoformat()
+            for line in ('VTR', 'GMRC', 'CLP'):
+                rows.append((work_date.isoformat(), week_ending, line, 8, 1, 0))
+        conn.executemany(
+            'INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours, is_pay_week) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        conn.execute('ANALYZE')
+
+        sql, params = ROUTE_QUERIES[name]
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+    assert any(step.startswith('SEARCH') and ' USING ' in step for step in plan), plan
+    assert not any(step.startswith('SCAN') and ' USING ' not in step and step not in SMALL_TABLE_SCANS
+                   for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
@@ -0,0 +1,94 @@
+import asyncio
+import sqlite3
+from datetime import date, timedelta
+
+import server
+
+
+def stale_rows(db_path, base, frequency):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute('SELECT week_ending_date, is_pay_week FROM time_entries').fetchall()
+    return [row for row in rows
+            if bool(row[1]) != server.is_pay_week(date.fromisoformat(row[0]), base, frequency)]
+
+
+def test_base_change_recomputes_stored_flags_in_chunks(client, db_path):
+    start = date(2024, 1, 1)
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': (start + timedelta(days=i)).isoformat(), 'line_code': 'VTR', 'st_hours': 8}
+        for i in range(400)
+    ])
+    server.app.state.tenants.default.pay_weeks._chunk_weeks = 5
+
+    response = client.put('/api/settings/base_pay_week_ending', json_body={
+        'key': 'base_pay_week_ending', 'value': '2025-11-29',
+    })
+    assert response.status_code == 200
+    # Summaries follow the new schedule straight away, whatever the job's progress
+    summary = client.get('/api/weekly-summary', params={'week_ending': '2024-06-01'}).json()
+    assert summary['is_pay_week'] is server.is_pay_week(date(2024, 6, 1), date(2025, 11, 29))
+
+    client.run(server.app.state.tenants.default.pay_weeks.wait())
+    status = client.get('/api/jobs/pay-week-recompute').json()
+    assert status['state'] == 'done'
+    assert status['base_pay_week_ending'] == '2025-11-29'
+    assert status['weeks_done'] == 58
+    assert status['rows_updated'] == 400
+    assert stale_rows(db_path, date(2025, 11, 29), 14) == []
+
+
+def test_newer_change_supersedes_running_job(client, db_path):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': (date(2024, 1, 1) + timedelta(days=i)).isoformat(), 'line_code': 'VTR'} for i in range(200)
+    ])
+    client.put('/api/settings/base_pay_week_ending', json_body={'key': 'base_pay_week_ending', 'value': '2025-11-29'})
+    first = client.get('/api/jobs/pay-week-recompute').json()
+    client.put('/api/settings/pay_frequency_days', json_body={'key': 'pay_frequency_days', 'value': '7'})
+    client.run(server.app.state.tenants.default.pay_weeks.wait())
+
+    status = client.get('/api/jobs/pay-week-recompute').json()
+    assert status['id'] == first['id'] + 1
+    assert (status['state'], status['pay_frequency_days']) == ('done', 7)
+    assert stale_rows(db_path, date(2025, 11, 29), 7) == []
+
+
+def test_concurrent_starts_leave_one_job_running(client):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': (date(2024, 1, 1) + timedelta(days=i)).isoformat(), 'line_code': 'VTR'} for i in range(100)
+    ])
+    pay_weeks = server.app.state.tenants.default.pay_weeks
+
+    async def start_many():
+        return await asyncio.gather(*(pay_weeks.start(date(2025, 11, 29), 14) for _ in range(5)))
+
+    started = client.run(start_many())
+    client.run(pay_weeks.wait())
+    assert sorted(status['id'] for status in started) == [1, 2, 3, 4, 5]
+    # Every job but the last was stopped before the next one began
+    assert pay_weeks.status['id'] == 5 and pay_weeks.status['state'] == 'done'
+
+
+def test_change_already_picked_up_by_the_watcher_still_recomputes(client, db_path, monkeypatch):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': (date(2024, 1, 1) + timedelta(days=i)).isoformat(), 'line_code': 'VTR'} for i in range(100)
+    ])
+    tenant = server.app.state.tenants.default
+    value = {'key': 'base_pay_week_ending', 'value': '2025-11-29'}
+    reload_settings = server.reload_settings
+
+    async def reload_after_watcher(tenant, db):
+        # The data_version watcher reloads between the commit and reload_settings
+        async with tenant.pool.acquire_read() as reader:
+            await tenant.settings.load(reader)
+        return await reload_settings(tenant, db)
+
+    monkeypatch.setattr(server, 'reload_settings', reload_after_watcher)
+    assert client.put('/api/settings/base_pay_week_ending', json_body=value).status_code == 200
+    client.run(tenant.pay_weeks.wait())
+    assert client.get('/api/jobs/pay-week-recompute').json()['base_pay_week_ending'] == '2025-11-29'
+    assert stale_rows(db_path, date(2025, 11, 29), 14) == []
+
+    # Writing the same schedule again starts nothing new
+    job = client.get('/api/jobs/pay-week-recompute').json()['id']
+    client.put('/api/settings/base_pay_week_ending', json_body=value)
+    assert client.get('/api/jobs/pay-week-recompute').json()['id'] == job
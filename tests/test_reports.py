@@ -0,0 +1,70 @@
+def post_entries(client, entries):
+    response = client.post('/api/entries/batch', json_body=[
+        {'work_date': work_date, 'line_code': line_code, 'st_hours': st, 'ot_hours': ot}
+        for work_date, line_code, st, ot in entries
+    ])
+    assert response.status_code == 200
+
+
+def test_monthly_report_totals_lines_and_fills_empty_months(client):
+    post_entries(client, [
+        ('2024-12-31', 'VTR', 8, 2),
+        ('2025-01-02', 'VTR', 8, 1),
+        ('2025-01-03', 'VTR', 8, 3),
+        ('2025-01-03', 'PTO', 8, 0),
+        ('2025-03-10', 'GMRC', 6, 0),
+    ])
+    # An edit moves hours between months' totals
+    client.post('/api/entries', json_body={'work_date': '2025-01-02', 'line_code': 'VTR', 'st_hours': 4})
+
+    response = client.get('/api/reports/monthly', params={'start': '2024-12', 'end': '2025-03'})
+    assert response.status_code == 200
+    report = response.json()
+    assert [month['period'] for month in report] == ['2024-12', '2025-01', '2025-02', '2025-03']
+    january = report[1]
+    assert january['line_totals'] == {
+        'PTO': {'st': 8, 'ot': 0, 'total': 8, 'entries': 1},
+        'VTR': {'st': 12, 'ot': 3, 'total': 15, 'entries': 2},
+    }
+    assert (january['total_st'], january['total_ot'], january['entries']) == (20, 3, 3)
+    assert report[2]['lines_used'] == [] and report[2]['total_hours'] == 0
+
+    overtime = client.get('/api/reports/monthly', params={'start': '2025-01', 'end': '2025-01', 'line_code': 'VTR'})
+    assert overtime.json()[0]['lines_used'] == ['VTR']
+    assert overtime.json()[0]['total_ot'] == 3
+
+
+def test_yearly_report_and_conditional_get(client):
+    post_entries(client, [('2024-07-04', 'HOLIDAY', 8, 0), ('2025-07-04', 'HOLIDAY', 8, 0),
+                          ('2025-08-01', 'PTO', 8, 0), ('2025-08-01', 'VTR', 2, 0)])
+    params = {'start': '2024', 'end': '2025', 'line_code': ['PTO', 'HOLIDAY']}
+    response = client.get('/api/reports/yearly', params=params)
+    assert [(year['period'], year['total_hours']) for year in response.json()] == [('2024', 8), ('2025', 16)]
+
+    etag = response.headers['etag']
+    assert client.get('/api/reports/yearly', params=params, headers={'If-None-Match': etag}).status_code == 304
+    client.post('/api/entries', json_body={'work_date': '2025-08-01', 'line_code': 'PTO', 'st_hours': 4})
+    changed = client.get('/api/reports/yearly', params=params, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json()[1]['total_hours'] == 12
+
+
+def test_report_ranges_are_validated(client):
+    assert client.get('/api/reports/monthly', params={'start': '2025-13', 'end': '2025-12'}).status_code == 400
+    assert client.get('/api/reports/monthly', params={'start': '2025-03', 'end': '2025-01'}).status_code == 400
+    assert client.get('/api/reports/monthly', params={'start': '1900-01', 'end': '2025-01'}).status_code == 400
+    assert client.get('/api/reports/yearly', params={'start': '2025', 'end': '2024'}).status_code == 400
+    assert client.get('/api/reports/yearly', params={'start': '1800', 'end': '2025'}).status_code == 400
+
+
+def test_unpadded_dates_are_stored_and_reported_canonically(client):
+    response = client.post('/api/entries', json_body={'work_date': '2025-2-3', 'line_code': 'VTR', 'st_hours': 8})
+    assert response.status_code == 200
+    assert response.json()['work_date'] == '2025-02-03'
+
+    monthly = client.get('/api/reports/monthly', params={'start': '2025-02', 'end': '2025-02'}).json()
+    assert monthly[0]['total_st'] == 8
+    yearly = client.get('/api/reports/yearly', params={'start': '2025', 'end': '2025'}).json()
+    assert yearly[0]['line_totals'] == {'VTR': {'st': 8, 'ot': 0, 'total': 8, 'entries': 1}}
+    entries = client.get('/api/entries', params={'week_ending': '2025-02-08'}).json()
+    assert [entry['work_date'] for entry in entries] == ['2025-02-03']
@@ -0,0 +1,116 @@
+import asyncio
+import random
+import shutil
+import sqlite3
+from datetime import date, timedelta
+
+import aiosqlite
+
+import migrations
+import server
+from rollups import check_period_rollups, check_weekly_rollups, rebuild_period_rollups, rebuild_weekly_rollups
+
+
+def run(db_path, fn):
+    async def scenario():
+        async with aiosqlite.connect(db_path) as db:
+            await migrations.migrate(db)
+            return await fn(db)
+
+    return asyncio.run(scenario())
+
+
+def random_writes(db_path, seed=7):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    with sqlite3.connect(db_path) as conn:
+        for _ in range(2000):
+            work_date = start + timedelta(days=rng.randrange(60))
+            week_ending = server.get_week_ending(work_date).isoformat()
+            line = rng.choice(['VTR', 'GMRC', 'CLP', 'PTO'])
+            action = rng.random()
+            if action < 0.7:
+                conn.execute(
+                    'INSERT INTO time_entries (work_date, week_ending_date, line_code, st_hours, ot_hours) '
+                    'VALUES (?, ?, ?, ?, ?) ON CONFLICT(work_date, line_code) DO UPDATE SET '
+                    'st_hours = excluded.st_hours, ot_hours = excluded.ot_hours',
+                    (work_date.isoformat(), week_ending, line, rng.randrange(13), rng.randrange(5)))
+            elif action < 0.85:
+                conn.execute('DELETE FROM time_entries WHERE work_date = ? AND line_code = ?',
+                             (work_date.isoformat(), line))
+            else:
+                # Move an entry to another line
+                conn.execute('UPDATE OR IGNORE time_entries SET line_code = ? WHERE work_date = ? AND line_code = ?',
+                             (rng.choice(['VTR', 'NEGS']), work_date.isoformat(), line))
+
+
+def test_rollups_stay_consistent_through_inserts_updates_and_deletes(db_path):
+    run(db_path, lambda db: asyncio.sleep(0))
+    random_writes(db_path)
+    assert run(db_path, check_weekly_rollups) == []
+    assert run(db_path, check_period_rollups) == []
+
+
+def test_checker_reports_drift_and_rebuild_repairs_it(db_path):
+    run(db_path, lambda db: asyncio.sleep(0))
+    random_writes(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE weekly_rollups SET st_hours = st_hours + 1 WHERE (week_ending_date, kind, key) = "
+                     "(SELECT week_ending_date, kind, key FROM weekly_rollups LIMIT 1)")
+
+    problems = run(db_path, check_weekly_rollups)
+    assert sorted(p['problem'] for p in problems) == ['missing', 'unexpected']
+
+    run(db_path, rebuild_weekly_rollups)
+    assert run(db_path, check_weekly_rollups) == []
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM yearly_rollups WHERE (year, line_code) = "
+                     "(SELECT year, line_code FROM yearly_rollups LIMIT 1)")
+    assert [p['table'] for p in run(db_path, check_period_rollups)] == ['yearly_rollups']
+    run(db_path, rebuild_period_rollups)
+    assert run(db_path, check_period_rollups) == []
+
+
+def test_migration_backfills_existing_entries(db_path):
+    shutil.copy(server.ROOT_DIR / 'timesheet.db', db_path)
+    assert run(db_path, check_weekly_rollups) == []
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM weekly_rollups').fetchone()[0] > 0
+
+
+def test_import_rebuilds_rollups_for_touched_weeks(client, db_path):
+    client.post('/api/entries/batch', json_body=[
+        {'work_date': '2025-03-03', 'line_code': 'VTR', 'st_hours': 8},
+        {'work_date': '2025-05-05', 'line_code': 'VTR', 'st_hours': 8},
+    ])
+    # One import row updates an existing entry, the other adds one
+    response = client.post('/api/import', json_body={'entries': [
+        {'work_date': '2025-03-03', 'week_ending_date': '2025-03-08', 'line_code': 'VTR', 'st_hours': 5},
+        {'work_date': '2025-03-04', 'week_ending_date': '2025-03-08', 'line_code': 'GMRC', 'st_hours': 3},
+    ]})
+    assert response.status_code == 200
+    assert run(db_path, check_weekly_rollups) == []
+    assert run(db_path, check_period_rollups) == []
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM trigger_control').fetchone()[0] == 0
+
+
+def test_import_puts_the_dropped_triggers_back(client, db_path):
+    def triggers():
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name").fetchall()
+
+    before = triggers()
+    entry = {'work_date': '2025-03-03', 'week_ending_date': '2025-03-08', 'line_code': 'VTR', 'st_hours': 5}
+    assert client.post('/api/import', json_body={'entries': [entry]}).status_code == 200
+    assert triggers() == before
+    # A failed import rolls the drop back
+    bad = dict(entry, work_date='2025-03-10')
+    assert client.post('/api/import', json_body={'entries': [entry, bad]}).status_code == 400
+    assert triggers() == before
+
+    # ...and the triggers still maintain the rollups for ordinary writes
+    client.post('/api/entries', json_body={'work_date': '2025-03-04', 'line_code': 'GMRC', 'st_hours': 2})
+    assert run(db_path, check_weekly_rollups) == []
+    assert run(db_path, check_period_rollups) == []
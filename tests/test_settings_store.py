@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+from datetime import date
+
+import harness
+import server
+from settings_store import AppSettings
+
+
+class ExplodingPool:
+    def acquire(self):
+        raise AssertionError("hot path touched the database")
+
+
+def test_snapshot_parses_typed_values_and_falls_back_on_bad_input():
+    settings = AppSettings.from_rows([('base_pay_week_ending', '2025-12-06'), ('pay_frequency_days', '7')])
+    assert settings.base_pay_week_ending == date(2025, 12, 6)
+    assert settings.pay_frequency_days == 7
+
+    broken = AppSettings.from_rows([('base_pay_week_ending', 'soon'), ('pay_frequency_days', 'x')])
+    assert broken.base_pay_week_ending == date(2025, 11, 22)
+    assert broken.pay_frequency_days == 14
+    # Pay periods are made of whole weeks, ending on Saturdays
+    assert AppSettings.from_rows([('pay_frequency_days', '10')]).pay_frequency_days == 14
+    assert AppSettings.from_rows([('base_pay_week_ending', '2025-11-20')]).base_pay_week_ending == date(2025, 11, 22)
+
+
+def test_update_setting_rejects_unusable_pay_schedules(client):
+    for key, value in [('pay_frequency_days', '10'), ('pay_frequency_days', '0'), ('pay_frequency_days', 'x'),
+                       ('base_pay_week_ending', '2025-11-20'), ('base_pay_week_ending', 'soon')]:
+        response = client.put(f'/api/settings/{key}', json_body={'key': key, 'value': value})
+        assert response.status_code == 400, (key, value)
+        assert key in response.json()['detail']
+    settings = {s['key']: s['value'] for s in client.get('/api/settings').json()}
+    assert (settings['pay_frequency_days'], settings['base_pay_week_ending']) == ('14', '2025-11-22')
+
+    assert client.put('/api/settings/pay_frequency_days', json_body={
+        'key': 'pay_frequency_days', 'value': '21'}).status_code == 200
+    # Keys without a typed value are stored as given
+    assert client.put('/api/settings/theme', json_body={'key': 'theme', 'value': 'dark'}).status_code == 200
+
+
+def test_week_info_reads_settings_from_memory(client):
+    tenant = server.app.state.tenants.default
+    pool, tenant.pool = tenant.pool, ExplodingPool()
+    try:
+        response = client.get('/api/week-info', params={'work_date': '2025-11-18'})
+    finally:
+        tenant.pool = pool
+    assert response.status_code == 200
+    assert response.json()['is_pay_week'] is True
+
+
+def test_update_setting_refreshes_cache_immediately(client):
+    response = client.put('/api/settings/base_pay_week_ending', json_body={
+        'key': 'base_pay_week_ending', 'value': '2025-11-29',
+    })
+    assert response.status_code == 200
+    assert server.app.state.tenants.default.settings.current.base_pay_week_ending == date(2025, 11, 29)
+    assert client.get('/api/week-info', params={'work_date': '2025-11-18'}).json()['is_pay_week'] is False
+
+
+def test_changes_from_other_workers_are_picked_up(db_path, monkeypatch):
+    async def scenario():
+        await harness.start_app(db_path)
+        try:
+            # Simulate another uvicorn worker writing to the shared file
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("UPDATE settings SET value = '2025-11-29' WHERE key = 'base_pay_week_ending'")
+            for _ in range(200):
+                if server.app.state.tenants.default.settings.current.base_pay_week_ending == date(2025, 11, 29):
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+        finally:
+            await harness.stop_app()
+
+    monkeypatch.setattr(server, 'DB_PATH', db_path)
+    monkeypatch.setattr(server, 'SETTINGS_REFRESH_SECONDS', 0.01)
+    assert asyncio.run(scenario())
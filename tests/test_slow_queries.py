@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+
+from db import ConnectionPool
+from slow_queries import SlowQueryLog, full_scans_of_time_entries, parameter_shape
+
+
+def run_statements(db_path, slow_query_log, statements):
+    async def scenario():
+        pool = ConnectionPool(db_path, size=1, slow_query_log=slow_query_log)
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                await db.execute('CREATE TABLE IF NOT EXISTS time_entries '
+                                 '(work_date TEXT, week_ending_date TEXT, st_hours INTEGER)')
+                await db.execute('CREATE INDEX IF NOT EXISTS idx_week ON time_entries (week_ending_date)')
+                await db.executemany('INSERT INTO time_entries VALUES (?, ?, ?)',
+                                     [('2025-11-17', '2025-11-22', 8), ('2025-11-18', '2025-11-22', 8)])
+                await db.commit()
+                for sql, params in statements:
+                    async with db.execute(sql, params) as cursor:
+                        await cursor.fetchall()
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_statements_are_logged_with_plan_and_full_scan_flag(db_path, caplog):
+    caplog.set_level(logging.WARNING, logger='slow_queries')
+    run_statements(db_path, SlowQueryLog(threshold_ms=0), [
+        ('SELECT * FROM time_entries te WHERE te.st_hours > ?', (4,)),
+        ('SELECT * FROM time_entries WHERE week_ending_date = ?', ('2025-11-22',)),
+    ])
+    messages = [record.getMessage() for record in caplog.records]
+
+    [insert] = [m for m in messages if 'INSERT INTO time_entries' in m]
+    assert 'params=2 x (str, str, int)' in insert
+    [scan] = [m for m in messages if 'te.st_hours' in m]
+    assert scan.startswith('Slow query (FULL SCAN of time_entries):')
+    assert 'params=(int)' in scan and 'plan=SCAN te' in scan
+    [search] = [m for m in messages if 'week_ending_date = ?' in m]
+    assert search.startswith('Slow query:')
+    assert 'SEARCH time_entries USING INDEX idx_week' in search
+    # Statements EXPLAIN cannot describe are still logged, without a plan
+    assert any(m.startswith('Slow query:') and 'CREATE TABLE' in m and 'plan=n/a' in m for m in messages)
+
+
+def test_repeats_within_the_interval_are_sampled(db_path, caplog):
+    caplog.set_level(logging.WARNING, logger='slow_queries')
+    statement = ('SELECT COUNT(*) FROM time_entries', ())
+    run_statements(db_path, SlowQueryLog(threshold_ms=0, interval_seconds=3600), [statement] * 5)
+    assert len([r for r in caplog.records if 'COUNT(*)' in r.getMessage()]) == 1
+
+    caplog.clear()
+    run_statements(db_path, SlowQueryLog(threshold_ms=0, interval_seconds=0), [statement] * 3)
+    assert len([r for r in caplog.records if 'COUNT(*)' in r.getMessage()]) == 3
+
+
+def test_fast_statements_are_not_logged(db_path, caplog):
+    caplog.set_level(logging.WARNING, logger='slow_queries')
+    run_statements(db_path, SlowQueryLog(threshold_ms=60_000), [('SELECT * FROM time_entries', ())])
+    assert caplog.records == []
+
+
+def test_parameter_shape_and_scan_detection():
+    assert parameter_shape(None) == '()'
+    assert parameter_shape({'base': '2025-11-22', 'frequency': 14}) == '{base: str, frequency: int}'
+    assert full_scans_of_time_entries('SELECT * FROM time_entries AS t JOIN line_codes l', [
+        'SCAN t', 'SEARCH l USING INDEX sqlite_autoindex_line_codes_1 (line_code=?)',
+    ]) == ['SCAN t']
+    assert full_scans_of_time_entries('SELECT * FROM time_entries WHERE week_ending_date = ?', [
+        'SEARCH time_entries USING INDEX idx_week (week_ending_date=?)',
+    ]) == []
+
+
+def test_time_spent_fetching_rows_counts_towards_the_threshold(db_path, caplog):
+    caplog.set_level(logging.WARNING, logger='slow_queries')
+
+    async def scenario():
+        pool = ConnectionPool(db_path, size=1, slow_query_log=SlowQueryLog(threshold_ms=100))
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                await db.execute('CREATE TABLE time_entries (work_date TEXT, st_hours INTEGER)')
+                await db.executemany('INSERT INTO time_entries VALUES (?, ?)',
+                                     [(f'2025-01-{day:02d}', 8) for day in range(1, 29)] * 5)
+                await db.commit()
+                # Each row costs 2ms to produce, so the first step is quick and the reading slow
+                await db.create_function('slow_hours', 1, lambda hours: time.sleep(0.002) or hours)
+                started = time.perf_counter()
+                async with db.execute('SELECT work_date, slow_hours(st_hours) FROM time_entries') as cursor:
+                    first_step = time.perf_counter() - started
+                    async for _ in cursor:
+                        pass
+            return first_step
+        finally:
+            await pool.close()
+
+    first_step = asyncio.run(scenario())
+    assert first_step < 0.1
+    [record] = [r for r in caplog.records if r.getMessage().startswith('Slow query')]
+    assert 'slow_hours' in record.getMessage()
+    assert 'FULL SCAN of time_entries' in record.getMessage()
@@ -0,0 +1,107 @@
+import server
+
+
+def sync(client, since, **params):
+    response = client.get('/api/sync', params={'since': since, **params})
+    assert response.status_code == 200, response.body
+    return response.json()
+
+
+def add_entry(client, work_date, line_code='VTR', st_hours=8):
+    client.post('/api/entries', json_body={'work_date': work_date, 'line_code': line_code, 'st_hours': st_hours})
+
+
+def test_full_sync_then_only_what_changed(client):
+    full = sync(client, 0)
+    assert {line['line_code'] for line in full['line_codes']} >= {'VTR', 'GMRC'}
+    assert {setting['key'] for setting in full['settings']} >= {'base_pay_week_ending'}
+    assert full['entries'] == [] and full['next_cursor'] is None
+
+    add_entry(client, '2025-11-17')
+    add_entry(client, '2025-11-18', 'GMRC')
+    add_entry(client, '2025-11-17', st_hours=6)
+    delta = sync(client, full['revision'])
+    assert delta['revision'] > full['revision']
+    # An entry written twice is listed once, as it is now
+    assert [(e['work_date'], e['line_code'], e['st_hours']) for e in delta['entries']] == [
+        ('2025-11-18', 'GMRC', 8), ('2025-11-17', 'VTR', 6),
+    ]
+    assert delta['line_codes'] == [] and delta['settings'] == []
+
+    assert sync(client, delta['revision'])['entries'] == []
+
+
+def test_deletions_come_back_as_tombstones(client):
+    client.post('/api/lines', json_body={'line_code': 'P-1', 'is_project': True})
+    add_entry(client, '2025-11-17')
+    since = sync(client, 0)['revision']
+
+    assert client.request('DELETE', '/api/lines/P-1').status_code == 200
+
+    async def delete_entry():
+        async with server.app.state.tenants.default.pool.acquire() as db:
+            await db.execute("DELETE FROM time_entries WHERE work_date = '2025-11-17'")
+            await db.commit()
+
+    client.run(delete_entry())
+    delta = sync(client, since)
+    assert delta['deleted'] == {'entries': [{'work_date': '2025-11-17', 'line_code': 'VTR'}],
+                                'line_codes': ['P-1'], 'settings': []}
+    assert delta['entries'] == [] and delta['line_codes'] == []
+
+    # Recreated keys are live again
+    client.post('/api/lines', json_body={'line_code': 'P-1', 'is_project': True})
+    again = sync(client, since)
+    assert [line['line_code'] for line in again['line_codes']] == ['P-1']
+    assert again['deleted']['line_codes'] == []
+
+
+def test_pages_follow_the_cursor(client):
+    since = sync(client, 0)['revision']
+    for day in range(17, 22):
+        add_entry(client, f'2025-11-{day}')
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        page = sync(client, since, **params)
+        seen.extend(entry['work_date'] for entry in page['entries'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f'2025-11-{day}' for day in range(17, 22)]
+
+
+def test_bulk_import_is_visible_to_sync(client):
+    since = sync(client, 0)['revision']
+    client.post('/api/import', json_body={
+        'line_codes': [{'line_code': 'P-100', 'label': 'Project 100', 'is_project': True,
+                        'is_visible': True, 'sort_order': 11}],
+        'settings': [],
+        'entries': [{'work_date': '2025-11-17', 'week_ending_date': '2025-11-22', 'line_code': 'P-100',
+                     'st_hours': 8, 'ot_hours': 2, 'is_pay_week': True}],
+    })
+    delta = sync(client, since)
+    assert [(e['work_date'], e['line_code']) for e in delta['entries']] == [('2025-11-17', 'P-100')]
+    assert 'P-100' in {line['line_code'] for line in delta['line_codes']}
+
+
+def test_bulk_import_logs_only_the_keys_it_wrote(client):
+    add_entry(client, '2025-11-18', 'GMRC')
+    since = sync(client, 0)['revision']
+    client.post('/api/import', json_body={
+        'settings': [{'key': 'pay_frequency_days', 'value': '14'}],
+        'entries': [{'work_date': '2025-11-17', 'week_ending_date': '2025-11-22', 'line_code': 'VTR',
+                     'st_hours': 8}],
+    })
+    delta = sync(client, since)
+    # Neither the other entry in the same week nor the untouched line codes and settings
+    assert [(e['work_date'], e['line_code']) for e in delta['entries']] == [('2025-11-17', 'VTR')]
+    assert delta['line_codes'] == []
+    assert [setting['key'] for setting in delta['settings']] == ['pay_frequency_days']
+
+
+def test_since_ahead_of_the_database_is_a_conflict(client):
+    revision = sync(client, 0)['revision']
+    assert client.get('/api/sync', params={'since': revision + 1}).status_code == 409
+    assert client.get('/api/sync', params={'since': 0, 'cursor': 'nope'}).status_code == 400
@@ -0,0 +1,94 @@
+import asyncio
+
+import server
+
+
+def tenant(name):
+    return {'X-Tenant-ID': name}
+
+
+def add_entry(client, name, line_code='VTR'):
+    response = client.post('/api/entries', headers=tenant(name), json_body={
+        'work_date': '2025-11-18', 'line_code': line_code, 'st_hours': 8,
+    })
+    assert response.status_code == 200
+
+
+def week_lines(client, name=None):
+    entries = client.get('/api/entries', params={'week_ending': '2025-11-22'},
+                         headers=tenant(name) if name else None).json()
+    return [entry['line_code'] for entry in entries]
+
+
+def test_tenants_get_separate_databases(client, db_path):
+    add_entry(client, 'crew-a', 'VTR')
+    add_entry(client, 'crew-b', 'GMRC')
+
+    assert week_lines(client, 'crew-a') == ['VTR']
+    assert week_lines(client, 'crew-b') == ['GMRC']
+    # No header is the single-user database at DB_PATH
+    assert week_lines(client) == []
+    assert (db_path.parent / 'tenant_dbs' / 'crew-a.db').exists()
+
+    # Settings and the jobs they start are per tenant too
+    client.put('/api/settings/base_pay_week_ending', headers=tenant('crew-a'),
+               json_body={'key': 'base_pay_week_ending', 'value': '2025-11-29'})
+    settings = {s['key']: s['value'] for s in client.get('/api/settings', headers=tenant('crew-b')).json()}
+    assert settings['base_pay_week_ending'] == '2025-11-22'
+    assert client.get('/api/jobs/pay-week-recompute', headers=tenant('crew-b')).status_code == 404
+
+
+def test_tenant_ids_must_be_safe_file_names(client):
+    for bad in ('../escape', 'a/b', '.hidden', 'x' * 65):
+        response = client.get('/api/lines', headers=tenant(bad))
+        assert response.status_code == 400, bad
+
+
+def test_least_recently_used_tenants_are_closed_and_reopened(client):
+    registry = server.app.state.tenants
+    registry.max_open = 3
+    for name in ('t1', 't2', 't3'):
+        add_entry(client, name)
+    assert registry.open_ids == ['default', 't2', 't3']
+
+    # A closed tenant reopens with its data on the next request
+    assert week_lines(client, 't1') == ['VTR']
+    assert registry.open_ids == ['default', 't3', 't1']
+
+
+def test_tenants_in_use_are_never_closed(client):
+    registry = server.app.state.tenants
+    registry.max_open = 2
+
+    async def scenario():
+        async with registry.use('busy') as busy:
+            await client.client.get('/api/lines', headers=tenant('other'))
+            registry.idle_seconds = 0
+            await registry.close_idle()
+            assert registry.open_ids == ['default', 'busy']
+            async with busy.pool.acquire() as db:
+                async with db.execute('SELECT COUNT(*) FROM line_codes') as cursor:
+                    assert (await cursor.fetchone())[0] > 0
+        await registry.close_idle()
+        assert registry.open_ids == ['default']
+
+    client.run(scenario())
+
+
+def test_concurrent_first_requests_open_a_tenant_once(client, monkeypatch):
+    opened = []
+    open_tenant = server.open_tenant
+
+    async def counting_open(tenant_id):
+        opened.append(tenant_id)
+        return await open_tenant(tenant_id)
+
+    monkeypatch.setattr(server.app.state.tenants, '_open_tenant', counting_open)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            client.client.get('/api/lines', headers=tenant('crowd')) for _ in range(5)
+        ))
+
+    assert [response.status_code for response in client.run(scenario())] == [200] * 5
+    assert opened == ['crowd']
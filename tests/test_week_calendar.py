@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+import server
+import week_calendar
+
+
+def test_matches_scalar_functions():
+    base = date(2025, 11, 22)
+    dates = [date(1969, 12, 1) + timedelta(days=i) for i in range(3000)]
+    days, valid = week_calendar.parse_dates([d.isoformat() for d in dates])
+    assert valid.all()
+
+    saturdays = week_calendar.week_endings(days)
+    expected = [server.get_week_ending(d) for d in dates]
+    assert week_calendar.iso_dates(saturdays) == [d.isoformat() for d in expected]
+    assert week_calendar.iso_dates(week_calendar.week_starts(saturdays)) == [
+        server.get_week_start(d).isoformat() for d in expected]
+    for frequency in (7, 14, 28):
+        assert week_calendar.pay_week_flags(saturdays, base, frequency).tolist() == [
+            server.is_pay_week(d, base, frequency) for d in expected]
+
+
+def test_parse_dates_flags_bad_values_without_raising():
+    days, valid = week_calendar.parse_dates(['2025-11-22', '2025-02-30', '2025-11', None, '2025-1-1  '])
+    assert valid.tolist() == [True, False, False, False, False]
+    assert days[0] == np.datetime64('2025-11-22')
+    assert np.isnat(days[1:]).all()
+
+
+def test_batch_week_info_matches_single_lookups(client):
+    work_dates = ['2025-11-16', '2025-11-22', '2025-11-23', '2024-02-29']
+    response = client.post('/api/week-info/batch', json_body=work_dates)
+    assert response.status_code == 200
+    assert response.json() == [client.get('/api/week-info', params={'work_date': d}).json() for d in work_dates]
+
+    response = client.post('/api/week-info/batch', json_body=['2025-11-16', 'nope'])
+    assert response.status_code == 400
+    assert 'index 1' in response.json()['detail']
@@ -0,0 +1,89 @@
+import asyncio
+
+import server
+from db import ConnectionPool
+from write_coalescer import WriteCoalescer
+
+
+def run_writes(db_path, items, window_seconds=0.05, max_rows=100):
+    """Submit ``items`` concurrently; returns each outcome and the rows stored.
+    Negative items write a row and then fail."""
+
+    async def write(db, item):
+        await db.execute('INSERT INTO t VALUES (?)', (item,))
+        if item < 0:
+            raise ValueError(f'bad item {item}')
+        return item * 10
+
+    async def scenario():
+        pool = ConnectionPool(db_path, size=2)
+        await pool.open()
+        try:
+            async with pool.acquire() as db:
+                await db.execute('CREATE TABLE t (x INTEGER)')
+                await db.commit()
+            coalescer = WriteCoalescer(pool, write, window_seconds=window_seconds, max_rows=max_rows)
+            outcomes = await asyncio.gather(*(coalescer.submit(item) for item in items), return_exceptions=True)
+            await coalescer.close()
+            async with pool.acquire() as db:
+                async with db.execute('SELECT x FROM t ORDER BY x') as cursor:
+                    stored = [row[0] for row in await cursor.fetchall()]
+            return outcomes, stored
+        finally:
+            await pool.close()
+
+    return asyncio.run(scenario())
+
+
+def record_batches(monkeypatch):
+    sizes = []
+    flush = WriteCoalescer._flush
+
+    async def recording_flush(self, batch):
+        sizes.append(len(batch))
+        await flush(self, batch)
+
+    monkeypatch.setattr(WriteCoalescer, '_flush', recording_flush)
+    return sizes
+
+
+def test_concurrent_writes_share_one_transaction(db_path, monkeypatch):
+    batches = record_batches(monkeypatch)
+    outcomes, stored = run_writes(db_path, list(range(10)))
+    assert outcomes == [item * 10 for item in range(10)]
+    assert stored == list(range(10))
+    assert batches == [10]
+
+
+def test_batches_are_capped_at_max_rows(db_path, monkeypatch):
+    batches = record_batches(monkeypatch)
+    # A full batch is written without waiting out the window
+    outcomes, stored = run_writes(db_path, list(range(8)), window_seconds=60, max_rows=4)
+    assert stored == list(range(8))
+    assert batches == [4, 4]
+
+
+def test_a_failing_row_does_not_fail_the_batch(db_path):
+    outcomes, stored = run_writes(db_path, [1, -1, 2])
+    assert outcomes[0] == 10 and outcomes[2] == 20
+    assert isinstance(outcomes[1], ValueError)
+    # The failed row's own partial write was rolled back
+    assert stored == [1, 2]
+
+
+def test_entry_posts_are_coalesced_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(server, 'ENTRY_WRITE_WINDOW_MS', 20)
+    headers = {'X-Tenant-ID': 'bursty'}
+
+    async def scenario():
+        return await asyncio.gather(*(
+            client.client.post('/api/entries', headers=headers, json_body={
+                'work_date': f'2025-11-{day}', 'line_code': 'VTR', 'st_hours': day - 10})
+            for day in range(16, 23)
+        ))
+
+    responses = client.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 7
+    assert [r.json()['st_hours'] for r in responses] == list(range(6, 13))
+    entries = client.get('/api/entries', headers=headers, params={'week_ending': '2025-11-22'}).json()
+    assert [entry['st_hours'] for entry in entries] == list(range(6, 13))